@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+比较两次基准测试结果
+
+用法:
+  python3 benchmarks/compare.py benchmarks/results/old.json benchmarks/results/new.json
+  python3 benchmarks/compare.py old.json new.json --threshold 0.1
+"""
+
+import sys
+import json
+import argparse
+
+
+def load(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def compare(base: dict, head: dict, threshold: float = 0.15):
+    """
+    Returns:
+        list: (阶段, 旧耗时, 新耗时, 变化比例, 是否退化)
+    """
+    rows = []
+    for stage, result in head["stages"].items():
+        old = base["stages"].get(stage, {})
+        if "seconds" not in result or "seconds" not in old:
+            continue
+        change = (result["seconds"] - old["seconds"]) / old["seconds"] if old["seconds"] else 0.0
+        rows.append((stage, old["seconds"], result["seconds"], change, change > threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较两次基准测试结果")
+    parser.add_argument('base', help='基准结果JSON')
+    parser.add_argument('head', help='新结果JSON')
+    parser.add_argument('--threshold', type=float, default=0.15, help='判定为退化的变慢比例 (默认: 0.15)')
+    args = parser.parse_args()
+
+    base, head = load(args.base), load(args.head)
+    if base.get("audio_seconds") != head.get("audio_seconds"):
+        print(f"⚠️ 两次测试的音频时长不同: {base.get('audio_seconds')} vs {head.get('audio_seconds')}")
+
+    print(f"📊 {base.get('commit')} -> {head.get('commit')}")
+    rows = compare(base, head, args.threshold)
+    for stage, old, new, change, regressed in rows:
+        mark = "❌" if regressed else ("🚀" if change < -args.threshold else "  ")
+        print(f"{mark} {stage:<18} {old:9.4f}s -> {new:9.4f}s  {change * 100:+6.1f}%")
+
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        print(f"❌ 性能退化: {', '.join(regressions)}")
+        sys.exit(1)
+    print("✅ 没有超过阈值的退化")
+
+
+if __name__ == '__main__':
+    main()
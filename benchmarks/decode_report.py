@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应解码对比报告
+分别用 beam（基线）和 adaptive 策略解码每条音轨，比较：
+  - 解码速度: 每秒解码的token数、实时率
+  - 一致性:   adaptive 结果与 beam 结果的词级一致率（基于最长公共子序列）
+  - 回退比例: 有多少窗口/片段回退到了beam search
+
+默认按30秒窗口批量解码（与 batch_scheduler 相同），--full 时整条音轨交给后端。
+--mel 时窗口是从 mel_cache 缓存特征中截取的 MelWindow（与级联解码重新识别区域时相同），
+检查自适应解码在特征输入上的回退路径；fake后端此时按特征能量找有声区域。
+
+合成会议音频不是真正的语音，fake后端的置信度也是固定的伪值，不指定音频文件时只能验证流程，
+得到的速度和一致性没有意义。实际数据要用真实模型在真实录音上测量（例如 recordings/ 中的音轨）。
+
+用法:
+  python3 benchmarks/decode_report.py                                  # 合成会议 + fake后端，只验证流程
+  python3 benchmarks/decode_report.py recordings/xxx/xxx_对方.wav recordings/xxx/xxx_自己.wav \
+      --backend faster-whisper --model small --seconds 600
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import difflib
+import argparse
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+sys.path.insert(0, str(BENCH_DIR))
+os.environ.setdefault("VMT_METRICS_FILE", "off")
+
+from run_benchmarks import RESULTS_DIR, git_commit, quiet  # noqa: E402
+from synth_meeting import SynthConfig, write_meeting  # noqa: E402
+
+WINDOW_SECONDS = 30.0
+BATCH_SIZE = 8
+
+
+def word_agreement(reference: list, hypothesis: list) -> float:
+    """hypothesis与reference的词级一致率：公共子序列长度 / reference长度"""
+    from transcript_filter import normalize_words
+    ref = normalize_words(" ".join(seg['text'] for seg in reference))
+    hyp = normalize_words(" ".join(seg['text'] for seg in hypothesis))
+    if not ref:
+        return 1.0 if not hyp else 0.0
+    matcher = difflib.SequenceMatcher(None, ref, hyp, autojunk=False)
+    return sum(block.size for block in matcher.get_matching_blocks()) / len(ref)
+
+
+def decode_track(backend, audio, full: bool, features=None) -> dict:
+    """
+    用backend当前的解码策略解码一条音轨
+
+    features: 音轨的缓存特征（mel_cache.MelFeatures），指定时按窗口截取特征而不是音频
+    """
+    from asr_backends import SAMPLE_RATE
+    backend.decode_stats.clear()
+    start = time.perf_counter()
+    if full:
+        segments = backend.transcribe(audio)
+    else:
+        window = int(WINDOW_SECONDS * SAMPLE_RATE)
+        if features is not None:
+            duration = len(audio) / SAMPLE_RATE
+            windows = [features.window(i / SAMPLE_RATE, min(duration, (i + window) / SAMPLE_RATE))
+                       for i in range(0, len(audio), window)]
+        else:
+            windows = [audio[i:i + window] for i in range(0, len(audio), window)]
+        segments = []
+        for first in range(0, len(windows), BATCH_SIZE):
+            results = backend.transcribe_batch(windows[first:first + BATCH_SIZE])
+            for index, result in enumerate(results, first):
+                offset = index * WINDOW_SECONDS
+                segments.extend(dict(seg, start=seg['start'] + offset, end=seg['end'] + offset) for seg in result)
+    seconds = time.perf_counter() - start
+    tokens = sum(seg.get("num_tokens", 0) for seg in segments)
+    paths = {}
+    for seg in segments:
+        paths[seg.get("decode_path", "?")] = paths.get(seg.get("decode_path", "?"), 0) + 1
+    return {
+        "seconds": round(seconds, 4),
+        "tokens": tokens,
+        "tokens_per_second": round(tokens / seconds, 1) if seconds else 0.0,
+        "segments": len(segments),
+        "decode_paths": paths,
+        "stats": dict(backend.decode_stats),
+        "result": segments,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较自适应解码与始终beam search的速度和结果一致性")
+    parser.add_argument('audio', nargs='*', help='真实录音的音轨文件 (.wav/.flac)；不指定时使用合成会议')
+    parser.add_argument('--seconds', type=float, default=0.0, help='每条音轨只解码前N秒，0表示全部 (默认: 0)')
+    parser.add_argument('--meetings', type=int, default=3, help='合成会议数量 (默认: 3)')
+    parser.add_argument('--duration', type=float, default=300.0, help='每个会议的时长（秒，默认: 300）')
+    parser.add_argument('--seed', type=int, default=1234, help='第一个会议的随机种子')
+    parser.add_argument('--backend', type=str, default='fake', help='识别后端 (默认: fake)')
+    parser.add_argument('--model', type=str, help='识别模型名称')
+    parser.add_argument('--full', action='store_true', help='整条音轨交给后端，而不是按30秒窗口批量解码')
+    parser.add_argument('--mel', action='store_true', help='窗口从缓存的log-mel特征中截取 (MelWindow)')
+    parser.add_argument('--output', type=str, help='结果JSON路径 (默认: benchmarks/results/decode_<时间>_<commit>.json)')
+    parser.add_argument('--verbose', action='store_true', help='显示被测函数的输出')
+    args = parser.parse_args()
+
+    from asr_backends import SAMPLE_RATE, get_backend
+    from audio_io import load_audio
+
+    missing = [path for path in args.audio if not Path(path).exists()]
+    if missing:
+        print(f"❌ 音频文件不存在: {', '.join(missing)}")
+        sys.exit(1)
+
+    if args.mel and args.full:
+        print("❌ --mel 只用于按窗口批量解码，不能与 --full 一起使用")
+        sys.exit(1)
+
+    commit = git_commit()
+    # fake后端默认不接受特征输入，--mel 时按80维特征处理
+    options = {"n_mels": 80} if args.mel and args.backend == "fake" else {}
+    backend = get_backend(args.backend, args.model, **options)
+    if args.mel and backend.n_mels is None:
+        print(f"❌ {backend.describe()} 不支持特征输入")
+        sys.exit(1)
+    synthetic = not args.audio
+    if synthetic:
+        print(f"🧪 解码对比: {args.meetings} 个 {args.duration:.0f}秒合成会议, {backend.describe()}, commit {commit}")
+    else:
+        print(f"🧪 解码对比: {len(args.audio)} 条录音, {backend.describe()}, commit {commit}")
+    if synthetic or args.backend == "fake":
+        print("⚠️ 合成音频或fake后端只验证流程，速度和一致性数据没有意义")
+    with quiet(not args.verbose):
+        backend.load()
+
+    work_dir = Path(tempfile.mkdtemp(prefix="vmt_decode_"))
+    if synthetic:
+        sources = []
+        for i in range(args.meetings):
+            paths = write_meeting(SynthConfig(duration=args.duration, seed=args.seed + i),
+                                  work_dir, f"meeting{i}")
+            sources += [(f"meeting{i} 自己", paths["self"]), (f"meeting{i} 对方", paths["other"])]
+    else:
+        sources = [(Path(path).name, Path(path)) for path in args.audio]
+
+    if args.mel:
+        from mel_cache import load_features
+        # 合成音频的特征放在临时目录，真实录音使用默认缓存目录
+        mel_dir = work_dir / "mel" if synthetic else None
+
+    tracks = []
+    totals = {mode: {"seconds": 0.0, "tokens": 0} for mode in ("beam", "adaptive")}
+    audio_seconds = 0.0
+    try:
+        for name, path in sources:
+            audio, _ = load_audio(path, sr=SAMPLE_RATE)
+            if args.seconds:
+                audio = audio[:int(args.seconds * SAMPLE_RATE)]
+            audio_seconds += len(audio) / SAMPLE_RATE
+            features = None
+            if args.mel:
+                with quiet(not args.verbose):
+                    features = load_features(path, backend.n_mels, cache_dir=mel_dir)
+            runs = {}
+            for mode in ("beam", "adaptive"):
+                backend.decoding = mode
+                with quiet(not args.verbose):
+                    runs[mode] = decode_track(backend, audio, args.full, features)
+                totals[mode]["seconds"] += runs[mode]["seconds"]
+                totals[mode]["tokens"] += runs[mode]["tokens"]
+            agreement = word_agreement(runs["beam"].pop("result"), runs["adaptive"].pop("result"))
+            tracks.append({"track": name, "audio_seconds": round(len(audio) / SAMPLE_RATE, 1),
+                           "agreement": round(agreement, 4), **runs})
+            print(f"  {name}: beam {runs['beam']['tokens_per_second']:8.1f} tok/s, "
+                  f"adaptive {runs['adaptive']['tokens_per_second']:8.1f} tok/s, "
+                  f"一致率 {agreement:.1%}, 路径 {runs['adaptive']['decode_paths']}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    summary = {}
+    for mode, total in totals.items():
+        summary[mode] = {
+            "seconds": round(total["seconds"], 4),
+            "tokens_per_second": round(total["tokens"] / total["seconds"], 1) if total["seconds"] else 0.0,
+            "rtf": round(total["seconds"] / audio_seconds, 5) if audio_seconds else 0.0,
+        }
+    summary["mean_agreement"] = round(sum(t["agreement"] for t in tracks) / len(tracks), 4) if tracks else None
+    summary["speedup"] = round(totals["beam"]["seconds"] / totals["adaptive"]["seconds"], 3) \
+        if totals["adaptive"]["seconds"] else None
+
+    print(f"📊 beam: {summary['beam']['tokens_per_second']:.1f} tok/s (RTF {summary['beam']['rtf']:.4f}), "
+          f"adaptive: {summary['adaptive']['tokens_per_second']:.1f} tok/s (RTF {summary['adaptive']['rtf']:.4f}), "
+          f"加速 {summary['speedup']}x, 平均一致率 {summary['mean_agreement']:.1%}")
+
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "backend": backend.describe(),
+        "synthetic": synthetic,
+        "params": {"audio": args.audio, "seconds": args.seconds, "meetings": args.meetings,
+                   "duration": args.duration, "seed": args.seed,
+                   "backend": args.backend, "model": args.model, "full": args.full, "mel": args.mel},
+        "summary": summary,
+        "tracks": tracks,
+    }
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"decode_{datetime.now().strftime('%Y%m%d-%H%M%S')}_{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ 结果已保存: {output}")
+
+
+if __name__ == '__main__':
+    main()
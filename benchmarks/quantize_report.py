@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+int8量化模型对比报告
+在样本音频上分别用fp32和int8动态量化的whisper模型转录，比较：
+  - 加载:   fp32加载时间、第一次量化转换时间、之后读取缓存的时间
+  - 内存:   模型权重大小、进程峰值内存
+  - 速度:   转录耗时、实时率、每秒解码的token数
+  - 准确度: int8结果与fp32结果的词级一致率
+
+合成会议音频不是真正的语音，这个报告需要真实录音（例如 recordings/ 中的 *_对方.wav）。
+每个模型在单独的子进程中运行，峰值内存互不影响。
+
+用法:
+  python3 benchmarks/quantize_report.py recordings/xxx/xxx_对方.wav --model medium
+  python3 benchmarks/quantize_report.py a.wav b.wav --model small --seconds 300 --threads 8
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+sys.path.insert(0, str(BENCH_DIR))
+os.environ.setdefault("VMT_METRICS_FILE", "off")
+
+from run_benchmarks import RESULTS_DIR, git_commit  # noqa: E402
+from decode_report import word_agreement  # noqa: E402
+
+
+def peak_memory_mb() -> float:
+    # Linux上ru_maxrss的单位是KB，macOS上是字节
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 1024 / 1024 if sys.platform == "darwin" else rss / 1024
+
+
+def run_variant(model_name: str, quantize, audio_files, seconds: float, threads: int) -> dict:
+    """在当前进程中加载一个模型并转录所有样本（由子进程调用）"""
+    import torch
+    from asr_backends import SAMPLE_RATE, get_backend, read_audio
+    from quantize import cache_path, load_quantized_model, model_bytes
+
+    if threads:
+        torch.set_num_threads(threads)
+    result = {"quantize": quantize, "threads": torch.get_num_threads()}
+
+    if quantize:
+        path = cache_path(model_name, quantize)
+        if not path.exists():
+            start = time.perf_counter()
+            load_quantized_model(model_name, quantize, verbose=False)
+            result["convert_seconds"] = round(time.perf_counter() - start, 3)
+    backend = get_backend("whisper", model_name, quantize=quantize)
+    start = time.perf_counter()
+    backend.load()
+    result["load_seconds"] = round(time.perf_counter() - start, 3)
+    result["weights_mb"] = round(model_bytes(backend._model) / 1024 / 1024, 1)
+
+    samples = []
+    for audio_file in audio_files:
+        audio = read_audio(audio_file)
+        if seconds:
+            audio = audio[:int(seconds * SAMPLE_RATE)]
+        start = time.perf_counter()
+        segments = backend.transcribe(audio)
+        elapsed = time.perf_counter() - start
+        tokens = sum(seg.get("num_tokens", 0) for seg in segments)
+        samples.append({
+            "audio": str(audio_file),
+            "audio_seconds": round(len(audio) / SAMPLE_RATE, 1),
+            "seconds": round(elapsed, 3),
+            "rtf": round(elapsed / (len(audio) / SAMPLE_RATE), 4) if len(audio) else 0.0,
+            "tokens_per_second": round(tokens / elapsed, 1) if elapsed else 0.0,
+            "segments": [{"start": s["start"], "end": s["end"], "text": s["text"]} for s in segments],
+        })
+    result["samples"] = samples
+    result["peak_memory_mb"] = round(peak_memory_mb(), 1)
+    return result
+
+
+def run_in_subprocess(args, quantize) -> dict:
+    cmd = [sys.executable, __file__, "--worker", "--model", args.model,
+           "--seconds", str(args.seconds), "--threads", str(args.threads)]
+    if quantize:
+        cmd += ["--quantize", quantize]
+    cmd += [str(path) for path in args.audio]
+    completed = subprocess.run(cmd, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"{quantize or 'fp32'} 运行失败:\n{completed.stderr[-2000:]}")
+    # 结果在最后一行，前面可能有模型加载时的输出
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="比较fp32与int8动态量化whisper模型的速度、内存和结果一致性")
+    parser.add_argument('audio', nargs='+', help='样本音频文件（真实录音）')
+    parser.add_argument('--model', type=str, default='small', help='whisper模型 (默认: small)')
+    parser.add_argument('--quantize', type=str, default='int8', help='量化方式 (默认: int8)')
+    parser.add_argument('--seconds', type=float, default=120.0, help='每个样本只转录前N秒，0表示全部 (默认: 120)')
+    parser.add_argument('--threads', type=int, default=0, help='PyTorch线程数，0表示默认')
+    parser.add_argument('--output', type=str, help='结果JSON路径 (默认: benchmarks/results/quantize_<时间>_<commit>.json)')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = run_variant(args.model, args.quantize if args.quantize != "none" else None,
+                             args.audio, args.seconds, args.threads)
+        print(json.dumps(result, ensure_ascii=False))
+        return
+
+    missing = [path for path in args.audio if not Path(path).exists()]
+    if missing:
+        print(f"❌ 音频文件不存在: {', '.join(missing)}")
+        sys.exit(1)
+
+    commit = git_commit()
+    print(f"🧪 量化对比: whisper {args.model}, fp32 vs {args.quantize}, {len(args.audio)} 个样本, commit {commit}")
+    try:
+        baseline = run_in_subprocess(args, "none")
+        quantized = run_in_subprocess(args, args.quantize)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    for fp32_sample, q_sample in zip(baseline["samples"], quantized["samples"]):
+        q_sample["agreement"] = round(word_agreement(fp32_sample["segments"], q_sample["segments"]), 4)
+        print(f"  {Path(q_sample['audio']).name}: fp32 {fp32_sample['seconds']:.1f}秒 "
+              f"(RTF {fp32_sample['rtf']:.3f}), {args.quantize} {q_sample['seconds']:.1f}秒 "
+              f"(RTF {q_sample['rtf']:.3f}), 一致率 {q_sample['agreement']:.1%}")
+
+    fp32_seconds = sum(s["seconds"] for s in baseline["samples"])
+    q_seconds = sum(s["seconds"] for s in quantized["samples"])
+    summary = {
+        "speedup": round(fp32_seconds / q_seconds, 3) if q_seconds else None,
+        "mean_agreement": round(sum(s["agreement"] for s in quantized["samples"]) / len(quantized["samples"]), 4),
+        "weights_mb": {"fp32": baseline["weights_mb"], args.quantize: quantized["weights_mb"]},
+        "peak_memory_mb": {"fp32": baseline["peak_memory_mb"], args.quantize: quantized["peak_memory_mb"]},
+        "load_seconds": {"fp32": baseline["load_seconds"], args.quantize: quantized["load_seconds"]},
+    }
+    if "convert_seconds" in quantized:
+        summary["convert_seconds"] = quantized["convert_seconds"]
+    print(f"📊 加速 {summary['speedup']}x, 平均一致率 {summary['mean_agreement']:.1%}, "
+          f"权重 {baseline['weights_mb']:.0f} -> {quantized['weights_mb']:.0f} MB, "
+          f"峰值内存 {baseline['peak_memory_mb']:.0f} -> {quantized['peak_memory_mb']:.0f} MB, "
+          f"加载 {baseline['load_seconds']:.1f} -> {quantized['load_seconds']:.1f}秒")
+
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "params": {"model": args.model, "quantize": args.quantize, "seconds": args.seconds,
+                   "threads": args.threads, "audio": args.audio},
+        "summary": summary,
+        "fp32": baseline,
+        args.quantize: quantized,
+    }
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"quantize_{datetime.now().strftime('%Y%m%d-%H%M%S')}_{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ 结果已保存: {output}")
+
+
+if __name__ == '__main__':
+    main()
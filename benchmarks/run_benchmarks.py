@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流水线基准测试
+用合成的双音轨会议跑一遍处理流程，分别计时每个阶段：
+  synth      生成合成音频（和MKV）
+  extract    extract_audio_tracks 从MKV中提取音轨1/2（需要ffmpeg）
+  silence    split_audio 的静音检测
+  split      split_audio 的智能分割
+  vad        split_audio 的能量VAD（自己音轨：语音区域检测 + 拼接紧凑音频）
+  crosstalk  crosstalk 的串音检测（合成时可用 --bleed-level 让自己音轨带上对方的串音）
+  transcribe transcribe_audio（用fake后端代替Whisper，只测框架开销）
+  merge      合并两路转录并排序
+  serialize  JSON序列化写盘
+  scan       scan_recordings 扫描N个合成会议文件夹（冷启动和增量两次）
+
+结果写成JSON（默认 benchmarks/results/<时间>_<commit>.json），
+用 benchmarks/compare.py 比较两次结果。
+
+用法:
+  python3 benchmarks/run_benchmarks.py
+  python3 benchmarks/run_benchmarks.py --duration 1800 --repeat 3
+  python3 benchmarks/run_benchmarks.py --stages silence split merge
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import argparse
+import tempfile
+import subprocess
+import contextlib
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = BENCH_DIR.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+sys.path.insert(0, str(PROJECT_ROOT / "web"))
+sys.path.insert(0, str(BENCH_DIR))
+# 基准测试不往 recordings/.metrics.jsonl 里写阶段指标
+os.environ.setdefault("VMT_METRICS_FILE", "off")
+
+from synth_meeting import SynthConfig, write_meeting, write_mkv  # noqa: E402
+
+STAGES = ("synth", "extract", "silence", "split", "vad", "crosstalk", "transcribe", "merge", "serialize", "scan")
+RESULTS_DIR = BENCH_DIR / "results"
+
+
+def git_commit() -> str:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, timeout=10)
+        return result.stdout.strip() or "unknown"
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool = True):
+    """屏蔽被测函数的进度输出（print和logging），避免终端IO影响计时"""
+    if not enabled:
+        yield
+        return
+    previous = logging.root.manager.disable
+    logging.disable(logging.CRITICAL)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            yield
+    finally:
+        logging.disable(previous)
+
+
+class BenchmarkRunner:
+    """依次运行各阶段并记录耗时"""
+
+    def __init__(self, work_dir: Path, config: SynthConfig, repeat: int = 1,
+                 scan_meetings: int = 50, backend: str = "fake", model: str = None,
+                 verbose: bool = False):
+        self.work_dir = work_dir
+        self.config = config
+        self.repeat = repeat
+        self.scan_meetings = scan_meetings
+        self.backend = backend
+        self.model = model
+        self.verbose = verbose
+        self.results = {}
+        self.paths = {}
+        self.transcriptions = []
+        self.merged = []
+
+    def timed(self, name: str, func, repeat: int = None):
+        """运行 repeat 次，记录每次耗时，返回最后一次的结果"""
+        times = []
+        value = None
+        for _ in range(repeat or self.repeat):
+            with quiet(not self.verbose):
+                start = time.perf_counter()
+                value = func()
+                times.append(time.perf_counter() - start)
+        self.results[name] = {
+            "seconds": min(times),
+            "runs": [round(t, 6) for t in times],
+            "rtf": min(times) / self.config.duration,
+        }
+        print(f"⏱️ {name:<12} {min(times):9.4f}s  (RTF {min(times) / self.config.duration:.5f})")
+        return value
+
+    def skip(self, name: str, reason: str):
+        self.results[name] = {"skipped": reason}
+        print(f"⏭️ {name:<12} 跳过: {reason}")
+
+    # ------------------------------------------------------------ 阶段
+
+    def stage_synth(self):
+        def run():
+            paths = write_meeting(self.config, self.work_dir / "audio", "synth")
+            paths["mkv"] = self.work_dir / "audio" / "synth.mkv"
+            if not write_mkv(paths["self"], paths["other"], paths["mkv"], self.config.duration):
+                paths["mkv"] = None
+            return paths
+        self.paths = self.timed("synth", run, repeat=1)
+
+    def stage_extract(self):
+        if not self.paths.get("mkv"):
+            self.skip("extract", "没有ffmpeg，无法生成MKV")
+            return
+        from extract_audio_tracks import AudioTrackExtractor
+        extractor = AudioTrackExtractor(log_level="ERROR")
+
+        def run():
+            success, files = extractor.extract_dual_tracks(str(self.paths["mkv"]), [1, 2])
+            if not success:
+                raise RuntimeError("音轨提取失败")
+            return files
+        self.timed("extract", run)
+
+    def stage_silence(self):
+        import librosa
+        from split_audio import find_silence_segments
+        audio, sr = librosa.load(str(self.paths["other"]), sr=None)
+        segments = self.timed("silence", lambda: find_silence_segments(audio, sr))
+        self.results["silence"]["segments"] = len(segments)
+
+    def stage_split(self):
+        from split_audio import split_audio_file
+        output_dir = self.work_dir / "split"
+
+        def run():
+            shutil.rmtree(output_dir, ignore_errors=True)
+            return split_audio_file(str(self.paths["other"]), str(output_dir), num_parts=4)
+        self.timed("split", run)
+
+    def stage_vad(self):
+        import librosa
+        from split_audio import find_speech_regions, compact_speech
+        audio, sr = librosa.load(str(self.paths["self"]), sr=None)
+
+        def run():
+            regions = find_speech_regions(audio, sr)
+            return compact_speech(audio, sr, regions)
+        compact, _ = self.timed("vad", run)
+        self.results["vad"]["speech_ratio"] = round(len(compact) / len(audio), 4)
+
+    def stage_crosstalk(self):
+        import librosa
+        from crosstalk import detect_crosstalk
+        self_audio, sr = librosa.load(str(self.paths["self"]), sr=16000)
+        other_audio, _ = librosa.load(str(self.paths["other"]), sr=16000)
+        regions = self.timed("crosstalk", lambda: detect_crosstalk(self_audio, other_audio, sr))
+        self.results["crosstalk"]["bleed_seconds"] = {
+            speaker: round(sum(end - start for start, end in speaker_regions), 2)
+            for speaker, speaker_regions in regions.items()
+        }
+
+    def stage_transcribe(self):
+        from asr_backends import get_backend
+        from whisper_transcribe import transcribe_audio
+        backend = get_backend(self.backend, self.model)
+
+        def run():
+            return [
+                transcribe_audio(self.paths["self"], "自己", backend),
+                transcribe_audio(self.paths["other"], "对方", backend),
+            ]
+        with quiet(not self.verbose):
+            backend.load()
+        self.transcriptions = self.timed("transcribe", run)
+        self.results["transcribe"]["backend"] = backend.describe()
+        self.results["transcribe"]["segments"] = sum(len(t) for t in self.transcriptions)
+
+    def stage_merge(self):
+        from whisper_transcribe import merge_and_sort_transcriptions
+        # 扩大规模，让合并排序的耗时可以测量
+        scale = 20
+        inputs = [
+            [dict(seg, start=seg['start'] + k * self.config.duration, end=seg['end'] + k * self.config.duration)
+             for k in range(scale) for seg in track]
+            for track in self.transcriptions
+        ]
+        self.merged = self.timed("merge", lambda: merge_and_sort_transcriptions(inputs))
+        self.results["merge"]["segments"] = len(self.merged)
+
+    def stage_serialize(self):
+        output_file = self.work_dir / "synth_transcription.json"
+
+        def run():
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(self.merged, f, ensure_ascii=False, indent=2)
+        self.timed("serialize", run)
+        self.results["serialize"]["bytes"] = output_file.stat().st_size
+
+    def stage_scan(self):
+        from scan_recordings import scan_recordings
+        recordings_dir = self.work_dir / "recordings"
+        output_file = self.work_dir / "recordings_list.js"
+        video_source = self.paths.get("mkv")
+        transcript = self.work_dir / "synth_transcription.json"
+
+        shutil.rmtree(recordings_dir, ignore_errors=True)
+        recordings_dir.mkdir(parents=True)
+        for i in range(self.scan_meetings):
+            folder = recordings_dir / f"Teacher{i % 5}_2025-01-{i % 28 + 1:02d} 10-{i // 28:02d}-00"
+            folder.mkdir()
+            if video_source:
+                # 硬链接避免复制大文件；不同文件系统时退回复制
+                target = folder / f"{folder.name}.mkv"
+                try:
+                    target.hardlink_to(video_source)
+                except (OSError, AttributeError):
+                    shutil.copy2(video_source, target)
+            if transcript.exists():
+                shutil.copy2(transcript, folder / f"{folder.name}_transcription.json")
+
+        self.timed("scan", lambda: scan_recordings(force=True, recordings_dir=recordings_dir,
+                                                   output_file=output_file), repeat=1)
+        self.results["scan_cold"] = self.results.pop("scan")
+        self.timed("scan", lambda: scan_recordings(recordings_dir=recordings_dir, output_file=output_file))
+        self.results["scan_incremental"] = self.results.pop("scan")
+        for key in ("scan_cold", "scan_incremental"):
+            self.results[key]["meetings"] = self.scan_meetings
+
+    def run(self, stages):
+        # synth是后续所有阶段的输入，总是运行
+        self.stage_synth()
+        for name in stages:
+            if name == "synth":
+                continue
+            try:
+                getattr(self, f"stage_{name}")()
+            except ImportError as e:
+                self.skip(name, f"缺少依赖: {e}")
+        return self.results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用合成会议音频测量处理流程各阶段的耗时")
+    parser.add_argument('--duration', type=float, default=600.0, help='合成会议时长（秒，默认: 600）')
+    parser.add_argument('--seed', type=int, default=1234, help='随机种子')
+    parser.add_argument('--bleed-level', type=float, default=0.0, help='对方声音串入自己音轨的比例 (默认: 0)')
+    parser.add_argument('--repeat', type=int, default=3, help='每个阶段重复次数，取最小值 (默认: 3)')
+    parser.add_argument('--scan-meetings', type=int, default=50, help='扫描阶段的合成会议数量 (默认: 50)')
+    parser.add_argument('--backend', type=str, default='fake',
+                        help='转录阶段使用的识别后端 (默认: fake，不需要下载模型)')
+    parser.add_argument('--model', type=str, help='识别模型名称')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES), help='要运行的阶段')
+    parser.add_argument('--output', type=str, help='结果JSON路径 (默认: benchmarks/results/<时间>_<commit>.json)')
+    parser.add_argument('--keep', action='store_true', help='保留临时工作目录')
+    parser.add_argument('--verbose', action='store_true', help='显示被测函数的输出')
+    args = parser.parse_args()
+
+    config = SynthConfig(duration=args.duration, seed=args.seed, bleed_level=args.bleed_level)
+    commit = git_commit()
+    work_dir = Path(tempfile.mkdtemp(prefix="vmt_bench_"))
+    print(f"🧪 基准测试: {args.duration:.0f}秒合成会议, commit {commit}, 工作目录 {work_dir}")
+
+    try:
+        runner = BenchmarkRunner(work_dir, config, repeat=args.repeat,
+                                 scan_meetings=args.scan_meetings, backend=args.backend,
+                                 model=args.model, verbose=args.verbose)
+        results = runner.run(args.stages)
+    finally:
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "commit": commit,
+        "timestamp": datetime.now().isoformat(timespec='seconds'),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "audio_seconds": config.duration,
+        "params": {"seed": args.seed, "bleed_level": args.bleed_level, "repeat": args.repeat, "scan_meetings": args.scan_meetings,
+                   "backend": args.backend, "model": args.model},
+        "stages": results,
+    }
+
+    output = Path(args.output) if args.output else \
+        RESULTS_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}_{commit}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ 结果已保存: {output}")
+
+
+if __name__ == '__main__':
+    main()
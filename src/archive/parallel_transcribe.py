@@ -1,13 +1,17 @@
 import os
+import sys
 import json
 import time
 import logging
 import argparse
 from typing import List, Dict
-from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures import as_completed
 import whisper
 import librosa
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from cpu_scheduler import plan_workers
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
@@ -72,13 +76,13 @@ def parallel_transcribe(audio_parts: List[str],
         segment_start_time = i * 720  # 假设每个分片12分钟（720秒）
         tasks.append((audio_file, model, f"part_{i}", segment_start_time))
     
-    # 创建进程池
-    num_processes = min(len(tasks), os.cpu_count())
-    logger.info(f"🔄 创建进程池: {num_processes}个进程")
+    # 创建进程池：按可用物理核心和cgroup配额分配进程数和每个进程的线程数，避免线程超额订阅
+    plan = plan_workers(len(tasks))
+    logger.info(f"🔄 创建进程池: {plan.describe()}")
     
     # 执行转录任务
     results = []
-    with ProcessPoolExecutor(max_workers=num_processes) as executor:
+    with plan.executor() as executor:
         # 提交所有任务
         future_to_task = {executor.submit(transcribe_segment, task): task for task in tasks}
         
@@ -0,0 +1,741 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+语音识别后端
+统一的识别引擎接口，转录流程不再直接依赖某一个库：
+  - whisper:        openai-whisper（PyTorch）
+  - faster-whisper: CTranslate2，CPU上默认int8量化，通常是CPU最快的选择
+  - fake:           确定性的假引擎，按能量切分有声区域并生成固定文本，
+                    测试和基准测试时不需要下载任何模型
+
+使用哪个后端由 config/config.yaml 中的 transcription.backend 决定，
+命令行的 --backend 参数优先。
+
+解码策略 (transcription.decoding / --decoding):
+  - beam:     始终使用beam search（默认）
+  - greedy:   始终使用贪心解码
+  - adaptive: 先贪心解码，只有平均对数概率或压缩率检查不通过的窗口才用beam search重新解码
+每个片段的 decode_path 字段记录实际使用的解码方式；whisper的beam search结果没有通过
+压缩率/对数概率检查时会改用温度采样重新解码，这些片段记为 sampled。
+
+用法:
+  python3 src/asr_backends.py --list
+  python3 src/asr_backends.py recordings/xxx/xxx_对方.wav --backend fake
+
+作者: VideoMeetingTranscript
+"""
+
+import os
+import json
+import zlib
+import random
+import argparse
+from collections import Counter
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+CONFIG_FILE = Path(__file__).parent.parent / "config" / "config.yaml"
+
+DEFAULT_BACKEND = "whisper"
+DEFAULT_MODEL = "small"
+DEFAULT_LANGUAGE = "en"
+SAMPLE_RATE = 16000
+# Whisper时间戳token的精度（秒）
+TIMESTAMP_RESOLUTION = 0.02
+# 片段的置信度字段（级联解码和自适应解码据此决定是否重新识别）
+CONFIDENCE_FIELDS = ("avg_logprob", "compression_ratio", "no_speech_prob")
+# 自适应解码和级联解码写入转录结果的片段附加字段（实际的解码路径和置信度），见 ASRBackend.segment_fields
+SEGMENT_FIELDS = ("decode_path",) + CONFIDENCE_FIELDS
+
+DECODING_MODES = ("beam", "greedy", "adaptive")
+DEFAULT_DECODING = "beam"
+# 自适应解码回退到beam search的条件（与Whisper温度回退的默认条件相同）
+FALLBACK_LOGPROB_THRESHOLD = -1.0
+FALLBACK_COMPRESSION_THRESHOLD = 2.4
+# 重新识别区域两侧的余量、合并间隔和最大长度（秒）
+REGION_PADDING = 0.5
+REGION_MERGE_GAP = 1.0
+MAX_REGION_SECONDS = 30.0
+
+
+def load_transcription_config(config_file=CONFIG_FILE) -> dict:
+    """
+    读取配置文件中的 transcription 部分
+
+    没有配置文件或没有安装PyYAML时返回空字典（全部使用默认值）
+    """
+    try:
+        import yaml
+    except ImportError:
+        return {}
+    try:
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+    return config.get("transcription") or {}
+
+
+class ASRBackend:
+    """
+    识别后端基类
+
+    子类实现 _load_model() 和 _transcribe()；模型在第一次识别时才加载。
+    实例可以传给子进程：序列化时不带已加载的模型，子进程中按需重新加载。
+    """
+
+    name = "base"
+    # 能力标记，调用方据此决定是否自行分片、做VAD等
+    capabilities = {
+        "batching": False,         # transcribe_batch 一次解码多个窗口（否则逐个识别）
+        "vad": False,              # 内置语音活动检测
+        "word_timestamps": False,  # 支持词级时间戳
+        "quantize": False,         # 支持 --quantize int8
+    }
+
+    # 贪心解码和beam search对应的解码参数（在默认解码参数上覆盖）
+    GREEDY_OPTIONS = {}
+    BEAM_OPTIONS = {}
+
+    def __init__(self, model_size: str = DEFAULT_MODEL, language: str = DEFAULT_LANGUAGE,
+                 decoding: str = DEFAULT_DECODING, **options):
+        if decoding not in DECODING_MODES:
+            raise ValueError(f"未知的解码策略: {decoding} (可选: {', '.join(DECODING_MODES)})")
+        self.model_size = model_size
+        self.language = language
+        self.decoding = decoding
+        self.options = options
+        self.decode_stats = Counter()
+        self._model = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_model"] = None
+        return state
+
+    def describe(self) -> str:
+        suffix = f", {self.decoding}" if self.decoding != DEFAULT_DECODING else ""
+        return f"{self.name} ({self.model_size}{suffix})"
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def segment_fields(self) -> Tuple[str, ...]:
+        """写入转录结果的片段附加字段；只有自适应解码需要记录每个片段实际走的路径"""
+        return SEGMENT_FIELDS if self.decoding == "adaptive" else ()
+
+    def load(self):
+        """加载模型（重复调用不会重新加载）"""
+        if self._model is None:
+            self._model = self._load_model()
+        return self
+
+    def transcribe(self, audio, **options) -> List[dict]:
+        """
+        识别一段音频
+
+        Args:
+            audio: 音频文件路径，16kHz单声道float32数组，
+                   或者 mel_cache.MelFeatures（只有 n_mels 不为None的后端支持）
+            options: 覆盖默认解码参数
+
+        Returns:
+            list: [{"start", "end", "text"}]，时间单位为秒，按开始时间排序；
+                  后端能给出时还包含置信度字段 avg_logprob / compression_ratio / no_speech_prob
+        """
+        self.load()
+        if self.decoding == "adaptive":
+            return self._transcribe_adaptive(audio, **options)
+        segments = self._transcribe(audio, **self._path_options(self.decoding, options))
+        return mark_decode_path(segments, self.decoding)
+
+    def transcribe_batch(self, windows, **options) -> List[List[dict]]:
+        """
+        识别一批不超过30秒的音频窗口
+
+        Args:
+            windows: 16kHz单声道float32数组的列表（支持特征输入的后端也可以是 mel_cache.MelWindow）
+            options: 覆盖默认解码参数
+
+        Returns:
+            list: 与windows一一对应的片段列表，时间相对于各自窗口的开头
+        """
+        self.load()
+        if not windows:
+            return []
+        if self.decoding == "adaptive":
+            return self._transcribe_batch_adaptive(windows, **options)
+        results = self._transcribe_batch(windows, **self._path_options(self.decoding, options))
+        self.decode_stats["windows"] += len(windows)
+        return [mark_decode_path(segments, self.decoding) for segments in results]
+
+    # 后端使用的log-mel维数；为None表示不能直接使用缓存的特征
+    n_mels = None
+
+    def features_for(self, audio):
+        """
+        音频文件对应的缓存log-mel特征（见 mel_cache.py）
+
+        Returns:
+            MelFeatures，后端不支持特征输入、未启用缓存或audio不是文件时返回None
+        """
+        return None
+
+    def _path_options(self, path: str, options: dict) -> dict:
+        return dict(self.GREEDY_OPTIONS if path == "greedy" else self.BEAM_OPTIONS, **options)
+
+    def _needs_beam(self, segments: List[dict]) -> bool:
+        return any(low_confidence_reason(seg, FALLBACK_LOGPROB_THRESHOLD, FALLBACK_COMPRESSION_THRESHOLD)
+                   for seg in segments)
+
+    def _transcribe_adaptive(self, audio, **options) -> List[dict]:
+        """整段音频先贪心解码，检查不通过的片段所在区域用beam search重新解码"""
+        features = self.features_for(audio)
+        audio = features if features is not None else read_audio(audio)
+        segments = mark_decode_path(self._transcribe(audio, **self._path_options("greedy", options)), "greedy")
+        flagged = [seg for seg in segments if self._needs_beam([seg])]
+        self.decode_stats["segments"] += len(segments)
+        if not flagged:
+            return segments
+        regions = redecode_regions(flagged, source_seconds(audio))
+        clips = [clip_source(audio, start, end) for start, end in regions]
+        redecoded = [mark_decode_path(r, "beam") for r in
+                     self._transcribe_batch(clips, **self._path_options("beam", options))]
+        self.decode_stats["beam_segments"] += len(flagged)
+        self.decode_stats["beam_seconds"] += sum(end - start for start, end in regions)
+        self._count_sampled(redecoded)
+        return splice_regions(segments, regions, redecoded)
+
+    def _transcribe_batch_adaptive(self, windows, **options) -> List[List[dict]]:
+        """整批窗口先贪心解码，检查不通过的窗口再一起用beam search解码"""
+        results = self._transcribe_batch(windows, **self._path_options("greedy", options))
+        results = [mark_decode_path(segments, "greedy") for segments in results]
+        retry = [i for i, segments in enumerate(results) if self._needs_beam(segments)]
+        self.decode_stats["windows"] += len(windows)
+        if retry:
+            redecoded = self._transcribe_batch([windows[i] for i in retry], **self._path_options("beam", options))
+            for i, segments in zip(retry, redecoded):
+                results[i] = mark_decode_path(segments, "beam")
+            self.decode_stats["beam_windows"] += len(retry)
+            self.decode_stats["beam_seconds"] += sum(source_seconds(windows[i]) for i in retry)
+            self._count_sampled(results[i] for i in retry)
+        return results
+
+    def _count_sampled(self, results):
+        """回退结果中实际用温度采样解码的片段数（见 WhisperBackend.BEAM_OPTIONS）"""
+        self.decode_stats["sampled_segments"] += sum(
+            seg.get("decode_path") == "sampled" for segments in results for seg in segments)
+
+    def format_decode_stats(self, stats=None) -> str:
+        s = self.decode_stats if stats is None else stats
+        sampled = f"，其中 {s['sampled_segments']} 个片段改用了温度采样" if s["sampled_segments"] else ""
+        if s["windows"]:
+            return (f"{s['beam_windows']}/{s['windows']} 个窗口回退到beam search "
+                    f"({s['beam_seconds']:.1f}秒){sampled}")
+        return (f"{s['beam_segments']}/{s['segments']} 个片段回退到beam search "
+                f"({s['beam_seconds']:.1f}秒){sampled}")
+
+    def _transcribe_batch(self, windows, **options) -> List[List[dict]]:
+        # 不支持批量解码的后端逐个识别
+        return [self._transcribe(window, **options) for window in windows]
+
+    def _load_model(self):
+        raise NotImplementedError
+
+    def _transcribe(self, audio, **options) -> List[dict]:
+        raise NotImplementedError
+
+
+def parse_timestamped_tokens(tokens, timestamp_begin: int, decode, duration: float) -> List[dict]:
+    """
+    把带时间戳的Whisper输出token拆成片段
+
+    token序列形如 <|0.00|> 文本 <|2.40|><|2.40|> 文本 <|5.00|>，
+    成对的时间戳token之间的文本是一个片段；没有结束时间戳的结尾文本延续到窗口末尾。
+
+    Args:
+        tokens: 输出token（不含SOT等前缀）
+        timestamp_begin: 第一个时间戳token的id
+        decode: 把文本token列表解码成字符串的函数
+        duration: 窗口实际时长（秒），时间戳不会超过它
+    """
+    segments = []
+    start = None
+    text_tokens = []
+    for token in tokens:
+        if token < timestamp_begin:
+            text_tokens.append(token)
+            continue
+        time = min((token - timestamp_begin) * TIMESTAMP_RESOLUTION, duration)
+        if start is not None and text_tokens:
+            segments.append({"start": start, "end": max(time, start), "text": decode(text_tokens),
+                             "num_tokens": len(text_tokens)})
+            start = None
+            text_tokens = []
+        else:
+            start = time
+    if text_tokens:
+        segments.append({"start": start or 0.0, "end": duration, "text": decode(text_tokens),
+                         "num_tokens": len(text_tokens)})
+    return [seg for seg in segments if seg["text"].strip()]
+
+
+def mark_decode_path(segments: List[dict], path: str) -> List[dict]:
+    """记录片段的解码方式（已经记录过的不覆盖，例如级联解码内部的结果）"""
+    for seg in segments:
+        seg.setdefault("decode_path", path)
+    return segments
+
+
+def low_confidence_reason(segment: dict, logprob_threshold: float, compression_threshold: float,
+                          no_speech_threshold: Optional[float] = None) -> Optional[str]:
+    """片段没有通过哪项置信度检查；没有置信度字段的片段视为可靠"""
+    if segment.get("compression_ratio", 0.0) > compression_threshold:
+        return "compression"
+    if segment.get("avg_logprob", 0.0) < logprob_threshold:
+        return "logprob"
+    if no_speech_threshold is not None and segment.get("no_speech_prob", 0.0) > no_speech_threshold:
+        return "no_speech"
+    return None
+
+
+def redecode_regions(segments: List[dict], duration: float, padding: float = REGION_PADDING,
+                     merge_gap: float = REGION_MERGE_GAP,
+                     max_seconds: float = MAX_REGION_SECONDS) -> List[Tuple[float, float]]:
+    """把需要重新识别的片段扩展、合并成区域（每个区域不超过max_seconds）"""
+    regions = []
+    for seg in sorted(segments, key=lambda s: s['start']):
+        start = max(0.0, seg['start'] - padding)
+        end = min(duration, seg['end'] + padding)
+        if regions and start - regions[-1][1] <= merge_gap and end - regions[-1][0] <= max_seconds:
+            regions[-1] = (regions[-1][0], max(regions[-1][1], end))
+        else:
+            regions.append((start, end))
+    # 单个超长片段按max_seconds切开
+    result = []
+    for start, end in regions:
+        while end - start > max_seconds:
+            result.append((start, start + max_seconds))
+            start += max_seconds
+        result.append((start, end))
+    return result
+
+
+def splice_regions(segments: List[dict], regions: List[Tuple[float, float]],
+                   redecoded: List[List[dict]]) -> List[dict]:
+    """
+    用重新识别的结果替换区域内的原有片段
+
+    Args:
+        segments: 原有片段
+        regions: 重新识别的区域
+        redecoded: 与regions一一对应的新片段，时间相对于区域开头
+    """
+    def in_region(seg):
+        middle = (seg['start'] + seg['end']) / 2
+        return any(start <= middle < end for start, end in regions)
+
+    spliced = [seg for seg in segments if not in_region(seg)]
+    for (start, end), region_segments in zip(regions, redecoded):
+        for seg in region_segments:
+            seg_start = start + seg['start']
+            if seg_start >= end:
+                continue
+            spliced.append(dict(seg, start=round(seg_start, 3), end=round(min(end, start + seg['end']), 3)))
+    spliced.sort(key=lambda s: (s['start'], s['end']))
+    return spliced
+
+
+def source_seconds(source) -> float:
+    """音频数组、MelFeatures 或 MelWindow 的时长（秒）"""
+    if hasattr(source, "duration"):
+        return source.duration
+    return len(source) / SAMPLE_RATE
+
+
+def clip_source(source, start: float, end: float):
+    """截取 [start, end) 秒；MelFeatures / MelWindow 截取的是特征窗口"""
+    if hasattr(source, "window"):
+        return source.window(start, end)
+    if hasattr(source, "mel"):
+        from mel_cache import FRAMES_PER_SECOND, MelWindow
+        f0 = max(0, int(round(start * FRAMES_PER_SECOND)))
+        f1 = max(f0, min(source.mel.shape[1], int(round(end * FRAMES_PER_SECOND))))
+        return MelWindow(source.mel[:, f0:f1], (f1 - f0) / FRAMES_PER_SECOND)
+    return source[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+
+
+def read_audio(audio):
+    """音频文件路径或数组 -> 16kHz单声道float32数组"""
+    import numpy as np
+    if isinstance(audio, (str, os.PathLike)):
+        from audio_io import load_audio
+        audio, _ = load_audio(audio, sr=SAMPLE_RATE)
+    return np.asarray(audio, dtype=np.float32)
+
+
+class WhisperBackend(ASRBackend):
+    """openai-whisper"""
+
+    name = "whisper"
+    capabilities = {"batching": True, "vad": False, "word_timestamps": True, "quantize": True}
+
+    DECODE_OPTIONS = dict(
+        word_timestamps=True,
+        beam_size=5,
+        temperature=0.4,
+        condition_on_previous_text=False,
+        no_speech_threshold=0.5,
+        logprob_threshold=-2.0,
+    )
+    GREEDY_OPTIONS = dict(beam_size=None, temperature=0.0)
+    # 温度为0时才做beam search（大于0时whisper忽略beam_size改为采样），
+    # 结果没有通过whisper自己的检查时再用原来的0.4采样
+    BEAM_OPTIONS = dict(beam_size=5, temperature=(0.0, 0.4))
+
+    def __init__(self, model_size: str = DEFAULT_MODEL, language: str = DEFAULT_LANGUAGE,
+                 quantize: Optional[str] = None, mel_cache: bool = True, **options):
+        super().__init__(model_size, language, **options)
+        self.quantize = quantize
+        self.mel_cache = mel_cache
+
+    @property
+    def n_mels(self) -> int:
+        if self._model is not None:
+            return self._model.dims.n_mels
+        return 128 if self.model_size.startswith(("large-v3", "turbo")) else 80
+
+    def features_for(self, audio):
+        if hasattr(audio, "window"):
+            return audio
+        if not self.mel_cache or not isinstance(audio, (str, os.PathLike)):
+            return None
+        from mel_cache import load_features
+        return load_features(audio, self.n_mels)
+
+    def describe(self) -> str:
+        description = super().describe()
+        if self.quantize:
+            description = description[:-1] + f", {self.quantize})"
+        return description
+
+    def _load_model(self):
+        if self.quantize:
+            # 线性层int8动态量化，只能在CPU上运行（见 quantize.py）
+            from quantize import load_quantized_model
+            return load_quantized_model(self.model_size, self.quantize, **self.options)
+        # 只从本地模型库或whisper下载目录加载，不联网（见 model_store.py）
+        from model_store import load_whisper_model
+        return load_whisper_model(self.model_size, **self.options)
+
+    def _transcribe(self, audio, **options) -> List[dict]:
+        decode_options = dict(self.DECODE_OPTIONS, language=self.language)
+        decode_options.update(options)
+        features = self.features_for(audio)
+        if features is not None:
+            # 直接使用缓存的特征，不再读取音频和计算频谱
+            from mel_cache import whisper_frontend
+            with whisper_frontend(features.tensor()) as mel:
+                result = self._model.transcribe(mel, **decode_options)
+        else:
+            if isinstance(audio, (str, os.PathLike)):
+                audio = str(audio)
+            result = self._model.transcribe(audio, **decode_options)
+        segments = []
+        for seg in result.get('segments', []):
+            segment = dict({"start": seg['start'], "end": seg['end'], "text": seg['text'],
+                            "num_tokens": len(seg.get('tokens', []))},
+                           **{field: seg[field] for field in CONFIDENCE_FIELDS if field in seg})
+            if seg.get('temperature', 0.0) > 0.0:
+                segment["decode_path"] = "sampled"
+            segments.append(segment)
+        return segments
+
+    def _transcribe_batch(self, windows, **options) -> List[List[dict]]:
+        """把多个窗口的mel频谱堆叠成一个batch，编码器和解码器各只运行一次"""
+        import numpy as np
+        import torch
+        import whisper
+        from whisper.tokenizer import get_tokenizer
+
+        model = self._model
+        mels = torch.stack([
+            # 缓存特征的窗口直接补齐到30秒（与whisper.transcribe处理长音频时相同）
+            whisper.pad_or_trim(torch.from_numpy(np.ascontiguousarray(window.mel)), whisper.audio.N_FRAMES)
+            if hasattr(window, "mel") else
+            whisper.log_mel_spectrogram(
+                whisper.pad_or_trim(torch.from_numpy(np.asarray(window, dtype=np.float32))),
+                n_mels=model.dims.n_mels
+            )
+            for window in windows
+        ]).to(model.device)
+
+        decode_options = dict(
+            language=self.language,
+            beam_size=self.DECODE_OPTIONS["beam_size"],
+            without_timestamps=False,
+            fp16=model.device.type == "cuda",
+        )
+        decode_options.update(options)
+        if isinstance(decode_options.get("temperature"), (tuple, list)):
+            # whisper.decode 只解码一次，使用第一个温度（beam search）
+            decode_options["temperature"] = decode_options["temperature"][0]
+        results = whisper.decode(model, mels, whisper.DecodingOptions(**decode_options))
+
+        tokenizer = get_tokenizer(model.is_multilingual, num_languages=model.num_languages,
+                                  language=self.language, task="transcribe")
+        outputs = []
+        for window, result in zip(windows, results):
+            # 与 whisper.transcribe 相同的静音判定
+            if (result.no_speech_prob > self.DECODE_OPTIONS["no_speech_threshold"]
+                    and result.avg_logprob < self.DECODE_OPTIONS["logprob_threshold"]):
+                outputs.append([])
+                continue
+            segments = parse_timestamped_tokens(
+                result.tokens, tokenizer.timestamp_begin, tokenizer.decode, source_seconds(window)
+            )
+            # 批量解码只有整个窗口的置信度
+            for seg in segments:
+                seg.update(avg_logprob=result.avg_logprob, compression_ratio=result.compression_ratio,
+                           no_speech_prob=result.no_speech_prob)
+            outputs.append(segments)
+        return outputs
+
+
+class FasterWhisperBackend(ASRBackend):
+    """faster-whisper (CTranslate2)，CPU上默认使用int8量化"""
+
+    name = "faster-whisper"
+    capabilities = {"batching": False, "vad": True, "word_timestamps": True, "quantize": True}
+
+    DECODE_OPTIONS = dict(
+        beam_size=5,
+        word_timestamps=False,
+        condition_on_previous_text=False,
+        vad_filter=True,
+        vad_parameters=dict(min_silence_duration_ms=500),
+    )
+    GREEDY_OPTIONS = dict(beam_size=1, temperature=0.0)
+
+    def __init__(self, model_size: str = DEFAULT_MODEL, language: str = DEFAULT_LANGUAGE,
+                 device: str = "cpu", compute_type: str = "int8", cpu_threads: int = 0,
+                 quantize: Optional[str] = None, **options):
+        super().__init__(model_size, language, **options)
+        self.device = device
+        # CTranslate2自己做量化，--quantize int8 等价于 compute_type=int8
+        self.compute_type = quantize or compute_type
+        self.cpu_threads = cpu_threads
+
+    def describe(self) -> str:
+        suffix = f", {self.decoding}" if self.decoding != DEFAULT_DECODING else ""
+        return f"{self.name} ({self.model_size}, {self.device}/{self.compute_type}{suffix})"
+
+    def _load_model(self):
+        from faster_whisper import WhisperModel
+        from model_store import resolve_faster_whisper
+        options = dict(dict(local_files_only=True), **self.options)
+        return WhisperModel(resolve_faster_whisper(self.model_size), device=self.device,
+                            compute_type=self.compute_type, cpu_threads=self.cpu_threads, **options)
+
+    def _transcribe(self, audio, **options) -> List[dict]:
+        if isinstance(audio, (str, os.PathLike)):
+            audio = str(audio)
+        decode_options = dict(self.DECODE_OPTIONS, language=self.language)
+        decode_options.update(options)
+        segments, _info = self._model.transcribe(audio, **decode_options)
+        # segments是生成器，遍历时才真正解码
+        results = []
+        for seg in segments:
+            segment = {"start": seg.start, "end": seg.end, "text": seg.text, "num_tokens": len(seg.tokens),
+                       "avg_logprob": seg.avg_logprob, "compression_ratio": seg.compression_ratio,
+                       "no_speech_prob": seg.no_speech_prob}
+            # 默认的温度序列从0开始，beam search结果没有通过检查时才升温采样
+            if (getattr(seg, "temperature", None) or 0.0) > 0.0:
+                segment["decode_path"] = "sampled"
+            results.append(segment)
+        return results
+
+
+class FakeBackend(ASRBackend):
+    """
+    确定性的假引擎：按帧能量找出有声区域，每个区域输出一个片段，
+    文本由文件名和片段序号决定。同样的输入总是得到同样的结果。
+    贪心解码（beam_size=1）时低置信度片段会替换掉部分词，模拟beam search能纠正的错误。
+    指定 n_mels 时也接受 mel_cache 的特征输入（MelFeatures / MelWindow），用于测试特征路径。
+    """
+
+    name = "fake"
+    capabilities = {"batching": True, "vad": True, "word_timestamps": False, "quantize": False}
+    GREEDY_OPTIONS = dict(beam_size=1)
+
+    WORDS = ("the", "lesson", "today", "we", "practice", "present", "perfect", "homework",
+             "question", "answer", "please", "repeat", "again", "good", "example", "sentence")
+
+    # 没有指定模型名称时的 model_size；指定名称（例如级联测试中的 tiny / small）只用来区分结果
+    UNSIZED = "fake"
+    # 由log-mel还原的每帧幅度约为波形RMS的这个倍数（在合成会议上测得），用来沿用同一个能量阈值
+    MEL_GAIN = 3.2
+
+    def __init__(self, model_size: str = UNSIZED, language: str = DEFAULT_LANGUAGE,
+                 frame_seconds: float = 0.1, threshold: float = 0.02, min_gap: float = 0.5,
+                 n_mels: Optional[int] = None, **options):
+        super().__init__(model_size, language, **options)
+        self.frame_seconds = frame_seconds
+        self.threshold = threshold
+        self.min_gap = min_gap
+        self.n_mels = n_mels
+
+    def describe(self) -> str:
+        # 不显示尺寸，避免把确定性的测试运行标成真实模型
+        if self.model_size != self.UNSIZED:
+            return super().describe()
+        return f"{self.name} ({self.decoding})" if self.decoding != DEFAULT_DECODING else self.name
+
+    def _load_model(self):
+        return True
+
+    def features_for(self, audio):
+        if hasattr(audio, "window") or hasattr(audio, "mel"):
+            return audio
+        if self.n_mels is None or not isinstance(audio, (str, os.PathLike)):
+            return None
+        from mel_cache import load_features
+        return load_features(audio, self.n_mels, verbose=False)
+
+    def _read_audio(self, audio):
+        import numpy as np
+        if hasattr(audio, "mel") or hasattr(audio, "window"):
+            # log-mel特征: 还原出每帧的功率，平均后开方作为幅度（每秒 FRAMES_PER_SECOND 帧）
+            from mel_cache import FRAMES_PER_SECOND
+            mel = audio.mel if hasattr(audio, "mel") else audio.array[:, :audio.content_frames]
+            mel = np.asarray(mel, dtype=np.float32)
+            power = np.power(10.0, mel * 4.0 - 4.0).mean(axis=0)
+            data = (np.sqrt(power) / self.MEL_GAIN).astype(np.float32)
+            return data, FRAMES_PER_SECOND, f"mel-{zlib.crc32(np.ascontiguousarray(mel).tobytes())}"
+        if isinstance(audio, (str, os.PathLike)):
+            import soundfile as sf
+            data, sr = sf.read(str(audio), dtype='float32')
+            if data.ndim > 1:
+                data = data.mean(axis=1)
+            return data, sr, Path(audio).name
+        data = np.asarray(audio, dtype=np.float32)
+        return data, SAMPLE_RATE, f"array-{zlib.crc32(data.tobytes())}"
+
+    def _sentence(self, key: str, index: int, seconds: float, greedy: bool = False) -> dict:
+        rng = random.Random(zlib.crc32(f"{key}:{index}:{self.model_size}".encode('utf-8')))
+        count = max(1, min(24, int(seconds * 2.5)))
+        words = [rng.choice(self.WORDS) for _ in range(count)]
+        # 固定的伪置信度，用于测试级联解码和自适应解码
+        avg_logprob = rng.uniform(-1.4, -0.1)
+        no_speech_prob = rng.uniform(0.0, 0.3)
+        if greedy and avg_logprob < FALLBACK_LOGPROB_THRESHOLD:
+            words = [rng.choice(self.WORDS) if i % 3 == 2 else word for i, word in enumerate(words)]
+        elif not greedy:
+            avg_logprob = min(-0.05, avg_logprob + 0.3)
+        text = " " + " ".join(words).capitalize() + "."
+        data = text.encode('utf-8')
+        return {"text": text, "num_tokens": count + 1, "avg_logprob": round(avg_logprob, 3),
+                "compression_ratio": round(len(data) / len(zlib.compress(data)), 3),
+                "no_speech_prob": round(no_speech_prob, 3)}
+
+    def _transcribe(self, audio, **options) -> List[dict]:
+        import numpy as np
+        greedy = options.get("beam_size", 5) in (None, 1)
+        data, sr, key = self._read_audio(audio)
+        frame = max(1, int(self.frame_seconds * sr))
+        count = len(data) // frame
+        if count == 0:
+            return []
+        rms = np.sqrt(np.mean(data[:count * frame].reshape(count, frame) ** 2, axis=1))
+        voiced = rms > self.threshold
+
+        regions = []
+        start = None
+        silent = 0
+        for i, is_voiced in enumerate(voiced):
+            if is_voiced:
+                if start is None:
+                    start = i
+                silent = 0
+            elif start is not None:
+                silent += 1
+                if silent * self.frame_seconds >= self.min_gap:
+                    regions.append((start, i - silent + 1))
+                    start = None
+        if start is not None:
+            regions.append((start, count))
+
+        segments = []
+        for index, (a, b) in enumerate(regions):
+            seg_start, seg_end = a * self.frame_seconds, b * self.frame_seconds
+            segments.append(dict(
+                {"start": round(seg_start, 3), "end": round(seg_end, 3)},
+                **self._sentence(key, index, seg_end - seg_start, greedy),
+            ))
+        return segments
+
+
+BACKENDS = {
+    WhisperBackend.name: WhisperBackend,
+    FasterWhisperBackend.name: FasterWhisperBackend,
+    FakeBackend.name: FakeBackend,
+}
+
+
+def get_backend(name: Optional[str] = None, model_size: Optional[str] = None, **options) -> ASRBackend:
+    """
+    创建识别后端
+
+    Args:
+        name: 后端名称，为None时使用配置文件中的 transcription.backend
+        model_size: 模型名称，为None时使用配置文件中的 transcription.model（fake后端没有模型尺寸，不使用该配置）
+        options: 传给后端构造函数的其他参数（例如 compute_type, cpu_threads, quantize）
+
+    Raises:
+        ValueError: 未知的后端名称或解码策略，或者后端不支持量化
+    """
+    config = load_transcription_config()
+    name = name or config.get("backend") or DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"未知的识别后端: {name} (可选: {', '.join(BACKENDS)})")
+    if name == "fake":
+        model_size = model_size or FakeBackend.UNSIZED
+    else:
+        model_size = model_size or config.get("model") or DEFAULT_MODEL
+
+    # 配置文件中后端专属的参数，例如 transcription.faster-whisper.compute_type
+    backend_options = dict(config.get(name) or {})
+    backend_options.update(options)
+    for key in ("language", "decoding"):
+        if key not in backend_options and config.get(key):
+            backend_options[key] = config[key]
+    if backend_options.get("quantize") and not BACKENDS[name].capabilities.get("quantize"):
+        raise ValueError(f"识别后端 {name} 不支持量化")
+    return BACKENDS[name](model_size, **backend_options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="使用指定的识别后端转录一个音频文件")
+    parser.add_argument('audio', nargs='?', help='音频文件路径')
+    parser.add_argument('--backend', choices=list(BACKENDS), help='识别后端 (默认: 配置文件中的transcription.backend)')
+    parser.add_argument('--model', type=str, help='模型名称 (默认: 配置文件中的transcription.model)')
+    parser.add_argument('--list', action='store_true', help='列出所有后端及其能力')
+    args = parser.parse_args()
+
+    if args.list or not args.audio:
+        config = load_transcription_config()
+        for name, backend_class in BACKENDS.items():
+            flags = ", ".join(k for k, v in backend_class.capabilities.items() if v) or "-"
+            current = " (当前配置)" if name == (config.get("backend") or DEFAULT_BACKEND) else ""
+            print(f"  {name:<16} {flags}{current}")
+        return
+
+    backend = get_backend(args.backend, args.model)
+    print(f"🤖 识别后端: {backend.describe()}")
+    print(json.dumps(backend.transcribe(args.audio), ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
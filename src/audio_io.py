@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音轨文件读写
+extract_audio_tracks 提取的两条音轨 <base>_自己 / <base>_对方 可以保存为：
+  - wav:  16位PCM，两小时单声道16kHz约230MB
+  - flac: 无损压缩，通常只有wav的40%~60%，解码出的样本与wav逐位相同，转录结果不变
+
+读取方都不关心扩展名：
+  - track_file / find_meeting_tracks: 按说话人查找音轨（同时存在时优先flac）
+  - audio_duration: 只解析文件头（wav的fmt/data块、flac的STREAMINFO）得到时长，不需要numpy
+  - AudioReader: 按样本区间读取，libsndfile对flac按帧定位，只解码需要的区间
+  - load_audio: 整条读入；已经是16kHz单声道时直接解码，不经过librosa的重采样路径
+
+compress 命令把已有会议文件夹中的wav音轨转换为flac，逐样本比对一致后才删除wav。
+
+用法:
+  python3 src/audio_io.py compress recordings/xxx recordings/yyy
+  python3 src/audio_io.py compress recordings --keep-wav
+
+作者: VideoMeetingTranscript
+"""
+
+import sys
+import wave
+import struct
+import argparse
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+SAMPLE_RATE = 16000
+AUDIO_FORMATS = ("wav", "flac")
+DEFAULT_FORMAT = "wav"
+# 同一音轨两种格式都存在时按这个顺序选择
+AUDIO_SUFFIXES = (".flac", ".wav")
+SPEAKERS = ("自己", "对方")
+# 每次读写的块大小（样本数），compress 和分割音频时使用
+BLOCK_SAMPLES = 60 * SAMPLE_RATE
+
+
+def ffmpeg_codec_args(audio_format: str) -> List[str]:
+    """ffmpeg输出指定音轨格式的编码参数"""
+    if audio_format == "wav":
+        return ['-acodec', 'pcm_s16le']
+    if audio_format == "flac":
+        return ['-acodec', 'flac', '-sample_fmt', 's16', '-compression_level', '5']
+    raise ValueError(f"不支持的音轨格式: {audio_format}（可选: {', '.join(AUDIO_FORMATS)}）")
+
+
+def track_file(folder, base_name: str, speaker: str) -> Optional[Path]:
+    """会议文件夹中 <base>_<speaker> 的音轨文件，不存在时返回None"""
+    for suffix in AUDIO_SUFFIXES:
+        path = Path(folder) / f"{base_name}_{speaker}{suffix}"
+        if path.exists():
+            return path
+    return None
+
+
+def track_base_name(path) -> str:
+    """音轨文件名去掉 _自己/_对方 和扩展名后的会议名"""
+    stem = Path(path).stem
+    for speaker in SPEAKERS:
+        if stem.endswith(f"_{speaker}"):
+            return stem[:-len(speaker) - 1]
+    return stem
+
+
+def find_meeting_tracks(folder) -> List[Tuple[Path, Path]]:
+    """文件夹中所有成对的 (自己, 对方) 音轨，按文件名排序"""
+    folder = Path(folder)
+    pairs = []
+    seen = set()
+    for suffix in AUDIO_SUFFIXES:
+        for self_file in sorted(folder.glob(f"*_自己{suffix}")):
+            base_name = track_base_name(self_file)
+            if base_name in seen:
+                continue
+            other_file = track_file(folder, base_name, "对方")
+            if other_file is None:
+                continue
+            seen.add(base_name)
+            pairs.append((track_file(folder, base_name, "自己"), other_file))
+    return sorted(pairs)
+
+
+def _flac_duration(path: Path) -> Optional[float]:
+    """从FLAC的STREAMINFO块读取时长"""
+    with open(path, 'rb') as f:
+        if f.read(4) != b'fLaC':
+            return None
+        header = f.read(4)
+        # 第一个元数据块必须是STREAMINFO（类型0，34字节）
+        if len(header) < 4 or header[0] & 0x7F != 0:
+            return None
+        info = f.read(34)
+        if len(info) < 18:
+            return None
+    # 第10~17字节: 采样率(20位) 声道数-1(3位) 位深-1(5位) 总样本数(36位)
+    packed, = struct.unpack('>Q', info[10:18])
+    sample_rate = packed >> 44
+    total_samples = packed & ((1 << 36) - 1)
+    if not sample_rate or not total_samples:
+        # 编码器不知道总长度时写0，只能解码后才知道
+        return None
+    return total_samples / float(sample_rate)
+
+
+def audio_duration(path) -> Optional[float]:
+    """只读文件头得到音频时长（秒），无法识别时返回None"""
+    path = Path(path)
+    try:
+        if path.suffix.lower() == ".wav":
+            with wave.open(str(path), 'rb') as w:
+                return w.getnframes() / float(w.getframerate())
+        if path.suffix.lower() == ".flac":
+            duration = _flac_duration(path)
+            if duration is not None:
+                return duration
+        import soundfile as sf
+        return sf.info(str(path)).duration
+    except (OSError, wave.Error, EOFError, struct.error, RuntimeError, ImportError):
+        return None
+
+
+class AudioReader:
+    """
+    按样本区间读取单声道音频；区间超出音频末尾的部分是静音
+
+    sample_rate为None时保持文件的原始采样率。
+    """
+
+    def __init__(self, audio_file, sample_rate: Optional[int] = SAMPLE_RATE):
+        import soundfile as sf
+        self.path = Path(audio_file)
+        self.file = sf.SoundFile(str(audio_file))
+        self.sample_rate = sample_rate or self.file.samplerate
+        self.samples = self.file.frames
+        self.data = None
+        if self.file.samplerate != self.sample_rate or self.file.channels != 1:
+            # 采样率不同或多声道时整段读入并重采样（提取的音轨都是16kHz单声道，不会走到这里）
+            import librosa
+            self.data, _ = librosa.load(str(audio_file), sr=self.sample_rate, mono=True)
+            self.samples = len(self.data)
+            self.file.close()
+            self.file = None
+
+    @property
+    def duration(self) -> float:
+        return self.samples / self.sample_rate
+
+    def read(self, start: int, end: int):
+        import numpy as np
+        out = np.zeros(max(0, end - start), dtype=np.float32)
+        lo, hi = max(0, start), min(self.samples, end)
+        if hi > lo:
+            if self.data is not None:
+                out[lo - start:hi - start] = self.data[lo:hi]
+            else:
+                self.file.seek(lo)
+                out[lo - start:hi - start] = self.file.read(hi - lo, dtype='float32')
+        return out
+
+    def read_seconds(self, start: float, end: float):
+        return self.read(int(start * self.sample_rate), int(end * self.sample_rate))
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def load_audio(audio_file, sr: Optional[int] = SAMPLE_RATE):
+    """
+    整条读入为单声道float32（与 librosa.load(audio_file, sr=sr) 结果相同）
+
+    Returns:
+        (audio, sample_rate)
+    """
+    with AudioReader(audio_file, sample_rate=sr) as reader:
+        if reader.data is not None:
+            return reader.data, reader.sample_rate
+        return reader.read(0, reader.samples), reader.sample_rate
+
+
+def write_audio(audio_file, audio, sample_rate: int) -> Path:
+    """按扩展名写出16位PCM的wav或flac"""
+    import soundfile as sf
+    audio_file = Path(audio_file)
+    sf.write(str(audio_file), audio, sample_rate, subtype='PCM_16')
+    return audio_file
+
+
+def compress_track(wav_file: Path, keep_wav: bool = False) -> Optional[Path]:
+    """
+    把一条wav音轨无损转换为同名flac，分块比对解码结果与原文件一致
+
+    Returns:
+        flac文件路径；比对失败时删除flac并返回None
+    """
+    import numpy as np
+    import soundfile as sf
+
+    flac_file = wav_file.with_suffix(".flac")
+    tmp_file = wav_file.with_name(f"{wav_file.stem}.tmp.flac")
+    with sf.SoundFile(str(wav_file)) as src:
+        with sf.SoundFile(str(tmp_file), 'w', samplerate=src.samplerate, channels=src.channels,
+                          format='FLAC', subtype='PCM_16') as dst:
+            for block in src.blocks(blocksize=BLOCK_SAMPLES, dtype='int16', always_2d=True):
+                dst.write(block)
+
+    with sf.SoundFile(str(wav_file)) as a, sf.SoundFile(str(tmp_file)) as b:
+        same = a.frames == b.frames
+        while same:
+            x = a.read(BLOCK_SAMPLES, dtype='int16')
+            y = b.read(BLOCK_SAMPLES, dtype='int16')
+            if len(x) == 0:
+                break
+            same = np.array_equal(x, y)
+    if not same:
+        tmp_file.unlink()
+        return None
+    tmp_file.replace(flac_file)
+    if not keep_wav:
+        wav_file.unlink()
+    return flac_file
+
+
+def _wav_tracks(paths) -> List[Path]:
+    tracks = []
+    for path in paths:
+        path = Path(path)
+        if path.is_file():
+            tracks.append(path)
+            continue
+        for speaker in SPEAKERS:
+            tracks.extend(sorted(path.rglob(f"*_{speaker}.wav")))
+    return sorted(set(tracks))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会议音轨文件工具")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_compress = sub.add_parser('compress', help='把已有的wav音轨无损转换为flac')
+    p_compress.add_argument('paths', nargs='+', help='会议文件夹（递归查找 *_自己.wav / *_对方.wav）或wav文件')
+    p_compress.add_argument('--keep-wav', action='store_true', help='转换后保留原wav文件')
+    args = parser.parse_args()
+
+    tracks = _wav_tracks(args.paths)
+    if not tracks:
+        print("⚠️ 没有找到wav音轨")
+        return
+    print(f"🗜️ 转换 {len(tracks)} 条wav音轨为flac")
+    before = after = 0
+    failed = 0
+    for wav_file in tracks:
+        size = wav_file.stat().st_size
+        flac_file = compress_track(wav_file, keep_wav=args.keep_wav)
+        if flac_file is None:
+            failed += 1
+            print(f"  ❌ {wav_file.name}: 解码结果与原文件不一致，保留wav")
+            continue
+        before += size
+        after += flac_file.stat().st_size
+        print(f"  ✅ {flac_file.name}: {size / 1024 / 1024:.1f} MB -> "
+              f"{flac_file.stat().st_size / 1024 / 1024:.1f} MB")
+    if before:
+        print(f"📊 合计 {before / 1024 / 1024:.1f} MB -> {after / 1024 / 1024:.1f} MB "
+              f"({after / before:.0%})")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
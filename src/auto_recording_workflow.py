@@ -16,20 +16,38 @@ import time
 from pathlib import Path
 from datetime import datetime
 
+from audio_io import AUDIO_FORMATS, DEFAULT_FORMAT
+from build_manifest import STAGES, BuildManifest
+from stage_metrics import JOB_ENV, stage
+
 
 class AutoRecordingWorkflow:
     """自动化录制工作流程控制器"""
     
-    def __init__(self, teacher_name: str, model: str = "small"):
+    def __init__(self, teacher_name: str, model: str = "small", previews: bool = True, proxy: bool = False,
+                 cascade_fast_model: str = None, quantize: str = None, audio_format: str = DEFAULT_FORMAT,
+                 force=()):
         """
         初始化工作流程控制器
         
         Args:
             teacher_name: 老师名字，作为录制文件前缀
             model: Whisper模型大小
+            previews: 整理文件后是否在后台生成预览文件（缩略图雪碧图）
+            proxy: 预览文件是否包含低码率代理视频
+            cascade_fast_model: 设置时使用级联解码，先用这个小模型识别，只把不可靠的片段交给model
+            quantize: 设置时（int8）使用动态量化模型做CPU推理
+            audio_format: 提取的音轨格式，wav 或 flac（无损压缩，体积约为一半）
+            force: 即使构建记录显示输出是最新的也要重新运行的阶段（remux / extract / transcribe）
         """
         self.teacher_name = teacher_name
         self.model = model
+        self.previews = previews
+        self.proxy = proxy
+        self.cascade_fast_model = cascade_fast_model
+        self.quantize = quantize
+        self.audio_format = audio_format
+        self.force = set(force or ())
         self.project_root = Path(__file__).parent.parent
         self.recordings_dir = self.project_root / "recordings"
         
@@ -37,10 +55,21 @@ class AutoRecordingWorkflow:
         self.obs_controller_script = self.project_root / "src" / "obs_controller.py"
         self.extract_audio_script = self.project_root / "src" / "extract_audio_tracks.py"
         self.whisper_script = self.project_root / "src" / "whisper_transcribe.py"
+        self.preview_script = self.project_root / "src" / "preview_artifacts.py"
         
         print(f"🎬 自动化录制工作流程")
-        print(f"👨‍🏫 老师名字: {teacher_name}")
-        print(f"🤖 转录模型: {model}")
+        if teacher_name:
+            print(f"👨‍🏫 老师名字: {teacher_name}")
+        if cascade_fast_model:
+            print(f"🤖 转录模型: {cascade_fast_model} -> {model} (级联解码)")
+        else:
+            print(f"🤖 转录模型: {model}")
+        if quantize:
+            print(f"🔧 模型量化: {quantize}")
+        if audio_format != DEFAULT_FORMAT:
+            print(f"🗜️ 音轨格式: {audio_format}")
+        if self.force:
+            print(f"🔁 强制重新运行: {', '.join(s for s in STAGES if s in self.force)}")
         print(f"📁 项目根目录: {self.project_root}")
         
     def check_scripts_exist(self):
@@ -159,23 +188,9 @@ class AutoRecordingWorkflow:
             
             if new_filepath.suffix.lower() == '.mkv':
                 # 转换MKV为MP4
-                print(f"🔄 转换MKV为MP4...")
                 mp4_path = new_filepath.with_suffix('.mp4')
                 
-                cmd = [
-                    'ffmpeg',
-                    '-i', str(new_filepath),
-                    '-map', '0',  # 映射所有输入流
-                    '-c', 'copy',  # 直接复制所有流，不重新编码
-                    '-y',  # 覆盖已存在的文件
-                    str(mp4_path)
-                ]
-                
-                result = subprocess.run(cmd, capture_output=True, text=True)
-                
-                if result.returncode == 0:
-                    print(f"✅ 转换完成: {mp4_path.name}")
-                    
+                if self.remux_to_mp4(new_filepath, mp4_path):
                     # 创建文件夹并移动文件
                     folder_name = mp4_path.stem
                     target_folder = self.recordings_dir / folder_name
@@ -194,7 +209,6 @@ class AutoRecordingWorkflow:
                     
                     return mp4_in_folder
                 else:
-                    print(f"❌ 转换失败: {result.stderr}")
                     return None
             else:
                 # 已经是MP4格式，直接整理
@@ -212,6 +226,194 @@ class AutoRecordingWorkflow:
             print(f"❌ 处理原始录制文件时出错: {e}")
             return None
     
+    def remux_to_mp4(self, mkv_path, mp4_path):
+        """把MKV无损转封装为MP4（只复制流，不重新编码）"""
+        print(f"🔄 转换MKV为MP4...")
+        cmd = [
+            'ffmpeg',
+            '-i', str(mkv_path),
+            '-map', '0',  # 映射所有输入流
+            '-c', 'copy',  # 直接复制所有流，不重新编码
+            '-y',  # 覆盖已存在的文件
+            str(mp4_path)
+        ]
+        
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode == 0:
+            print(f"✅ 转换完成: {mp4_path.name}")
+            return True
+        print(f"❌ 转换失败: {result.stderr}")
+        return False
+    
+    def run_stage(self, manifest, stage_name, inputs, outputs, params, run):
+        """
+        按构建记录运行一个阶段：输入、输出和参数都与记录一致时跳过
+        
+        Args:
+            run: 执行阶段的函数，返回是否成功
+        
+        Returns:
+            bool: 阶段的输出是否可用（跳过或运行成功）
+        """
+        if stage_name in self.force:
+            print(f"🔁 {stage_name}: 强制重新运行 (--force)")
+        else:
+            fresh, reason = manifest.check(stage_name, inputs, outputs, params)
+            if fresh:
+                manifest.refresh(stage_name)
+                print(f"⏭️  {stage_name}: 输出是最新的，跳过")
+                return True
+            print(f"🔁 {stage_name}: {reason}")
+        
+        start_time = time.time()
+        ok = run()
+        if ok and all(Path(path).exists() for path in outputs):
+            manifest.record(stage_name, inputs, outputs, params, seconds=time.time() - start_time)
+        return ok
+    
+    def transcription_params(self):
+        """影响转录结果的参数：命令行参数 + 配置文件的 transcription 部分（模型库位置除外）"""
+        from asr_backends import load_transcription_config
+        config = dict(load_transcription_config())
+        config.pop("model_store", None)
+        return {
+            "model": self.model,
+            "cascade": self.cascade_fast_model,
+            "quantize": self.quantize,
+            "config": config,
+        }
+    
+    def process_meeting(self, mp4_path):
+        """
+        步骤2.6~4: 预览、提取音轨、转录
+        
+        每个阶段的输入指纹和参数记录在会议文件夹的 .build.json 中，
+        再次处理同一个文件夹时只重新运行输出过期的阶段。
+        """
+        folder = mp4_path.parent
+        manifest = BuildManifest(folder)
+        
+        # 步骤2.6: 后台生成预览文件（preview_artifacts 自己会跳过已经完成的部分）
+        if self.previews:
+            self.start_preview_generation(mp4_path)
+        
+        # 步骤3: 提取音频
+        base_name = mp4_path.stem
+        tracks = [folder / f"{base_name}_自己.{self.audio_format}",
+                  folder / f"{base_name}_对方.{self.audio_format}"]
+        with stage("workflow:extract"):
+            extracted = self.run_stage(
+                manifest, "extract", [mp4_path], tracks,
+                {"tracks": [1, 2], "format": self.audio_format},
+                lambda: all(self.extract_audio_tracks(mp4_path)))
+        if not extracted:
+            print("❌ 音频提取失败，工作流程终止")
+            return False
+        self_audio, other_audio = tracks
+        
+        # 步骤4: 转录（每个说话人的JSON和所有字幕文件都是这一阶段的输出，任何一个被删除或修改都会重新转录）
+        from whisper_transcribe import dual_output_files
+        transcription_path = self.transcription_output(self_audio)
+        with stage("workflow:transcribe", model=self.model):
+            transcribed = self.run_stage(
+                manifest, "transcribe", tracks, dual_output_files(transcription_path),
+                self.transcription_params(),
+                lambda: self.transcribe_audio(self_audio, other_audio) is not None)
+        if not transcribed:
+            print("❌ 转录失败，但前面的步骤已完成")
+            transcription_path = None
+        
+        # 显示最终结果
+        self.show_final_results(mp4_path, transcription_path)
+        return True
+    
+    def find_folder_video(self, folder):
+        """
+        已有会议文件夹中的MP4；文件夹中保留了MKV时按构建记录决定是否重新转封装
+        
+        Returns:
+            Path: MP4文件路径，找不到时返回None
+        """
+        mp4_files = sorted(folder.glob("*.mp4"))
+        mkv_files = sorted(folder.glob("*.mkv"))
+        for mkv_path in mkv_files:
+            mp4_path = mkv_path.with_suffix(".mp4")
+            manifest = BuildManifest(folder)
+            with stage("workflow:convert"):
+                ok = self.run_stage(manifest, "remux", [mkv_path], [mp4_path], {"copy": True},
+                                    lambda: self.remux_to_mp4(mkv_path, mp4_path))
+            if ok and mp4_path not in mp4_files:
+                mp4_files.append(mp4_path)
+        if not mp4_files:
+            return None
+        return max(mp4_files, key=lambda f: f.stat().st_mtime)
+    
+    def run_folders(self, folders):
+        """不录制，重新处理已有的会议文件夹（只重新运行输出过期的阶段）"""
+        start_time = time.time()
+        os.environ[JOB_ENV] = f"rebuild_{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        
+        if not self.check_scripts_exist():
+            print("❌ 缺少必需的脚本文件")
+            return False
+        
+        failed = []
+        try:
+            for folder in folders:
+                folder = Path(folder)
+                print(f"\n📂 处理会议文件夹: {folder}")
+                mp4_path = self.find_folder_video(folder) if folder.is_dir() else None
+                if not mp4_path:
+                    print(f"❌ {folder} 中没有找到视频文件")
+                    failed.append(folder)
+                    continue
+                if not self.process_meeting(mp4_path):
+                    failed.append(folder)
+        except KeyboardInterrupt:
+            print("\n⚠️  工作流程被用户中断")
+            return False
+        
+        total_time = time.time() - start_time
+        print(f"\n⏱️  处理 {len(folders)} 个会议文件夹，总耗时: {total_time/60:.1f} 分钟")
+        if failed:
+            print(f"❌ 失败 {len(failed)} 个: {', '.join(f.name for f in failed)}")
+        return not failed
+    
+    def start_preview_generation(self, mp4_path):
+        """步骤2.6: 在后台生成预览文件（不阻塞后续的提取和转录）"""
+        print(f"\n🖼️ 步骤2.6: 后台生成预览文件")
+        
+        try:
+            cmd = [
+                "python3",
+                str(self.preview_script),
+                str(mp4_path),
+                "--threads", "1"
+            ]
+            if self.proxy:
+                cmd.append("--proxy")
+            
+            preview_dir = mp4_path.parent / "previews"
+            preview_dir.mkdir(exist_ok=True)
+            print(f"🔧 执行命令: {' '.join(cmd)}")
+            
+            # 独立进程组运行，工作流程结束后继续执行；中断后再次运行会从断点继续
+            with open(preview_dir / "preview.log", 'a', encoding='utf-8') as log_file:
+                subprocess.Popen(
+                    cmd,
+                    cwd=str(self.project_root),
+                    stdout=log_file,
+                    stderr=subprocess.STDOUT,
+                    stdin=subprocess.DEVNULL,
+                    start_new_session=True
+                )
+            print(f"✅ 预览任务已在后台启动，日志: {preview_dir / 'preview.log'}")
+            return True
+            
+        except Exception as e:
+            print(f"⚠️  启动预览任务失败: {e}")
+            return False
+    
     def extract_audio_tracks(self, mp4_path):
         """步骤3: 提取音频轨道"""
         print(f"\n🎵 步骤3: 提取音频轨道")
@@ -223,7 +425,8 @@ class AutoRecordingWorkflow:
                 "python3",
                 str(self.extract_audio_script),
                 str(mp4_path),
-                "--tracks", "1", "2"
+                "--tracks", "1", "2",
+                "--format", self.audio_format
             ]
             
             print(f"🔧 执行命令: {' '.join(cmd)}")
@@ -242,8 +445,8 @@ class AutoRecordingWorkflow:
                 # 返回生成的音频文件路径
                 folder = mp4_path.parent
                 base_name = mp4_path.stem
-                self_audio = folder / f"{base_name}_自己.wav"
-                other_audio = folder / f"{base_name}_对方.wav"
+                self_audio = folder / f"{base_name}_自己.{self.audio_format}"
+                other_audio = folder / f"{base_name}_对方.{self.audio_format}"
                 
                 return self_audio, other_audio
             else:
@@ -254,6 +457,10 @@ class AutoRecordingWorkflow:
             print(f"❌ 音频提取过程中出错: {e}")
             return None, None
     
+    def transcription_output(self, self_audio):
+        """转录结果JSON的路径"""
+        return self_audio.parent / f"{self_audio.stem.replace('_自己', '')}_transcription.json"
+    
     def transcribe_audio(self, self_audio, other_audio):
         """步骤4: 转录音频"""
         print(f"\n🤖 步骤4: 转录音频")
@@ -263,7 +470,7 @@ class AutoRecordingWorkflow:
         
         try:
             # 生成输出文件路径
-            output_path = self_audio.parent / f"{self_audio.stem.replace('_自己', '')}_transcription.json"
+            output_path = self.transcription_output(self_audio)
             
             # 调用whisper_transcribe.py进行转录
             cmd = [
@@ -274,6 +481,10 @@ class AutoRecordingWorkflow:
                 "--output", str(output_path),
                 "--model", self.model
             ]
+            if self.cascade_fast_model:
+                cmd += ["--cascade", "--fast-model", self.cascade_fast_model]
+            if self.quantize:
+                cmd += ["--quantize", self.quantize]
             
             print(f"🔧 执行命令: {' '.join(cmd)}")
             
@@ -305,24 +516,20 @@ class AutoRecordingWorkflow:
         if transcription_path and transcription_path.exists():
             print(f"📄 转录文件: {transcription_path.name}")
             
-            # 显示转录统计
+            # 显示转录统计（转录时已写入 recordings/.stats.json）
             try:
-                import json
-                with open(transcription_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                
-                total_segments = len(data)
-                self_segments = len([item for item in data if item['speaker'] == '自己'])
-                other_segments = len([item for item in data if item['speaker'] == '对方'])
+                from talk_stats import (STATS_FILE_NAME, format_stats, load_store,
+                                        transcript_signature, update_meeting_stats)
+                store = load_store(self.recordings_dir / STATS_FILE_NAME)
+                entry = store["meetings"].get(transcription_path.parent.name)
+                if entry and entry["signature"] == transcript_signature(transcription_path):
+                    stats = entry["stats"]
+                else:
+                    stats = update_meeting_stats(transcription_path)
                 
                 print(f"📊 转录统计:")
-                print(f"   总片段数: {total_segments}")
-                print(f"   自己: {self_segments} 片段")
-                print(f"   对方: {other_segments} 片段")
-                
-                if data:
-                    duration = data[-1]['end'] - data[0]['start']
-                    print(f"   录制时长: {duration:.1f} 秒")
+                print(f"   总片段数: {sum(s['segments'] for s in stats['speakers'].values())}")
+                print("\n".join(format_stats(stats)))
                     
             except Exception as e:
                 print(f"⚠️  读取转录文件统计时出错: {e}")
@@ -332,6 +539,8 @@ class AutoRecordingWorkflow:
     def run_workflow(self):
         """运行完整工作流程"""
         start_time = time.time()
+        # 本次流程中所有子进程记录的指标使用同一个job id
+        os.environ[JOB_ENV] = f"{self.teacher_name}_{datetime.now().strftime('%Y%m%d-%H%M%S')}"
         
         # 检查脚本
         if not self.check_scripts_exist():
@@ -340,7 +549,9 @@ class AutoRecordingWorkflow:
         
         try:
             # 步骤1: 录制
-            if not self.run_recording():
+            with stage("workflow:record"):
+                recorded = self.run_recording()
+            if not recorded:
                 print("❌ 录制失败，工作流程终止")
                 return False
             
@@ -353,7 +564,8 @@ class AutoRecordingWorkflow:
             # 检查是否需要处理原始录制文件
             if video_path.parent == self.recordings_dir:
                 # 文件在根目录，需要处理
-                mp4_path = self.process_raw_recording(video_path)
+                with stage("workflow:convert"):
+                    mp4_path = self.process_raw_recording(video_path)
                 if not mp4_path:
                     print("❌ 处理原始录制文件失败，工作流程终止")
                     return False
@@ -361,21 +573,10 @@ class AutoRecordingWorkflow:
                 # 文件已经在子文件夹中，直接使用
                 mp4_path = video_path
             
-            # 步骤3: 提取音频
-            self_audio, other_audio = self.extract_audio_tracks(mp4_path)
-            if not self_audio or not other_audio:
-                print("❌ 音频提取失败，工作流程终止")
+            # 步骤2.6 ~ 4: 预览、提取音频、转录
+            if not self.process_meeting(mp4_path):
                 return False
             
-            # 步骤4: 转录
-            transcription_path = self.transcribe_audio(self_audio, other_audio)
-            if not transcription_path:
-                print("❌ 转录失败，但前面的步骤已完成")
-                transcription_path = None
-            
-            # 显示最终结果
-            self.show_final_results(mp4_path, transcription_path)
-            
             total_time = time.time() - start_time
             print(f"\n⏱️  工作流程总耗时: {total_time/60:.1f} 分钟")
             
@@ -400,12 +601,18 @@ def main():
   python3 src/auto_recording_workflow.py SamT medium
   python3 src/auto_recording_workflow.py "John Smith" large
   python3 src/auto_recording_workflow.py 王老师 small
+  python3 src/auto_recording_workflow.py SamT medium --cascade tiny
+  python3 src/auto_recording_workflow.py SamT large --quantize int8
+  python3 src/auto_recording_workflow.py SamT medium --audio-format flac
+  python3 src/auto_recording_workflow.py --folder recordings/SamT_2025-06-11_07-49-26
+  python3 src/auto_recording_workflow.py SamT medium --all --force transcribe
         """
     )
     
     parser.add_argument(
         'teacher_name',
-        help='老师名字，作为录制文件前缀'
+        nargs='?',
+        help='老师名字，作为录制文件前缀（--all 时只处理这位老师的会议文件夹）'
     )
     
     parser.add_argument(
@@ -416,16 +623,89 @@ def main():
         help='Whisper模型大小 (默认: small)'
     )
     
+    parser.add_argument(
+        '--no-previews',
+        action='store_true',
+        help='不在后台生成预览文件（缩略图雪碧图）'
+    )
+    
+    parser.add_argument(
+        '--proxy',
+        action='store_true',
+        help='预览文件包含低码率代理视频'
+    )
+    
+    parser.add_argument(
+        '--cascade',
+        nargs='?',
+        const='base',
+        choices=['tiny', 'base'],
+        metavar='FAST_MODEL',
+        help='级联解码：先用小模型 (默认: base) 识别，只把不可靠的片段交给 model 重新识别'
+    )
+    
+    parser.add_argument(
+        '--quantize',
+        choices=['int8'],
+        help='CPU推理时使用int8动态量化模型（第一次转换后缓存在磁盘上）'
+    )
+    
+    parser.add_argument(
+        '--audio-format',
+        choices=AUDIO_FORMATS,
+        default=DEFAULT_FORMAT,
+        help='提取的音轨格式 (默认: wav)；flac是无损压缩，体积约为一半，转录结果相同'
+    )
+    
+    parser.add_argument(
+        '--folder',
+        nargs='+',
+        metavar='FOLDER',
+        help='不录制，重新处理已有的会议文件夹；只重新运行输出过期的阶段（按 .build.json 判断）'
+    )
+    
+    parser.add_argument(
+        '--all',
+        action='store_true',
+        help='不录制，重新处理 recordings/ 中的所有会议文件夹（指定老师名字时只处理这位老师的）'
+    )
+    
+    parser.add_argument(
+        '--force',
+        nargs='+',
+        choices=STAGES + ('all',),
+        default=[],
+        metavar='STAGE',
+        help=f'即使输出是最新的也重新运行这些阶段: {", ".join(STAGES)}, all'
+    )
+    
     args = parser.parse_args()
+    if not args.teacher_name and not (args.folder or args.all):
+        parser.error("需要老师名字，或者使用 --folder / --all 处理已有的会议文件夹")
+    force = STAGES if 'all' in args.force else args.force
     
     # 创建工作流程控制器
     workflow = AutoRecordingWorkflow(
         teacher_name=args.teacher_name,
-        model=args.model
+        model=args.model,
+        previews=not args.no_previews,
+        proxy=args.proxy,
+        cascade_fast_model=args.cascade,
+        quantize=args.quantize,
+        audio_format=args.audio_format,
+        force=force
     )
     
     # 运行工作流程
-    success = workflow.run_workflow()
+    if args.folder or args.all:
+        folders = [Path(folder) for folder in args.folder or []]
+        if args.all:
+            pattern = f"{args.teacher_name}_*" if args.teacher_name else "*"
+            folders += sorted(p for p in workflow.recordings_dir.glob(pattern)
+                              if p.is_dir() and (any(p.glob("*.mp4")) or any(p.glob("*.mkv"))))
+        success = workflow.run_folders(folders)
+    else:
+        success = workflow.run_workflow()
     
     if success:
         print("\n🎊 工作流程成功完成！")
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量转录调度器
+把所有待转录音轨（自己、对方，以及排队中的其他会议）切成不超过30秒的窗口，
+轮流从每条音轨取窗口凑成一个batch交给识别后端一次解码，
+再按音轨和时间偏移把结果送回对应的会议。
+
+CPU上一次解码多个窗口比逐个解码的吞吐量高得多，
+也不再受"两个进程各转一条音轨"的并行度限制。
+使用 --vad 时每条音轨先去掉静音，只把语音区域拼成的紧凑音频切成窗口；
+使用 --suppress-crosstalk 时还会去掉另一条音轨串过来的声音（见 crosstalk.py）。
+
+用法:
+  python3 src/batch_scheduler.py "recordings/SamT_2025-06-20 10-00-00"
+  python3 src/batch_scheduler.py recordings/A recordings/B --batch-size 16 --backend whisper
+
+作者: VideoMeetingTranscript
+"""
+
+import sys
+import time
+import argparse
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from quantize import QUANTIZE_MODES
+from asr_backends import BACKENDS, DECODING_MODES, SAMPLE_RATE, SEGMENT_FIELDS
+
+WINDOW_SECONDS = 30.0
+# 在窗口末尾这段范围内找能量最低的位置切开，尽量不切断单词
+CUT_SEARCH_SECONDS = 3.0
+CUT_FRAME_SECONDS = 0.02
+DEFAULT_BATCH_SIZE = 8
+
+
+def load_audio(audio_file) -> np.ndarray:
+    """读取为16kHz单声道float32（wav或flac）"""
+    from audio_io import load_audio as read_track
+    audio, _ = read_track(audio_file, sr=SAMPLE_RATE)
+    return audio.astype(np.float32, copy=False)
+
+
+def find_cut(audio: np.ndarray, start: int, end: int, search: int) -> int:
+    """在 [end - search, end) 内找能量最低的帧作为窗口结束位置"""
+    if end >= len(audio):
+        return len(audio)
+    frame = int(CUT_FRAME_SECONDS * SAMPLE_RATE)
+    lo = max(start + frame, end - search)
+    count = (end - lo) // frame
+    if count <= 1:
+        return end
+    frames = audio[lo:lo + count * frame].reshape(count, frame)
+    quietest = int(np.argmin(np.mean(frames ** 2, axis=1)))
+    return lo + quietest * frame + frame // 2
+
+
+@dataclass
+class TrackJob:
+    """一条待转录的音轨"""
+    audio_file: Path
+    speaker: str
+    meeting: str
+    audio: Optional[np.ndarray] = None
+    position: int = 0                       # 下一个窗口的起点（采样点）
+    windows: int = 0
+    segments: List[dict] = field(default_factory=list)
+    mapping: Optional[list] = None          # VAD紧凑音频到原始时间线的映射
+    mapping_starts: Optional[list] = None
+    exclude: Optional[list] = None          # 需要跳过的区域（串音）
+
+    @property
+    def exhausted(self) -> bool:
+        return self.audio is not None and self.position >= len(self.audio)
+
+    def next_window(self, window_samples: int, search_samples: int):
+        """
+        切出下一个窗口
+
+        Returns:
+            (窗口起点秒数, 采样数组)，音轨已读完时返回None
+        """
+        if self.exhausted:
+            return None
+        start = self.position
+        end = find_cut(self.audio, start, start + window_samples, search_samples)
+        self.position = end
+        self.windows += 1
+        return start / SAMPLE_RATE, self.audio[start:end]
+
+    def apply_vad(self, threshold: float) -> None:
+        """只保留语音区域，后续窗口都从紧凑音频中切出"""
+        from split_audio import find_speech_regions, compact_speech
+        regions = find_speech_regions(self.audio, SAMPLE_RATE, silence_threshold=threshold)
+        if self.exclude:
+            from crosstalk import subtract_regions
+            regions = subtract_regions(regions, self.exclude)
+        total = len(self.audio) / SAMPLE_RATE
+        self.audio, self.mapping = compact_speech(self.audio, SAMPLE_RATE, regions)
+        self.mapping_starts = [m[0] for m in self.mapping]
+        speech = sum(length for _, _, length in self.mapping)
+        print(f"🔇 VAD {self.meeting} / {self.speaker}: 保留 {speech:.0f}/{total:.0f}秒 "
+              f"({speech / max(total, 1e-6) * 100:.0f}%)")
+
+    def to_track_time(self, t: float) -> float:
+        if self.mapping is None:
+            return t
+        from split_audio import to_original_time
+        return to_original_time(t, self.mapping, self.mapping_starts)
+
+    def add_segments(self, offset: float, duration: float, segments: List[dict]) -> None:
+        """把窗口内的相对时间换算成音轨上的绝对时间（附加字段是否写入结果由 to_transcriptions 决定）"""
+        for seg in segments:
+            start = min(max(0.0, seg['start']), duration)
+            end = min(max(start, seg['end']), duration)
+            self.segments.append({
+                "start": self.to_track_time(offset + start),
+                "end": self.to_track_time(offset + end),
+                "text": seg['text'],
+                **{field: seg[field] for field in SEGMENT_FIELDS if field in seg},
+            })
+
+
+class BatchScheduler:
+    """跨音轨、跨会议的批量解码调度"""
+
+    def __init__(self, backend, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_active_tracks: Optional[int] = None, window_seconds: float = WINDOW_SECONDS,
+                 vad: bool = False, vad_threshold: float = 0.01, suppress_crosstalk: bool = False):
+        """
+        Args:
+            backend: 识别后端 (asr_backends.ASRBackend)
+            batch_size: 每次解码的窗口数
+            max_active_tracks: 同时载入内存的音轨数（默认等于batch_size，至少2）
+            window_seconds: 窗口最大时长，不能超过Whisper的30秒输入
+            vad: 为True时先去掉静音，只解码语音区域
+            vad_threshold: VAD的静音RMS阈值
+            suppress_crosstalk: 为True时add_meeting会检测两条音轨的串音并跳过（自动启用VAD）
+        """
+        self.backend = backend
+        self.batch_size = max(1, batch_size)
+        self.max_active_tracks = max_active_tracks or max(2, self.batch_size)
+        self.window_samples = int(min(window_seconds, WINDOW_SECONDS) * SAMPLE_RATE)
+        self.search_samples = int(CUT_SEARCH_SECONDS * SAMPLE_RATE)
+        self.vad = vad or suppress_crosstalk
+        self.suppress_crosstalk = suppress_crosstalk
+        self.vad_threshold = vad_threshold
+        self.queue = deque()
+        self.stats = {"batches": 0, "windows": 0, "audio_seconds": 0.0, "decode_seconds": 0.0}
+
+    def add_track(self, audio_file, speaker: str, meeting: Optional[str] = None,
+                  exclude: Optional[list] = None) -> TrackJob:
+        job = TrackJob(Path(audio_file), speaker, meeting or Path(audio_file).parent.name, exclude=exclude)
+        self.queue.append(job)
+        return job
+
+    def add_meeting(self, self_audio, other_audio, meeting: Optional[str] = None,
+                    exclude: Optional[dict] = None):
+        """
+        加入一个会议的两条音轨
+
+        Args:
+            exclude: {"自己": [...], "对方": [...]} 每条音轨需要跳过的区域；
+                     为None且开启了suppress_crosstalk时在这里检测串音
+        """
+        meeting = meeting or Path(self_audio).parent.name
+        if exclude is None and self.suppress_crosstalk:
+            from crosstalk import detect_crosstalk_files
+            exclude = detect_crosstalk_files(self_audio, other_audio)
+            print(f"🔁 {meeting}: 串音区域 自己 {len(exclude['自己'])} 个, 对方 {len(exclude['对方'])} 个")
+        exclude = exclude or {}
+        return (self.add_track(self_audio, "自己", meeting, exclude.get("自己")),
+                self.add_track(other_audio, "对方", meeting, exclude.get("对方")))
+
+    def _next_batch(self, active: List[TrackJob]):
+        """轮流从每条活动音轨取一个窗口，直到凑满一个batch"""
+        batch = []
+        while len(batch) < self.batch_size:
+            added = False
+            for job in active:
+                if len(batch) >= self.batch_size:
+                    break
+                window = job.next_window(self.window_samples, self.search_samples)
+                if window is not None:
+                    batch.append((job, window[0], window[1]))
+                    added = True
+            if not added:
+                break
+        return batch
+
+    def run(self, on_track_done: Optional[Callable[[TrackJob], None]] = None) -> List[TrackJob]:
+        """
+        转录队列中的所有音轨
+
+        Args:
+            on_track_done: 每条音轨完成时的回调（此时job.segments已按时间排序）
+
+        Returns:
+            list: 完成的音轨，按完成的先后排列
+        """
+        finished = []
+        active = []
+        while self.queue or active:
+            while self.queue and len(active) < self.max_active_tracks:
+                job = self.queue.popleft()
+                print(f"📥 载入音轨: {job.meeting} / {job.speaker} ({job.audio_file.name})")
+                job.audio = load_audio(job.audio_file)
+                if self.vad:
+                    job.apply_vad(self.vad_threshold)
+                active.append(job)
+
+            batch = self._next_batch(active)
+            if batch:
+                decode_start = time.time()
+                results = self.backend.transcribe_batch([samples for _, _, samples in batch])
+                decode_time = time.time() - decode_start
+                audio_seconds = sum(len(samples) for _, _, samples in batch) / SAMPLE_RATE
+                for (job, offset, samples), segments in zip(batch, results):
+                    job.add_segments(offset, len(samples) / SAMPLE_RATE, segments)
+
+                self.stats["batches"] += 1
+                self.stats["windows"] += len(batch)
+                self.stats["audio_seconds"] += audio_seconds
+                self.stats["decode_seconds"] += decode_time
+                print(f"⚙️ batch {self.stats['batches']}: {len(batch)} 个窗口, "
+                      f"{audio_seconds:.0f}秒音频, 耗时 {decode_time:.1f}秒 "
+                      f"({audio_seconds / max(decode_time, 1e-6):.1f}x 实时)")
+
+            for job in [job for job in active if job.exhausted]:
+                active.remove(job)
+                job.audio = None
+                job.segments.sort(key=lambda s: (s['start'], s['end']))
+                finished.append(job)
+                if on_track_done:
+                    on_track_done(job)
+        return finished
+
+
+def find_meeting_audio(folder: Path):
+    """返回会议文件夹中的 (自己音轨, 对方音轨, 输出JSON路径)，找不到时返回None"""
+    from audio_io import track_base_name
+    from whisper_transcribe import find_audio_files
+    self_audio, other_audio = find_audio_files(folder)
+    if not self_audio:
+        return None
+    base_name = track_base_name(self_audio)
+    return self_audio, other_audio, folder / f"{base_name}_transcription.json"
+
+
+def transcribe_meetings(folders, backend, batch_size: int = DEFAULT_BATCH_SIZE,
+                        recordings_dir: Optional[Path] = None, vad: bool = False,
+                        vad_threshold: float = 0.01, suppress_crosstalk: bool = False,
+                        filter_segments: bool = True) -> int:
+    """
+    批量转录多个会议，每个会议的两条音轨都完成后立即写出结果
+
+    Returns:
+        int: 成功写出的会议数
+    """
+    from whisper_transcribe import to_transcriptions, save_dual_transcriptions
+    from transcript_filter import filter_dual, format_stats as format_filter_stats
+
+    scheduler = BatchScheduler(backend, batch_size=batch_size, vad=vad, vad_threshold=vad_threshold,
+                               suppress_crosstalk=suppress_crosstalk)
+    outputs = {}
+    for folder in folders:
+        found = find_meeting_audio(Path(folder))
+        if not found:
+            print(f"⚠️ 跳过 {folder}: 没有找到 *_自己 / *_对方 音轨 (.wav/.flac)")
+            continue
+        self_audio, other_audio, output_path = found
+        scheduler.add_meeting(self_audio, other_audio, Path(folder).name)
+        outputs[Path(folder).name] = {"output": output_path, "audio": {"自己": self_audio, "对方": other_audio}}
+
+    def on_track_done(job: TrackJob):
+        meeting = outputs[job.meeting]
+        meeting[job.speaker] = to_transcriptions(job.segments, job.speaker, backend.segment_fields)
+        print(f"✅ {job.meeting} / {job.speaker}: {len(meeting[job.speaker])} 个片段 ({job.windows} 个窗口)")
+        if "自己" in meeting and "对方" in meeting:
+            if filter_segments:
+                meeting["自己"], meeting["对方"], stats = filter_dual(meeting["自己"], meeting["对方"],
+                                                                   audio_files=meeting["audio"])
+                print(f"🧹 {job.meeting}: {format_filter_stats(stats)}")
+            save_dual_transcriptions(meeting["自己"], meeting["对方"], meeting["output"], recordings_dir)
+            print(f"📄 {job.meeting}: {meeting['output']}")
+
+    scheduler.run(on_track_done)
+    stats = scheduler.stats
+    if stats["decode_seconds"]:
+        print(f"📊 {stats['batches']} 个batch, {stats['windows']} 个窗口, "
+              f"{stats['audio_seconds'] / 60:.1f} 分钟音频, 解码 {stats['decode_seconds']:.1f}秒 "
+              f"({stats['audio_seconds'] / stats['decode_seconds']:.1f}x 实时)")
+    if backend.decoding == "adaptive":
+        print(f"🎯 自适应解码: {backend.format_decode_stats()}")
+    return sum(1 for meeting in outputs.values() if "自己" in meeting and "对方" in meeting)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量转录一个或多个会议文件夹")
+    parser.add_argument('meetings', nargs='+', help='会议文件夹（包含 *_自己 和 *_对方 音轨，.wav或.flac）')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'每次解码的30秒窗口数 (默认: {DEFAULT_BATCH_SIZE})')
+    parser.add_argument('--vad', action='store_true', help='先做能量VAD，只解码有声音的区域')
+    parser.add_argument('--vad-threshold', type=float, default=0.01, help='VAD静音RMS阈值 (默认: 0.01)')
+    parser.add_argument('--no-filter', action='store_true', help='保留重复/循环/串音的片段，不做过滤')
+    parser.add_argument('--suppress-crosstalk', action='store_true', help='跳过两条音轨之间的串音区域（自动启用VAD）')
+    parser.add_argument('--backend', choices=list(BACKENDS), help='识别后端 (默认: 配置文件中的transcription.backend)')
+    parser.add_argument('--model', type=str, help='模型名称 (默认: 配置文件中的transcription.model)')
+    parser.add_argument('--decoding', choices=DECODING_MODES,
+                        help='解码策略 (默认: 配置文件中的transcription.decoding或beam)')
+    parser.add_argument('--quantize', choices=QUANTIZE_MODES, help='CPU推理时使用int8动态量化模型')
+    parser.add_argument('--threads', type=int, help='计算线程数 (默认: 可用物理核心数，考虑cgroup配额)')
+    parser.add_argument('--cpu-affinity', action='store_true', help='把进程绑定到分配的CPU核心上')
+    args = parser.parse_args()
+
+    from cpu_scheduler import apply_worker_settings, plan_workers
+    from whisper_transcribe import load_backend
+    plan = plan_workers(1, threads=args.threads, affinity=args.cpu_affinity)
+    apply_worker_settings(plan.threads, plan.cpu_sets[0] if plan.cpu_sets else None)
+    print(f"🧵 CPU分配: {plan.budget.describe()}; {plan.describe()}")
+    backend = load_backend(args.backend, args.model, decoding=args.decoding, quantize=args.quantize)
+    recordings_dir = Path(__file__).parent.parent / "recordings"
+
+    start_time = time.time()
+    done = transcribe_meetings(args.meetings, backend, args.batch_size, recordings_dir,
+                               vad=args.vad, vad_threshold=args.vad_threshold,
+                               suppress_crosstalk=args.suppress_crosstalk,
+                               filter_segments=not args.no_filter)
+    print(f"\n✅ 完成 {done}/{len(args.meetings)} 个会议，总耗时 {time.time() - start_time:.1f}秒")
+    sys.exit(0 if done == len(args.meetings) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会议处理阶段的构建记录
+每个会议文件夹中的 .build.json 记录各阶段（remux / extract / transcribe）上一次成功运行时的
+输入指纹、输出指纹和阶段参数。再次处理同一个文件夹时，只有记录对不上的阶段才会重新运行，
+类似 make：
+
+  - 输入指纹: 文件名、大小、mtime 和快速抽样哈希（文件头尾和中间均匀抽取的若干块）
+    mtime没变时直接沿用记录的哈希；mtime变了但内容相同（例如重新提取出逐位相同的音轨）仍然算最新
+  - 阶段参数: 模型、音轨格式、转录配置等；参数变化就重新运行
+  - 阶段版本: STAGE_VERSIONS，某个阶段的输出格式或算法改变时把对应的版本号加一，
+    重新处理整个录音库时只会重跑这一个阶段（下游阶段只有在输入内容真的变化时才会重跑）
+  - 输出被删除或被外部修改时也会重新运行
+
+用法:
+  python3 src/build_manifest.py status recordings/SamT_2025-06-11_07-49-26
+  python3 src/build_manifest.py clear recordings/SamT_2025-06-11_07-49-26 --stage transcribe
+
+作者: VideoMeetingTranscript
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+MANIFEST_NAME = ".build.json"
+MANIFEST_VERSION = 1
+STAGES = ("remux", "extract", "transcribe")
+STAGE_VERSIONS = {
+    "remux": 1,
+    "extract": 1,
+    "transcribe": 1,
+}
+# 抽样哈希：小于 SAMPLE_BLOCKS × SAMPLE_BYTES 的文件读取全部内容
+SAMPLE_BLOCKS = 16
+SAMPLE_BYTES = 64 * 1024
+
+
+def sampled_hash(path: Path, size: Optional[int] = None) -> str:
+    """文件大小 + 头尾和中间均匀抽取的 SAMPLE_BLOCKS 块内容的SHA256"""
+    size = path.stat().st_size if size is None else size
+    digest = hashlib.sha256(str(size).encode('ascii'))
+    with open(path, 'rb') as f:
+        if size <= SAMPLE_BLOCKS * SAMPLE_BYTES:
+            digest.update(f.read())
+        else:
+            step = (size - SAMPLE_BYTES) / (SAMPLE_BLOCKS - 1)
+            for i in range(SAMPLE_BLOCKS):
+                f.seek(int(i * step))
+                digest.update(f.read(SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+def fingerprint(path: Path, known: Optional[dict] = None) -> dict:
+    """
+    文件指纹 {size, mtime_ns, hash}
+
+    known: 上次记录的指纹，大小和mtime都没变时直接沿用其中的哈希
+    """
+    stat = path.stat()
+    if known and known.get("size") == stat.st_size and known.get("mtime_ns") == stat.st_mtime_ns:
+        return dict(known)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": sampled_hash(path, stat.st_size)}
+
+
+def _same_content(a: dict, b: dict) -> bool:
+    return a.get("size") == b.get("size") and a.get("hash") == b.get("hash")
+
+
+class BuildManifest:
+    """一个会议文件夹的构建记录"""
+
+    def __init__(self, folder):
+        self.folder = Path(folder)
+        self.path = self.folder / MANIFEST_NAME
+        self.data = self._load()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {"version": MANIFEST_VERSION, "stages": {}}
+        if data.get("version") != MANIFEST_VERSION:
+            return {"version": MANIFEST_VERSION, "stages": {}}
+        return data
+
+    def save(self):
+        tmp_file = self.path.with_name(f"{MANIFEST_NAME}.{os.getpid()}.tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        tmp_file.replace(self.path)
+
+    def _key(self, path: Path) -> str:
+        """文件夹内的文件用相对路径记录，整个文件夹移动后记录仍然有效"""
+        try:
+            return str(Path(path).relative_to(self.folder))
+        except ValueError:
+            return str(Path(path).resolve())
+
+    def _path(self, key: str) -> Path:
+        return Path(key) if os.path.isabs(key) else self.folder / key
+
+    def entry(self, stage: str) -> Optional[dict]:
+        return self.data["stages"].get(stage)
+
+    def check(self, stage: str, inputs: Iterable[Path], outputs: Iterable[Path],
+              params: Optional[dict] = None) -> Tuple[bool, str]:
+        """
+        判断阶段的输出是否是最新的
+
+        Returns:
+            (是否最新, 需要重新运行的原因)
+        """
+        entry = self.entry(stage)
+        if not entry:
+            return False, "没有构建记录"
+        if entry.get("stage_version") != STAGE_VERSIONS[stage]:
+            return False, f"阶段版本 {entry.get('stage_version')} -> {STAGE_VERSIONS[stage]}"
+        params = params or {}
+        if entry.get("params") != params:
+            changed = sorted(k for k in set(params) | set(entry.get("params") or {})
+                             if params.get(k) != (entry.get("params") or {}).get(k))
+            return False, f"参数变化: {', '.join(changed)}"
+
+        for kind, paths in (("输入", inputs), ("输出", outputs)):
+            recorded = entry.get("inputs" if kind == "输入" else "outputs") or {}
+            keys = [self._key(p) for p in paths]
+            if set(keys) != set(recorded):
+                return False, f"{kind}文件变化"
+            for key in keys:
+                path = self._path(key)
+                if not path.exists():
+                    return False, f"{kind}不存在: {path.name}"
+                if not _same_content(fingerprint(path, recorded[key]), recorded[key]):
+                    return False, f"{kind}已修改: {path.name}"
+        return True, "最新"
+
+    def record(self, stage: str, inputs: Iterable[Path], outputs: Iterable[Path],
+               params: Optional[dict] = None, seconds: Optional[float] = None):
+        """阶段成功完成后记录输入、输出指纹和参数"""
+        previous = self.entry(stage) or {}
+
+        def prints(paths, recorded):
+            result = {}
+            for path in paths:
+                key = self._key(path)
+                result[key] = fingerprint(Path(path), recorded.get(key))
+            return result
+
+        self.data["stages"][stage] = {
+            "stage_version": STAGE_VERSIONS[stage],
+            "params": params or {},
+            "inputs": prints(inputs, previous.get("inputs") or {}),
+            "outputs": prints(outputs, previous.get("outputs") or {}),
+            "built_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }
+        if seconds is not None:
+            self.data["stages"][stage]["seconds"] = round(seconds, 3)
+        self.save()
+
+    def refresh(self, stage: str):
+        """输入输出内容没变但mtime变了时更新记录中的mtime，下次不必重新计算哈希"""
+        entry = self.entry(stage)
+        if not entry:
+            return
+        changed = False
+        for field in ("inputs", "outputs"):
+            for key, known in (entry.get(field) or {}).items():
+                path = self._path(key)
+                if path.exists():
+                    current = fingerprint(path, known)
+                    if current != known and _same_content(current, known):
+                        entry[field][key] = current
+                        changed = True
+        if changed:
+            self.save()
+
+    def clear(self, stage: Optional[str] = None):
+        if stage:
+            self.data["stages"].pop(stage, None)
+        else:
+            self.data["stages"] = {}
+        self.save()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会议文件夹的阶段构建记录")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_status = sub.add_parser('status', help='显示各阶段的构建记录')
+    p_status.add_argument('folders', nargs='+', help='会议文件夹')
+
+    p_clear = sub.add_parser('clear', help='删除构建记录，下次运行工作流程时重新处理')
+    p_clear.add_argument('folders', nargs='+', help='会议文件夹')
+    p_clear.add_argument('--stage', choices=STAGES, help='只删除这个阶段的记录 (默认: 全部)')
+    args = parser.parse_args()
+
+    for folder in args.folders:
+        folder = Path(folder)
+        if not folder.is_dir():
+            print(f"❌ 不是文件夹: {folder}")
+            sys.exit(1)
+        manifest = BuildManifest(folder)
+        if args.command == 'clear':
+            manifest.clear(args.stage)
+            print(f"🗑️ {folder.name}: 已删除{args.stage or '全部'}阶段的构建记录")
+            continue
+
+        print(f"📂 {folder.name}")
+        for stage_name in STAGES:
+            entry = manifest.entry(stage_name)
+            if not entry:
+                print(f"  {stage_name:<10} -")
+                continue
+            outputs = ", ".join(entry.get("outputs") or {}) or "-"
+            stale = "" if entry.get("stage_version") == STAGE_VERSIONS[stage_name] else " (阶段版本已更新)"
+            print(f"  {stage_name:<10} {entry.get('built_at')}  {outputs}{stale}")
+
+
+if __name__ == '__main__':
+    main()
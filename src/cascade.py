@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+两级级联解码
+先用快速的小模型（tiny/base）识别整段音频，再只把不可靠的片段交给大模型重新识别：
+  - logprob:     平均对数概率过低（模型没把握）
+  - compression: 文本压缩率过高（循环输出）
+  - no_speech:   模型认为这里多半没人说话却输出了文字（幻觉）
+需要重新识别的片段前后各加一点余量，相邻的合并成不超过30秒的区域，
+大模型的结果按时间替换掉区域内小模型的片段。大模型只在第一次需要时才加载，
+整段都可靠时完全不会加载。
+
+CascadeBackend 实现了 ASRBackend 的接口，转录流程和批量调度器可以直接使用。
+解码策略（beam / greedy / adaptive）由两个模型各自执行，级联本身不再套一层；
+两个模型的回退统计汇总在 decode_stats 中。
+
+用法:
+  python3 src/whisper_transcribe.py --cascade --fast-model base --model medium
+  python3 src/cascade.py recordings/xxx/xxx_对方.wav --fast-model tiny --model medium
+  python3 src/cascade.py recordings/xxx/xxx_对方.wav --decoding adaptive
+
+作者: VideoMeetingTranscript
+"""
+
+import json
+import argparse
+from collections import Counter
+from typing import List, Optional
+
+from asr_backends import (SEGMENT_FIELDS, ASRBackend, clip_source, load_transcription_config,
+                          low_confidence_reason, read_audio, redecode_regions, source_seconds, splice_regions)
+
+DEFAULT_FAST_MODEL = "base"
+DEFAULT_LOGPROB_THRESHOLD = -0.8
+DEFAULT_COMPRESSION_THRESHOLD = 2.4
+DEFAULT_NO_SPEECH_THRESHOLD = 0.6
+
+
+class CascadeBackend(ASRBackend):
+    """小模型全量识别 + 大模型只识别不可靠片段"""
+
+    name = "cascade"
+
+    def __init__(self, fast: ASRBackend, slow: ASRBackend,
+                 logprob_threshold: float = DEFAULT_LOGPROB_THRESHOLD,
+                 compression_threshold: float = DEFAULT_COMPRESSION_THRESHOLD,
+                 no_speech_threshold: float = DEFAULT_NO_SPEECH_THRESHOLD):
+        if fast.decoding != slow.decoding:
+            raise ValueError(f"级联的两个模型必须使用相同的解码策略 ({fast.decoding} / {slow.decoding})")
+        super().__init__(slow.model_size, slow.language, decoding=slow.decoding)
+        self.fast = fast
+        self.slow = slow
+        # 两个模型各自的解码统计（decode_stats 是两者之和）
+        self.model_decode_stats = {"fast": Counter(), "slow": Counter()}
+        self.capabilities = dict(fast.capabilities)
+        self.thresholds = dict(logprob_threshold=logprob_threshold,
+                               compression_threshold=compression_threshold,
+                               no_speech_threshold=no_speech_threshold)
+        self.stats = Counter()
+
+    def describe(self) -> str:
+        return f"{self.name} ({self.fast.describe()} -> {self.slow.describe()})"
+
+    def _load_model(self):
+        # 只加载小模型，大模型第一次需要时才加载
+        self.fast.load()
+        return True
+
+    def transcribe(self, audio, **options) -> List[dict]:
+        # 解码策略由两个子后端执行
+        self.load()
+        return self._transcribe(audio, **options)
+
+    def transcribe_batch(self, windows, **options) -> List[List[dict]]:
+        self.load()
+        if not windows:
+            return []
+        return self._transcribe_batch(windows, **options)
+
+    def _run(self, role: str, method, *args, **options):
+        """调用子后端，把它新增的解码统计记到级联的统计中"""
+        backend = self.fast if role == "fast" else self.slow
+        before = Counter(backend.decode_stats)
+        result = method(*args, **options)
+        delta = Counter({key: value - before[key] for key, value in backend.decode_stats.items()})
+        self.model_decode_stats[role].update(delta)
+        self.decode_stats.update(delta)
+        return result
+
+    def clear_stats(self):
+        self.stats.clear()
+        self.decode_stats.clear()
+        for counter in self.model_decode_stats.values():
+            counter.clear()
+
+    def format_decode_stats(self, stats=None) -> str:
+        if stats is not None:
+            return super().format_decode_stats(stats)
+        parts = [f"{label} {super(CascadeBackend, self).format_decode_stats(self.model_decode_stats[role])}"
+                 for role, label in (("fast", self.fast.model_size), ("slow", self.slow.model_size))
+                 if self.model_decode_stats[role]]
+        return "; ".join(parts) or super().format_decode_stats()
+
+    @property
+    def segment_fields(self):
+        # 级联解码的结果总是记录解码路径和置信度，便于检查哪些片段由大模型重新识别
+        return SEGMENT_FIELDS
+
+    def _flag(self, segments: List[dict]) -> List[dict]:
+        flagged = []
+        for seg in segments:
+            reason = low_confidence_reason(seg, **self.thresholds)
+            self.stats["segments"] += 1
+            if reason:
+                self.stats[reason] += 1
+                flagged.append(seg)
+        return flagged
+
+    def _transcribe(self, audio, **options) -> List[dict]:
+        # 两个模型的特征维数相同时，大模型直接从缓存的特征中截取需要重新识别的区域
+        features = self.slow.features_for(audio) if self.fast.n_mels == self.slow.n_mels else None
+        audio = features if features is not None else read_audio(audio)
+        # 整段音频交给小模型自己分窗，重新识别的区域都不超过30秒
+        return self._refine([audio], [self._run("fast", self.fast.transcribe, audio, **options)], **options)[0]
+
+    def _transcribe_batch(self, windows, **options) -> List[List[dict]]:
+        return self._refine(windows, self._run("fast", self.fast.transcribe_batch, windows, **options), **options)
+
+    def _refine(self, windows, fast_results, **options) -> List[List[dict]]:
+        """收集所有窗口中需要重新识别的区域，大模型一起批量解码后拼回去"""
+        jobs = []
+        for index, (window, segments) in enumerate(zip(windows, fast_results)):
+            duration = source_seconds(window)
+            for start, end in redecode_regions(self._flag(segments), duration):
+                jobs.append((index, start, end))
+        if not jobs:
+            return fast_results
+
+        clips = [clip_source(windows[index], start, end) for index, start, end in jobs]
+        slow_results = self._run("slow", self.slow.transcribe_batch, clips, **options)
+        for segments in slow_results:
+            for seg in segments:
+                seg["model"] = self.slow.model_size
+        self.stats["regions"] += len(jobs)
+        self.stats["slow_seconds"] += sum(end - start for _, start, end in jobs)
+
+        outputs = []
+        for index, segments in enumerate(fast_results):
+            mine = [(job, result) for job, result in zip(jobs, slow_results) if job[0] == index]
+            if not mine:
+                outputs.append(segments)
+                continue
+            outputs.append(splice_regions(segments, [(start, end) for (_, start, end), _ in mine],
+                                          [result for _, result in mine]))
+        return outputs
+
+    def format_stats(self, audio_seconds: Optional[float] = None) -> str:
+        s = self.stats
+        reasons = ", ".join(f"{r} {s[r]}" for r in ("logprob", "compression", "no_speech") if s[r]) or "无"
+        share = f" ({s['slow_seconds'] / audio_seconds:.0%})" if audio_seconds else ""
+        return (f"{s['segments']} 个片段中 {sum(s[r] for r in ('logprob', 'compression', 'no_speech'))} 个"
+                f"需要重新识别 ({reasons}), 大模型识别 {s['regions']} 个区域, "
+                f"共 {s['slow_seconds']:.1f}秒{share}")
+
+
+def get_cascade_backend(fast_model: Optional[str] = None, slow_model: Optional[str] = None,
+                        backend: Optional[str] = None, **options) -> CascadeBackend:
+    """
+    按配置文件 transcription.cascade 创建级联后端
+
+    Args:
+        options: 传给两个模型后端的参数（例如 decoding）
+
+    Raises:
+        ValueError: 未知的后端名称或解码策略
+    """
+    from asr_backends import get_backend
+    config = load_transcription_config().get("cascade") or {}
+    fast = get_backend(backend, fast_model or config.get("fast_model") or DEFAULT_FAST_MODEL, **options)
+    slow = get_backend(backend, slow_model, **options)
+    return CascadeBackend(
+        fast, slow,
+        logprob_threshold=config.get("logprob_threshold", DEFAULT_LOGPROB_THRESHOLD),
+        compression_threshold=config.get("compression_ratio_threshold", DEFAULT_COMPRESSION_THRESHOLD),
+        no_speech_threshold=config.get("no_speech_threshold", DEFAULT_NO_SPEECH_THRESHOLD),
+    )
+
+
+def main():
+    from asr_backends import BACKENDS, DECODING_MODES
+    parser = argparse.ArgumentParser(description="级联解码：小模型全量识别，大模型只重新识别不可靠的片段")
+    parser.add_argument('audio', help='音频文件路径')
+    parser.add_argument('--backend', choices=list(BACKENDS), help='识别后端 (默认: 配置文件中的transcription.backend)')
+    parser.add_argument('--fast-model', type=str, help=f'小模型 (默认: {DEFAULT_FAST_MODEL})')
+    parser.add_argument('--model', type=str, help='大模型 (默认: 配置文件中的transcription.model)')
+    parser.add_argument('--decoding', choices=DECODING_MODES,
+                        help='两个模型的解码策略 (默认: 配置文件中的transcription.decoding或beam)')
+    args = parser.parse_args()
+
+    options = {"decoding": args.decoding} if args.decoding else {}
+    backend = get_cascade_backend(args.fast_model, args.model, args.backend, **options)
+    print(f"🤖 识别后端: {backend.describe()}")
+    segments = backend.transcribe(args.audio)
+    print(json.dumps(segments, ensure_ascii=False, indent=2))
+    print(f"🪜 {backend.format_stats()}")
+    if backend.decoding == "adaptive":
+        print(f"🎯 自适应解码: {backend.format_decode_stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按CPU拓扑分配转录进程和线程
+每个转录进程里的PyTorch默认会开和物理核心数一样多的计算线程，两个进程同时跑就是
+两倍的线程抢同一组核心；容器里cgroup的CPU配额比核心数少时更严重（线程被限流）。
+
+这里先确定真正可用的核心数：
+  - 进程的CPU亲和性掩码（taskset / cpuset）
+  - 超线程的兄弟逻辑CPU算作一个物理核心（矩阵运算基本吃不到超线程的好处）
+  - cgroup CPU配额（v2 的 cpu.max，v1 的 cpu.cfs_quota_us / cpu.cfs_period_us）
+再把核心分给各个进程：每个进程设置 torch.set_num_threads 和 OMP/MKL 等环境变量，
+可选地用 sched_setaffinity 把进程绑定到互不重叠的核心上。
+
+进程数 × 线程数 的组合可以用 calibrate 在真实音频上实测，吞吐量最高的组合保存在
+recordings/.cpu_calibration.json（环境变量 VMT_CPU_CALIBRATION 可修改），之后自动使用。
+
+用法:
+  python3 src/cpu_scheduler.py show --jobs 2
+  python3 src/cpu_scheduler.py calibrate recordings/xxx/xxx_对方.wav --max-workers 2
+  python3 src/whisper_transcribe.py --workers 2 --threads 4 --cpu-affinity
+
+作者: VideoMeetingTranscript
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+CPU_SYSFS = Path("/sys/devices/system/cpu")
+# 各种数学库读取的线程数环境变量（必须在库初始化之前设置）
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS", "NUMEXPR_NUM_THREADS")
+CALIBRATION_SECONDS = 30.0
+
+
+def default_calibration_file() -> Path:
+    if os.environ.get("VMT_CPU_CALIBRATION"):
+        return Path(os.environ["VMT_CPU_CALIBRATION"])
+    return Path(__file__).parent.parent / "recordings" / ".cpu_calibration.json"
+
+
+def parse_cpu_list(text: str) -> List[int]:
+    """'0-3,8,10-11' -> [0, 1, 2, 3, 8, 10, 11]"""
+    cpus = []
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def format_cpu_list(cpus) -> str:
+    """[0, 1, 2, 3, 8] -> '0-3,8'"""
+    parts = []
+    for cpu in sorted(cpus):
+        if parts and cpu == parts[-1][1] + 1:
+            parts[-1][1] = cpu
+        else:
+            parts.append([cpu, cpu])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in parts)
+
+
+def parse_cpu_max(text: str) -> Optional[float]:
+    """cgroup v2 cpu.max: '200000 100000' -> 2.0，'max 100000' -> None"""
+    fields = text.split()
+    if not fields or fields[0] == "max":
+        return None
+    period = int(fields[1]) if len(fields) > 1 else 100000
+    return int(fields[0]) / period
+
+
+def _read(path: Path) -> Optional[str]:
+    try:
+        return path.read_text()
+    except OSError:
+        return None
+
+
+def _cgroup_dirs(root: Path = CGROUP_ROOT, proc_cgroup: Path = Path("/proc/self/cgroup")):
+    """当前进程所在的cgroup目录及其所有上级目录（配额取其中最小的）"""
+    text = _read(proc_cgroup) or ""
+    dirs = []
+    for line in text.splitlines():
+        _, controllers, path = line.split(":", 2)
+        if controllers == "":
+            bases = [root]  # cgroup v2
+        elif "cpu" in controllers.split(","):
+            bases = [root / controllers, root / "cpu,cpuacct", root / "cpu"]
+        else:
+            continue
+        for base in bases:
+            if not base.is_dir():
+                continue
+            directory = base / path.lstrip("/")
+            while True:
+                dirs.append(directory)
+                if directory == base:
+                    break
+                directory = directory.parent
+            break
+    return dirs or [root, root / "cpu"]
+
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT) -> Optional[float]:
+    """cgroup的CPU配额（核数），没有限制时返回None"""
+    limits = []
+    for directory in _cgroup_dirs(root):
+        text = _read(directory / "cpu.max")
+        if text is not None:
+            limit = parse_cpu_max(text)
+        else:
+            quota = _read(directory / "cpu.cfs_quota_us")
+            period = _read(directory / "cpu.cfs_period_us")
+            if quota is None or period is None or int(quota) <= 0:
+                continue
+            limit = int(quota) / int(period)
+        if limit:
+            limits.append(limit)
+    return min(limits) if limits else None
+
+
+def available_cpus() -> List[int]:
+    """亲和性掩码允许使用的逻辑CPU"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def core_groups(cpus: List[int], sysfs: Path = CPU_SYSFS) -> List[List[int]]:
+    """把逻辑CPU按物理核心分组（超线程的兄弟CPU在同一组）；读不到拓扑时每个CPU一组"""
+    allowed = set(cpus)
+    groups = {}
+    for cpu in cpus:
+        text = _read(sysfs / f"cpu{cpu}" / "topology" / "thread_siblings_list")
+        siblings = [c for c in parse_cpu_list(text) if c in allowed] if text else [cpu]
+        groups.setdefault(min(siblings or [cpu]), []).append(cpu)
+    return [groups[key] for key in sorted(groups)]
+
+
+@dataclass
+class CpuBudget:
+    """本进程可以使用的CPU资源"""
+    cpus: List[int]
+    cores: List[List[int]]
+    quota: Optional[float] = None
+
+    @property
+    def usable(self) -> int:
+        """可以同时跑满的计算线程数：物理核心数，受cgroup配额限制"""
+        count = len(self.cores)
+        if self.quota:
+            count = min(count, max(1, int(self.quota)))
+        return max(1, count)
+
+    def describe(self) -> str:
+        quota = f", cgroup配额 {self.quota:g} 核" if self.quota else ""
+        return (f"{len(self.cpus)} 个逻辑CPU ({format_cpu_list(self.cpus)}), "
+                f"{len(self.cores)} 个物理核心{quota} -> 可用 {self.usable} 个线程")
+
+
+def detect_budget() -> CpuBudget:
+    cpus = available_cpus()
+    return CpuBudget(cpus=cpus, cores=core_groups(cpus), quota=cgroup_cpu_limit())
+
+
+def assign_cpus(cores: List[List[int]], workers: int, threads: int) -> List[List[int]]:
+    """给每个进程分配threads个连续的物理核心（包括它们的超线程兄弟）；核心不够时循环使用"""
+    cpu_sets = []
+    for worker in range(workers):
+        cpus = []
+        for i in range(worker * threads, (worker + 1) * threads):
+            cpus.extend(cores[i % len(cores)])
+        cpu_sets.append(sorted(set(cpus)))
+    return cpu_sets
+
+
+# 当前进程应用的设置（apply_worker_settings）
+_settings = {}
+
+
+def apply_worker_settings(threads: int, cpus: Optional[List[int]] = None):
+    """设置当前进程的计算线程数和CPU亲和性；应在加载模型之前调用"""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    if cpus and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    try:
+        import torch
+    except ImportError:
+        torch = None
+    if torch is not None:
+        torch.set_num_threads(threads)
+        try:
+            # 每个进程只跑一个推理，不需要额外的inter-op线程池
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            pass  # 已经开始并行计算后不能再修改
+    _settings.update(threads=threads, cpus=cpus)
+
+
+def effective_settings() -> dict:
+    """当前进程实际生效的线程数和CPU亲和性"""
+    settings = {"pid": os.getpid(), "threads": _settings.get("threads"),
+                "omp_threads": os.environ.get("OMP_NUM_THREADS")}
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        settings["threads"] = torch.get_num_threads()
+        settings["interop_threads"] = torch.get_num_interop_threads()
+    if hasattr(os, "sched_getaffinity"):
+        settings["cpus"] = format_cpu_list(os.sched_getaffinity(0))
+    return settings
+
+
+def describe_settings(settings: Optional[dict] = None) -> str:
+    settings = settings or effective_settings()
+    threads = settings.get("threads") or "默认"
+    cpus = settings.get("cpus") or "全部"
+    return f"进程 {settings['pid']}: {threads} 个计算线程, CPU {cpus}"
+
+
+def _init_worker(threads: int, slots):
+    apply_worker_settings(threads, slots.get() if slots is not None else None)
+
+
+@dataclass
+class WorkerPlan:
+    """进程数 × 每个进程的线程数，以及可选的CPU绑定"""
+    workers: int
+    threads: int
+    cpu_sets: Optional[List[List[int]]] = None
+    source: str = "自动"
+    budget: Optional[CpuBudget] = field(default=None, repr=False)
+
+    def describe(self) -> str:
+        text = f"{self.workers} 个进程 × {self.threads} 个线程"
+        if self.cpu_sets:
+            text += f", 绑定CPU {' | '.join(format_cpu_list(cpus) for cpus in self.cpu_sets)}"
+        return f"{text} ({self.source})"
+
+    def executor(self) -> ProcessPoolExecutor:
+        """每个工作进程启动时按计划设置线程数，并各自领取一组CPU"""
+        context = multiprocessing.get_context()
+        slots = None
+        if self.cpu_sets:
+            slots = context.SimpleQueue()
+            for cpus in self.cpu_sets:
+                slots.put(cpus)
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                   initializer=_init_worker, initargs=(self.threads, slots))
+
+
+def calibration_key(description: str, usable: int) -> str:
+    return f"{description}|{usable}"
+
+
+def load_calibration(calibration_file: Optional[Path] = None) -> dict:
+    calibration_file = Path(calibration_file) if calibration_file else default_calibration_file()
+    try:
+        with open(calibration_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def plan_workers(jobs: int, workers: Optional[int] = None, threads: Optional[int] = None,
+                 affinity: bool = False, backend_description: Optional[str] = None,
+                 budget: Optional[CpuBudget] = None) -> WorkerPlan:
+    """
+    决定用几个进程、每个进程几个线程
+
+    Args:
+        jobs: 可以并行的任务数（进程数不会超过它）
+        workers / threads: 命令行指定的值，优先于校准结果
+        affinity: 是否把每个进程绑定到互不重叠的核心上
+        backend_description: 识别后端的描述，有对应的校准结果时使用实测最快的组合
+    """
+    budget = budget or detect_budget()
+    usable = budget.usable
+    source = "自动"
+    if workers or threads:
+        source = "命令行"
+    elif backend_description:
+        best = load_calibration().get(calibration_key(backend_description, usable))
+        if best:
+            workers = best["workers"] if best["workers"] <= jobs else None
+            threads = best["threads"] if workers else None
+            source = "校准" if workers else "自动"
+    # 进程数 × 线程数不超过可用的CPU数
+    if threads and threads > usable:
+        print(f"⚠️ 每个进程 {threads} 个线程超出可用的 {usable} 个CPU，改为 {usable} 个线程")
+        threads = usable
+    if workers and workers > usable:
+        print(f"⚠️ {workers} 个进程超出可用的 {usable} 个CPU，改为 {usable} 个进程")
+        workers = usable
+    if threads and not workers:
+        workers = usable // threads
+    workers = max(1, min(jobs, workers or usable))
+    if threads and workers * threads > usable:
+        clamped = max(1, usable // workers)
+        print(f"⚠️ {workers} 个进程 × {threads} 个线程超出可用的 {usable} 个CPU，每个进程改为 {clamped} 个线程")
+        threads = clamped
+    threads = threads or max(1, usable // workers)
+    cpu_sets = assign_cpus(budget.cores, workers, threads) if affinity else None
+    return WorkerPlan(workers, threads, cpu_sets, source, budget)
+
+
+def candidate_splits(usable: int, max_workers: int) -> List[Tuple[int, int]]:
+    """校准时尝试的 (进程数, 线程数) 组合，核心平均分给各进程"""
+    splits = []
+    for workers in range(1, max(1, min(usable, max_workers)) + 1):
+        split = (workers, max(1, usable // workers))
+        if split not in splits:
+            splits.append(split)
+    return splits
+
+
+def _calibration_job(backend, clip) -> dict:
+    backend.load()
+    start = time.time()
+    backend.transcribe(clip)
+    return {"start": start, "end": time.time(), "settings": effective_settings()}
+
+
+def calibrate(backend, audio, max_workers: int = 2, seconds: float = CALIBRATION_SECONDS,
+              affinity: bool = False, budget: Optional[CpuBudget] = None,
+              calibration_file: Optional[Path] = None) -> List[dict]:
+    """
+    实测每种 进程数 × 线程数 组合的吞吐量（音频秒数 / 墙钟秒数），保存最快的组合
+
+    每个进程先加载模型，再识别同一段音频；吞吐量按所有进程识别开始到全部结束的时间计算，
+    不包括模型加载。
+
+    Returns:
+        list: 每种组合的结果，按吞吐量从高到低排列
+    """
+    from asr_backends import SAMPLE_RATE, read_audio
+    budget = budget or detect_budget()
+    clip = read_audio(audio)[:int(seconds * SAMPLE_RATE)]
+    clip_seconds = len(clip) / SAMPLE_RATE
+    if not clip_seconds:
+        raise ValueError("校准音频为空")
+
+    results = []
+    for workers, threads in candidate_splits(budget.usable, max_workers):
+        cpu_sets = assign_cpus(budget.cores, workers, threads) if affinity else None
+        plan = WorkerPlan(workers, threads, cpu_sets, "校准", budget)
+        with plan.executor() as executor:
+            jobs = [future.result() for future in
+                    [executor.submit(_calibration_job, backend, clip) for _ in range(workers)]]
+        wall = max(job["end"] for job in jobs) - min(job["start"] for job in jobs)
+        throughput = workers * clip_seconds / wall if wall > 0 else 0.0
+        results.append({"workers": workers, "threads": threads, "throughput": round(throughput, 3),
+                        "settings": [job["settings"] for job in jobs]})
+        print(f"  {plan.describe()}: {throughput:.2f}x 实时")
+    results.sort(key=lambda r: r["throughput"], reverse=True)
+
+    calibration_file = Path(calibration_file) if calibration_file else default_calibration_file()
+    calibration = load_calibration(calibration_file)
+    best = results[0]
+    calibration[calibration_key(backend.describe(), budget.usable)] = {
+        "workers": best["workers"], "threads": best["threads"], "throughput": best["throughput"],
+        "affinity": affinity, "measured_at": datetime.now().isoformat(timespec='seconds'),
+    }
+    calibration_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = calibration_file.with_name(calibration_file.name + ".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(calibration, f, ensure_ascii=False, indent=2)
+    tmp_file.replace(calibration_file)
+    return results
+
+
+def main():
+    from asr_backends import BACKENDS, get_backend
+    parser = argparse.ArgumentParser(description="查看CPU资源和转录进程/线程分配，或实测最快的组合")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    show_parser = subparsers.add_parser('show', help='显示可用CPU和默认的进程/线程分配')
+    show_parser.add_argument('--jobs', type=int, default=2, help='并行任务数 (默认: 2，双音轨)')
+    show_parser.add_argument('--backend', choices=list(BACKENDS), help='识别后端（用于查找校准结果）')
+    show_parser.add_argument('--model', type=str, help='模型名称（用于查找校准结果）')
+    show_parser.add_argument('--cpu-affinity', action='store_true', help='显示CPU绑定方案')
+
+    calibrate_parser = subparsers.add_parser('calibrate', help='在真实音频上实测各种 进程数×线程数 组合')
+    calibrate_parser.add_argument('audio', help='用于校准的音频文件')
+    calibrate_parser.add_argument('--backend', choices=list(BACKENDS), help='识别后端')
+    calibrate_parser.add_argument('--model', type=str, help='模型名称')
+    calibrate_parser.add_argument('--max-workers', type=int, default=2, help='最多尝试的进程数 (默认: 2)')
+    calibrate_parser.add_argument('--seconds', type=float, default=CALIBRATION_SECONDS,
+                                  help=f'每个进程识别的音频长度（秒，默认: {CALIBRATION_SECONDS:g}）')
+    calibrate_parser.add_argument('--cpu-affinity', action='store_true', help='校准时把进程绑定到不同的核心')
+    args = parser.parse_args()
+
+    budget = detect_budget()
+    print(f"🖥️ {budget.describe()}")
+    backend = get_backend(args.backend, args.model)
+
+    if args.command == 'show':
+        plan = plan_workers(args.jobs, affinity=args.cpu_affinity, backend_description=backend.describe(),
+                            budget=budget)
+        print(f"🧵 {args.jobs} 个任务 ({backend.describe()}): {plan.describe()}")
+        return
+
+    if not Path(args.audio).exists():
+        print(f"❌ 音频文件不存在: {args.audio}")
+        sys.exit(1)
+    print(f"⏱️ 校准 {backend.describe()}，每个进程识别 {args.seconds:g} 秒音频...")
+    results = calibrate(backend, args.audio, args.max_workers, args.seconds, args.cpu_affinity, budget)
+    best = results[0]
+    print(f"✅ 最快: {best['workers']} 个进程 × {best['threads']} 个线程 ({best['throughput']:.2f}x 实时)，"
+          f"已保存到 {default_calibration_file()}")
+
+
+if __name__ == '__main__':
+    main()
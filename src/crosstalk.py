@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+串音检测
+OBS录制的"自己"和"对方"两条音轨经常互相串音（扬声器外放被麦克风收进去），
+Whisper会把同一句话在两条音轨上各转录一次。
+
+本模块对齐两条音轨的能量包络，找出某条音轨只是另一条音轨串音的区域：
+  - 该音轨有声音，但比另一条音轨低很多（默认低12dB以上）
+  - 两条音轨的能量包络在局部高度相关（串音是同一个声音的衰减副本；
+    两人真的同时说话时包络不相关，不会被误判）
+转录时跳过这些区域，既省下推理时间，也避免合并结果里出现重复片段。
+
+用法:
+  python3 src/crosstalk.py recordings/xxx/xxx_自己.wav recordings/xxx/xxx_对方.wav
+
+作者: VideoMeetingTranscript
+"""
+
+import argparse
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.05
+DEFAULT_MARGIN_DB = 12.0       # 串音比原声至少低这么多
+DEFAULT_FLOOR_DB = -50.0       # 低于该能量视为静音，不需要判断
+DEFAULT_CORRELATION = 0.6      # 局部包络相关系数阈值
+CORRELATION_WINDOW = 1.0       # 计算局部相关的窗口（秒）
+MAX_LAG_SECONDS = 0.5          # 两条音轨之间允许的最大延迟
+MIN_BLEED_SECONDS = 0.3        # 短于该时长的串音区域忽略
+
+
+def envelope_db(audio: np.ndarray, sr: int = SAMPLE_RATE, frame_seconds: float = FRAME_SECONDS) -> np.ndarray:
+    """按帧计算RMS能量（dB）"""
+    frame = max(1, int(frame_seconds * sr))
+    count = len(audio) // frame
+    if count == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[:count * frame].reshape(count, frame).astype(np.float64)
+    rms = np.sqrt(np.mean(frames ** 2, axis=1))
+    return (20 * np.log10(np.maximum(rms, 1e-6))).astype(np.float32)
+
+
+def estimate_lag(reference: np.ndarray, delayed: np.ndarray, max_lag: int) -> int:
+    """
+    估计 delayed 相对 reference 的延迟（帧数，正数表示delayed更晚）
+
+    用去均值后的包络做互相关，只在 [-max_lag, max_lag] 内取最大值
+    """
+    n = min(len(reference), len(delayed))
+    if n == 0 or max_lag <= 0:
+        return 0
+    a = reference[:n] - reference[:n].mean()
+    b = delayed[:n] - delayed[:n].mean()
+    size = 1 << int(np.ceil(np.log2(2 * n)))
+    corr = np.fft.irfft(np.conj(np.fft.rfft(a, size)) * np.fft.rfft(b, size), size)
+    lags = np.concatenate([corr[:max_lag + 1], corr[-max_lag:]])
+    index = int(np.argmax(lags))
+    return index if index <= max_lag else index - len(lags)
+
+
+def shift(envelope: np.ndarray, lag: int, length: int, fill: float) -> np.ndarray:
+    """把包络向前平移lag帧（抵消延迟），并截取/补齐到length"""
+    shifted = np.full(length, fill, dtype=envelope.dtype)
+    if lag >= 0:
+        part = envelope[lag:lag + length]
+    else:
+        part = np.concatenate([np.full(-lag, fill, dtype=envelope.dtype), envelope])[:length]
+    shifted[:len(part)] = part
+    return shifted
+
+
+def rolling_correlation(a: np.ndarray, b: np.ndarray, window: int) -> np.ndarray:
+    """以每一帧为中心、宽window帧的滑动皮尔逊相关系数（用累加和计算，O(n)）"""
+    n = len(a)
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    half = window // 2
+    a = a.astype(np.float64)
+    b = b.astype(np.float64)
+
+    def windowed_sum(x):
+        c = np.concatenate([[0.0], np.cumsum(x)])
+        lo = np.clip(np.arange(n) - half, 0, n)
+        hi = np.clip(np.arange(n) + half + 1, 0, n)
+        return c[hi] - c[lo], hi - lo
+
+    sa, count = windowed_sum(a)
+    sb, _ = windowed_sum(b)
+    sab, _ = windowed_sum(a * b)
+    saa, _ = windowed_sum(a * a)
+    sbb, _ = windowed_sum(b * b)
+    cov = sab - sa * sb / count
+    var = (saa - sa * sa / count) * (sbb - sb * sb / count)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = np.where(var > 1e-9, cov / np.sqrt(np.maximum(var, 1e-18)), 0.0)
+    return corr.astype(np.float32)
+
+
+def mask_to_regions(mask: np.ndarray, frame_seconds: float, min_duration: float) -> List[Tuple[float, float]]:
+    """把逐帧的布尔标记转换为时间区域"""
+    regions = []
+    start = None
+    for i, flagged in enumerate(np.append(mask, False)):
+        if flagged and start is None:
+            start = i
+        elif not flagged and start is not None:
+            if (i - start) * frame_seconds >= min_duration:
+                regions.append((round(start * frame_seconds, 3), round(i * frame_seconds, 3)))
+            start = None
+    return regions
+
+
+def bleed_mask(target_db: np.ndarray, source_db: np.ndarray, correlation: np.ndarray,
+               margin_db: float, floor_db: float, min_correlation: float) -> np.ndarray:
+    """target音轨上是source串音的帧"""
+    return (
+        (target_db > floor_db)
+        & (source_db - target_db >= margin_db)
+        & (correlation >= min_correlation)
+    )
+
+
+def detect_crosstalk(self_audio: np.ndarray, other_audio: np.ndarray, sr: int = SAMPLE_RATE,
+                     margin_db: float = DEFAULT_MARGIN_DB, floor_db: float = DEFAULT_FLOOR_DB,
+                     min_correlation: float = DEFAULT_CORRELATION,
+                     min_duration: float = MIN_BLEED_SECONDS) -> Dict[str, List[Tuple[float, float]]]:
+    """
+    检测两条音轨上的串音区域
+
+    Returns:
+        dict: {"自己": [...], "对方": [...]}，每条音轨上应当跳过的 (开始, 结束) 区域
+    """
+    self_db = envelope_db(self_audio, sr)
+    other_db = envelope_db(other_audio, sr)
+    length = max(len(self_db), len(other_db))
+    if length == 0:
+        return {"自己": [], "对方": []}
+
+    # 以"自己"音轨为基准对齐"对方"音轨
+    lag = estimate_lag(self_db, other_db, int(MAX_LAG_SECONDS / FRAME_SECONDS))
+    self_aligned = shift(self_db, 0, length, floor_db - 40)
+    other_aligned = shift(other_db, lag, length, floor_db - 40)
+    correlation = rolling_correlation(self_aligned, other_aligned, int(CORRELATION_WINDOW / FRAME_SECONDS))
+
+    self_mask = bleed_mask(self_aligned, other_aligned, correlation, margin_db, floor_db, min_correlation)
+    other_mask = bleed_mask(other_aligned, self_aligned, correlation, margin_db, floor_db, min_correlation)
+
+    # "对方"音轨上的区域要换回它自己的时间线
+    lag_seconds = lag * FRAME_SECONDS
+    return {
+        "自己": mask_to_regions(self_mask, FRAME_SECONDS, min_duration),
+        "对方": [
+            (max(0.0, round(start + lag_seconds, 3)), round(end + lag_seconds, 3))
+            for start, end in mask_to_regions(other_mask, FRAME_SECONDS, min_duration)
+        ],
+    }
+
+
+def detect_crosstalk_files(self_file, other_file, **options) -> Dict[str, List[Tuple[float, float]]]:
+    """读取两条音轨并检测串音区域"""
+    from audio_io import load_audio
+    self_audio, _ = load_audio(self_file, sr=SAMPLE_RATE)
+    other_audio, _ = load_audio(other_file, sr=SAMPLE_RATE)
+    return detect_crosstalk(self_audio, other_audio, SAMPLE_RATE, **options)
+
+
+class TrackLevels:
+    """
+    片段在自己音轨上的能量（dB），按需只读取片段所在的区间
+
+    同一句话被两条音轨各转录一次时，原声所在音轨的能量比串音副本高得多（见 bleed_mask），
+    transcript_filter 据此决定保留哪个说话人的片段。
+    """
+
+    def __init__(self, audio_files: Dict[str, object]):
+        from audio_io import AudioReader
+        self.readers = {speaker: AudioReader(path) for speaker, path in audio_files.items() if path}
+
+    def __call__(self, segment: dict) -> Optional[float]:
+        reader = self.readers.get(segment.get('speaker'))
+        if reader is None:
+            return None
+        samples = reader.read_seconds(segment['start'], segment['end'])
+        if len(samples) == 0:
+            return None
+        rms = float(np.sqrt(np.mean(samples.astype(np.float64) ** 2)))
+        return 20 * np.log10(max(rms, 1e-6))
+
+    def close(self):
+        for reader in self.readers.values():
+            reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def subtract_regions(regions: List[Tuple[float, float]],
+                     exclude: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """从regions中去掉exclude覆盖的部分（两者都按时间排序）"""
+    result = []
+    j = 0
+    for start, end in regions:
+        while j < len(exclude) and exclude[j][1] <= start:
+            j += 1
+        k = j
+        cursor = start
+        while k < len(exclude) and exclude[k][0] < end:
+            if exclude[k][0] > cursor:
+                result.append((cursor, exclude[k][0]))
+            cursor = max(cursor, exclude[k][1])
+            k += 1
+        if cursor < end:
+            result.append((cursor, end))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="检测双音轨录音中的串音区域")
+    parser.add_argument('self_audio', help='自己的音频文件')
+    parser.add_argument('other_audio', help='对方的音频文件')
+    parser.add_argument('--margin-db', type=float, default=DEFAULT_MARGIN_DB,
+                        help=f'串音比原声至少低多少dB (默认: {DEFAULT_MARGIN_DB})')
+    parser.add_argument('--min-correlation', type=float, default=DEFAULT_CORRELATION,
+                        help=f'包络相关系数阈值 (默认: {DEFAULT_CORRELATION})')
+    args = parser.parse_args()
+
+    regions = detect_crosstalk_files(args.self_audio, args.other_audio,
+                                     margin_db=args.margin_db, min_correlation=args.min_correlation)
+    for speaker, speaker_regions in regions.items():
+        total = sum(end - start for start, end in speaker_regions)
+        print(f"🔁 {speaker}: {len(speaker_regions)} 个串音区域, 共 {total:.1f}秒")
+        for start, end in speaker_regions[:10]:
+            print(f"    {start:8.2f}s - {end:8.2f}s")
+        if len(speaker_regions) > 10:
+            print(f"    ... 还有 {len(speaker_regions) - 10} 个")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,7 +2,7 @@
 # -*- coding: utf-8 -*-
 """
 音频轨道提取工具
-从OBS录制的.mkv视频文件中提取双音轨为独立的.wav文件
+从OBS录制的.mkv视频文件中提取双音轨为独立的.wav文件（或无损压缩的.flac文件，体积约为wav的一半）
 
 作者: VideoMeetingTranscript
 创建时间: 2025-01-28
@@ -10,12 +10,17 @@
 
 import os
 import sys
+import shutil
 import argparse
 import subprocess
 import logging
 from pathlib import Path
 from typing import Optional, Tuple
 
+from audio_io import AUDIO_FORMATS, DEFAULT_FORMAT, ffmpeg_codec_args
+from media_probe import get_media_info
+from stage_metrics import stage
+
 
 class AudioTrackExtractor:
     """音频轨道提取器"""
@@ -41,23 +46,13 @@ class AudioTrackExtractor:
         )
     
     def check_ffmpeg_available(self) -> bool:
-        """检查ffmpeg是否可用"""
-        try:
-            result = subprocess.run(
-                ['ffmpeg', '-version'], 
-                capture_output=True, 
-                text=True, 
-                timeout=10
-            )
-            if result.returncode == 0:
-                self.logger.info("FFmpeg 可用")
-                return True
-            else:
-                self.logger.error("FFmpeg 不可用")
-                return False
-        except (subprocess.TimeoutExpired, FileNotFoundError) as e:
-            self.logger.error(f"检查FFmpeg时出错: {e}")
-            return False
+        """检查ffmpeg是否可用（只在PATH中查找，不启动进程）"""
+        ffmpeg_path = shutil.which('ffmpeg')
+        if ffmpeg_path:
+            self.logger.info(f"FFmpeg 可用: {ffmpeg_path}")
+            return True
+        self.logger.error("FFmpeg 不可用: 未在PATH中找到ffmpeg")
+        return False
     
     def validate_input_file(self, file_path: str) -> bool:
         """
@@ -95,42 +90,40 @@ class AudioTrackExtractor:
             dict: 音频信息，包含音轨数量等
         """
         try:
-            cmd = [
-                'ffprobe', 
-                '-v', 'quiet',
-                '-print_format', 'json',
-                '-show_streams',
-                '-select_streams', 'a',
-                file_path
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-            
-            if result.returncode != 0:
-                self.logger.error(f"获取音频信息失败: {result.stderr}")
+            # 优先直接解析文件头，无法识别的文件回退到ffprobe
+            info = get_media_info(file_path, timeout=30, need_duration=False)
+            if info is None:
+                self.logger.error(f"获取音频信息失败: 无法识别的文件格式 {file_path}")
                 return None
-                
-            import json
-            data = json.loads(result.stdout)
-            audio_streams = data.get('streams', [])
+            
+            audio_streams = [
+                {
+                    'codec_name': track['codec'],
+                    'channels': track['channels'],
+                    'sample_rate': track['sample_rate']
+                }
+                for track in info['audio_tracks']
+            ]
             
             self.logger.info(f"检测到 {len(audio_streams)} 个音频轨道")
             for i, stream in enumerate(audio_streams):
-                codec = stream.get('codec_name', 'unknown')
-                channels = stream.get('channels', 'unknown')
-                sample_rate = stream.get('sample_rate', 'unknown')
+                codec = stream.get('codec_name') or 'unknown'
+                channels = stream.get('channels') or 'unknown'
+                sample_rate = stream.get('sample_rate') or 'unknown'
                 self.logger.info(f"  轨道 {i}: {codec}, {channels} 声道, {sample_rate} Hz")
                 
             return {
                 'audio_track_count': len(audio_streams),
+                'duration': info['duration'],
                 'streams': audio_streams
             }
             
-        except (subprocess.TimeoutExpired, json.JSONDecodeError, Exception) as e:
+        except Exception as e:
             self.logger.error(f"获取音频信息时出错: {e}")
             return None
     
-    def extract_audio_track(self, input_file: str, output_file: str, track_index: int) -> bool:
+    def extract_audio_track(self, input_file: str, output_file: str, track_index: int,
+                            audio_format: str = DEFAULT_FORMAT) -> bool:
         """
         提取指定的音频轨道
         
@@ -138,21 +131,25 @@ class AudioTrackExtractor:
             input_file: 输入视频文件路径
             output_file: 输出音频文件路径
             track_index: 音轨索引 (0, 1, 2...)
+            audio_format: 输出格式，wav (16位PCM) 或 flac (无损压缩)
             
         Returns:
             bool: 提取是否成功
         """
+        # 先写到临时文件，成功后再替换，提取失败或中断时不会破坏已有的音轨
+        base, suffix = os.path.splitext(output_file)
+        tmp_file = f"{base}.tmp{suffix}"
         try:
             # 构建ffmpeg命令
             cmd = [
                 'ffmpeg',
                 '-i', input_file,
                 '-map', f'0:a:{track_index}',  # 选择指定音轨
-                '-acodec', 'pcm_s16le',        # 无压缩PCM编码
+                *ffmpeg_codec_args(audio_format),  # 16位PCM或无损FLAC
                 '-ar', '16000',                # 采样率16kHz (适合Whisper)
                 '-ac', '1',                    # 单声道
-                '-y',                          # 覆盖输出文件
-                output_file
+                '-y',                          # 覆盖上次中断留下的临时文件
+                tmp_file
             ]
             
             self.logger.info(f"开始提取音轨 {track_index}: {output_file}")
@@ -168,7 +165,8 @@ class AudioTrackExtractor:
             
             if result.returncode == 0:
                 # 检查输出文件
-                if os.path.exists(output_file) and os.path.getsize(output_file) > 0:
+                if os.path.exists(tmp_file) and os.path.getsize(tmp_file) > 0:
+                    os.replace(tmp_file, output_file)
                     file_size = os.path.getsize(output_file)
                     self.logger.info(f"音轨 {track_index} 提取成功: {output_file} (大小: {file_size / 1024 / 1024:.2f} MB)")
                     return True
@@ -185,14 +183,19 @@ class AudioTrackExtractor:
         except Exception as e:
             self.logger.error(f"音轨 {track_index} 提取时出错: {e}")
             return False
+        finally:
+            if os.path.exists(tmp_file):
+                os.remove(tmp_file)
     
-    def extract_dual_tracks(self, input_file: str, track_indices: list = [0, 1]) -> Tuple[bool, list]:
+    def extract_dual_tracks(self, input_file: str, track_indices: list = [0, 1],
+                            audio_format: str = DEFAULT_FORMAT) -> Tuple[bool, list]:
         """
         提取双音轨
         
         Args:
             input_file: 输入视频文件路径
             track_indices: 要提取的音轨索引列表，默认为[0, 1]
+            audio_format: 输出格式，wav 或 flac
             
         Returns:
             Tuple[bool, list]: (是否成功, 输出文件列表)
@@ -222,8 +225,8 @@ class AudioTrackExtractor:
         base_name = input_path.stem
         
         output_files = [
-            output_dir / f"{base_name}_自己.wav",    # 第一个指定轨道 = 自己的声音
-            output_dir / f"{base_name}_对方.wav"     # 第二个指定轨道 = 对方的声音
+            output_dir / f"{base_name}_自己.{audio_format}",    # 第一个指定轨道 = 自己的声音
+            output_dir / f"{base_name}_对方.{audio_format}"     # 第二个指定轨道 = 对方的声音
         ]
         
         # 提取音轨
@@ -233,7 +236,10 @@ class AudioTrackExtractor:
         for i, output_file in enumerate(output_files):
             track_index = track_indices[i]
             self.logger.info(f"提取音轨 {track_index} 到文件: {output_file.name}")
-            if self.extract_audio_track(input_file, str(output_file), track_index):
+            with stage("extract_track", audio_seconds=audio_info.get('duration'), track=track_index) as metrics:
+                ok = self.extract_audio_track(input_file, str(output_file), track_index, audio_format)
+                metrics.update(ok=ok)
+            if ok:
                 success_count += 1
                 extracted_files.append(str(output_file))
             else:
@@ -257,6 +263,7 @@ def main():
   python extract_audio_tracks.py ./recordings/meeting_20250528_140000.mkv
   python extract_audio_tracks.py /path/to/video.mkv --log-level DEBUG
   python extract_audio_tracks.py /path/to/video.mkv --tracks 1 2
+  python extract_audio_tracks.py /path/to/video.mkv --tracks 1 2 --format flac
   python extract_audio_tracks.py ./recordings/SamT_2025-06-11_07-49-26/SamT_2025-06-11_07-49-26.mp4 --tracks 1 2
         """
     )
@@ -282,6 +289,13 @@ def main():
         help='要提取的音轨索引 (默认: 0 1)，例如: --tracks 1 2'
     )
     
+    parser.add_argument(
+        '--format',
+        choices=AUDIO_FORMATS,
+        default=DEFAULT_FORMAT,
+        help='输出音轨格式 (默认: wav)；flac是无损压缩，体积约为wav的一半，识别结果相同'
+    )
+    
     args = parser.parse_args()
     
     # 创建提取器
@@ -289,12 +303,12 @@ def main():
     
     # 显示将要提取的轨道信息
     print(f"🎯 将提取音轨索引: {args.tracks[0]} 和 {args.tracks[1]}")
-    print(f"   音轨 {args.tracks[0]} → 自己.wav")
-    print(f"   音轨 {args.tracks[1]} → 对方.wav")
+    print(f"   音轨 {args.tracks[0]} → 自己.{args.format}")
+    print(f"   音轨 {args.tracks[1]} → 对方.{args.format}")
     
     try:
         # 执行提取
-        success, output_files = extractor.extract_dual_tracks(args.input_file, args.tracks)
+        success, output_files = extractor.extract_dual_tracks(args.input_file, args.tracks, args.format)
         
         if success:
             print("\n✅ 音频轨道提取成功！")
@@ -0,0 +1,501 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轻量级媒体元数据读取
+直接解析MP4 (moov/mvhd/trak) 和 Matroska (EBML Segment Info/Tracks) 的文件头，
+读取时长和音轨列表，不需要启动ffmpeg/ffprobe进程。
+无法识别的文件回退到ffprobe。
+
+作者: VideoMeetingTranscript
+"""
+
+import os
+import json
+import struct
+import subprocess
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+
+# MP4 sample entry 四字符码 -> ffprobe风格的编码名称
+MP4_CODECS = {
+    'mp4a': 'aac',
+    'Opus': 'opus',
+    'fLaC': 'flac',
+    'ac-3': 'ac3',
+    'ec-3': 'eac3',
+    'alac': 'alac',
+    'lpcm': 'pcm',
+    'sowt': 'pcm_s16le',
+    'twos': 'pcm_s16be',
+    'avc1': 'h264',
+    'avc3': 'h264',
+    'hvc1': 'hevc',
+    'hev1': 'hevc',
+    'av01': 'av1',
+    'vp09': 'vp9',
+    'mp4v': 'mpeg4',
+}
+
+# Matroska CodecID前缀 -> ffprobe风格的编码名称
+MKV_CODECS = {
+    'A_AAC': 'aac',
+    'A_OPUS': 'opus',
+    'A_VORBIS': 'vorbis',
+    'A_FLAC': 'flac',
+    'A_MPEG/L3': 'mp3',
+    'A_AC3': 'ac3',
+    'A_EAC3': 'eac3',
+    'A_PCM/INT/LIT': 'pcm_s16le',
+    'V_MPEG4/ISO/AVC': 'h264',
+    'V_MPEGH/ISO/HEVC': 'hevc',
+    'V_AV1': 'av1',
+    'V_VP8': 'vp8',
+    'V_VP9': 'vp9',
+}
+
+# Matroska 元素ID
+EBML_HEADER = 0x1A45DFA3
+MKV_SEGMENT = 0x18538067
+MKV_SEEK_HEAD = 0x114D9B74
+MKV_SEEK = 0x4DBB
+MKV_SEEK_ID = 0x53AB
+MKV_SEEK_POSITION = 0x53AC
+MKV_INFO = 0x1549A966
+MKV_TIMECODE_SCALE = 0x2AD7B1
+MKV_DURATION = 0x4489
+MKV_TRACKS = 0x1654AE6B
+MKV_TRACK_ENTRY = 0xAE
+MKV_TRACK_TYPE = 0x83
+MKV_CODEC_ID = 0x86
+MKV_AUDIO = 0xE1
+MKV_SAMPLING_FREQUENCY = 0xB5
+MKV_CHANNELS = 0x9F
+MKV_CLUSTER = 0x1F43B675
+
+MKV_TRACK_VIDEO = 1
+MKV_TRACK_AUDIO = 2
+
+
+class MediaParseError(Exception):
+    """文件头不是可识别的MP4/Matroska结构"""
+
+
+def _empty_info(container: str) -> dict:
+    return {
+        "format": container,
+        "duration": None,
+        "audio_tracks": [],
+        "video_codec": None,
+    }
+
+
+# ---------------------------------------------------------------- MP4
+
+def _iter_boxes(f: BinaryIO, start: int, end: int) -> Iterator[Tuple[str, int, int]]:
+    """
+    遍历 [start, end) 范围内的MP4 box
+
+    Yields:
+        (box类型, 数据起始偏移, 数据结束偏移)
+    """
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header)
+        header_size = 8
+        if size == 1:
+            large = f.read(8)
+            if len(large) < 8:
+                return
+            size = struct.unpack('>Q', large)[0]
+            header_size = 16
+        elif size == 0:
+            size = end - pos
+        if size < header_size:
+            raise MediaParseError(f"无效的MP4 box大小: {size}")
+        yield box_type.decode('latin-1'), pos + header_size, min(pos + size, end)
+        pos += size
+
+
+def _find_box(f: BinaryIO, start: int, end: int, box_type: str) -> Optional[Tuple[int, int]]:
+    for name, data_start, data_end in _iter_boxes(f, start, end):
+        if name == box_type:
+            return data_start, data_end
+    return None
+
+
+def _read_mvhd_like(f: BinaryIO, start: int) -> Tuple[int, int]:
+    """读取 mvhd/mdhd 的 (timescale, duration)"""
+    f.seek(start)
+    version = f.read(4)[0]
+    if version == 1:
+        f.seek(16, os.SEEK_CUR)
+        timescale, duration = struct.unpack('>IQ', f.read(12))
+    else:
+        f.seek(8, os.SEEK_CUR)
+        timescale, duration = struct.unpack('>II', f.read(8))
+    return timescale, duration
+
+
+def _read_mehd(f: BinaryIO, start: int) -> int:
+    """读取分片MP4 mvex/mehd 中的 fragment_duration（mvhd的时间单位）"""
+    f.seek(start)
+    version = f.read(4)[0]
+    if version == 1:
+        return struct.unpack('>Q', f.read(8))[0]
+    return struct.unpack('>I', f.read(4))[0]
+
+
+def _parse_mp4_trak(f: BinaryIO, start: int, end: int) -> Optional[dict]:
+    mdia = _find_box(f, start, end, 'mdia')
+    if not mdia:
+        return None
+    hdlr = _find_box(f, mdia[0], mdia[1], 'hdlr')
+    if not hdlr:
+        return None
+    f.seek(hdlr[0] + 8)
+    handler = f.read(4).decode('latin-1')
+
+    minf = _find_box(f, mdia[0], mdia[1], 'minf')
+    stbl = minf and _find_box(f, minf[0], minf[1], 'stbl')
+    stsd = stbl and _find_box(f, stbl[0], stbl[1], 'stsd')
+    if not stsd:
+        return {"handler": handler, "codec": "unknown"}
+
+    # stsd: version/flags(4) + entry_count(4) + 第一个 sample entry
+    f.seek(stsd[0] + 8)
+    entry_header = f.read(8)
+    if len(entry_header) < 8:
+        return {"handler": handler, "codec": "unknown"}
+    fourcc = entry_header[4:8].decode('latin-1')
+    track = {"handler": handler, "codec": MP4_CODECS.get(fourcc, fourcc.strip())}
+
+    if handler == 'soun':
+        # AudioSampleEntry: reserved(6) + data_reference_index(2) + reserved(8)
+        #                   + channelcount(2) + samplesize(2) + pre_defined(2) + reserved(2) + samplerate(4, 16.16)
+        body = f.read(28)
+        if len(body) == 28:
+            channels, _, _, _, rate = struct.unpack('>HHHHI', body[16:28])
+            track["channels"] = channels
+            track["sample_rate"] = rate >> 16
+    return track
+
+
+def parse_mp4(f: BinaryIO, file_size: int) -> dict:
+    """解析MP4/MOV文件头"""
+    moov = _find_box(f, 0, file_size, 'moov')
+    if not moov:
+        raise MediaParseError("未找到moov box")
+
+    info = _empty_info("mp4")
+    timescale = 0
+    fragment_duration = None
+    for name, start, end in _iter_boxes(f, moov[0], moov[1]):
+        if name == 'mvhd':
+            timescale, duration = _read_mvhd_like(f, start)
+            # 分片MP4（以及OBS分片录制后转封装的文件）mvhd中的时长是0或全1，表示未知
+            if timescale and duration and duration not in (0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+                info["duration"] = duration / timescale
+        elif name == 'mvex':
+            mehd = _find_box(f, start, end, 'mehd')
+            if mehd:
+                fragment_duration = _read_mehd(f, mehd[0])
+        elif name == 'trak':
+            track = _parse_mp4_trak(f, start, end)
+            if not track:
+                continue
+            if track["handler"] == 'soun':
+                info["audio_tracks"].append({
+                    "codec": track["codec"],
+                    "channels": track.get("channels"),
+                    "sample_rate": track.get("sample_rate"),
+                })
+            elif track["handler"] == 'vide' and info["video_codec"] is None:
+                info["video_codec"] = track["codec"]
+    if info["duration"] is None and fragment_duration and timescale:
+        info["duration"] = fragment_duration / timescale
+    # 两者都没有时保持None，get_media_info(need_duration=True) 会回退到ffprobe
+    return info
+
+
+# ---------------------------------------------------------------- Matroska
+
+def _read_vint(f: BinaryIO, keep_marker: bool) -> Tuple[Optional[int], int]:
+    """
+    读取EBML变长整数
+
+    Returns:
+        (数值, 占用字节数)；大小全为1（未知大小）时数值为None
+    """
+    first = f.read(1)
+    if not first:
+        raise EOFError
+    b = first[0]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not (b & mask):
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise MediaParseError("无效的EBML变长整数")
+    rest = f.read(length - 1)
+    if len(rest) < length - 1:
+        raise EOFError
+    value = b if keep_marker else b & (mask - 1)
+    all_ones = (b & (mask - 1)) == mask - 1
+    for byte in rest:
+        value = (value << 8) | byte
+        all_ones = all_ones and byte == 0xFF
+    if not keep_marker and all_ones:
+        return None, length
+    return value, length
+
+
+def _iter_elements(f: BinaryIO, start: int, end: int) -> Iterator[Tuple[int, int, int]]:
+    """
+    遍历 [start, end) 范围内的EBML元素
+
+    Yields:
+        (元素ID, 数据起始偏移, 数据结束偏移)
+    """
+    pos = start
+    while pos < end:
+        f.seek(pos)
+        try:
+            element_id, id_len = _read_vint(f, keep_marker=True)
+            size, size_len = _read_vint(f, keep_marker=False)
+        except EOFError:
+            return
+        data_start = pos + id_len + size_len
+        data_end = end if size is None else min(data_start + size, end)
+        yield element_id, data_start, data_end
+        pos = data_end
+
+
+def _read_uint(f: BinaryIO, start: int, end: int) -> int:
+    f.seek(start)
+    return int.from_bytes(f.read(end - start), 'big')
+
+
+def _read_float(f: BinaryIO, start: int, end: int) -> Optional[float]:
+    f.seek(start)
+    data = f.read(end - start)
+    if len(data) == 4:
+        return struct.unpack('>f', data)[0]
+    if len(data) == 8:
+        return struct.unpack('>d', data)[0]
+    return None
+
+
+def _read_string(f: BinaryIO, start: int, end: int) -> str:
+    f.seek(start)
+    return f.read(end - start).rstrip(b'\x00').decode('utf-8', errors='replace')
+
+
+def _mkv_codec_name(codec_id: str) -> str:
+    for prefix, name in MKV_CODECS.items():
+        if codec_id.startswith(prefix):
+            return name
+    return codec_id
+
+
+def _parse_mkv_info(f: BinaryIO, start: int, end: int, info: dict) -> None:
+    timecode_scale = 1000000
+    duration = None
+    for element_id, data_start, data_end in _iter_elements(f, start, end):
+        if element_id == MKV_TIMECODE_SCALE:
+            timecode_scale = _read_uint(f, data_start, data_end)
+        elif element_id == MKV_DURATION:
+            duration = _read_float(f, data_start, data_end)
+    if duration is not None:
+        info["duration"] = duration * timecode_scale / 1e9
+
+
+def _parse_mkv_tracks(f: BinaryIO, start: int, end: int, info: dict) -> None:
+    for element_id, entry_start, entry_end in _iter_elements(f, start, end):
+        if element_id != MKV_TRACK_ENTRY:
+            continue
+        track_type = None
+        codec = "unknown"
+        channels = 1
+        sample_rate = 8000.0
+        for child_id, data_start, data_end in _iter_elements(f, entry_start, entry_end):
+            if child_id == MKV_TRACK_TYPE:
+                track_type = _read_uint(f, data_start, data_end)
+            elif child_id == MKV_CODEC_ID:
+                codec = _mkv_codec_name(_read_string(f, data_start, data_end))
+            elif child_id == MKV_AUDIO:
+                for audio_id, audio_start, audio_end in _iter_elements(f, data_start, data_end):
+                    if audio_id == MKV_SAMPLING_FREQUENCY:
+                        sample_rate = _read_float(f, audio_start, audio_end) or sample_rate
+                    elif audio_id == MKV_CHANNELS:
+                        channels = _read_uint(f, audio_start, audio_end)
+        if track_type == MKV_TRACK_AUDIO:
+            info["audio_tracks"].append({
+                "codec": codec,
+                "channels": channels,
+                "sample_rate": int(sample_rate),
+            })
+        elif track_type == MKV_TRACK_VIDEO and info["video_codec"] is None:
+            info["video_codec"] = codec
+
+
+def parse_matroska(f: BinaryIO, file_size: int) -> dict:
+    """解析Matroska/WebM文件头"""
+    elements = _iter_elements(f, 0, file_size)
+    first = next(elements, None)
+    if not first or first[0] != EBML_HEADER:
+        raise MediaParseError("缺少EBML头")
+    segment = next(elements, None)
+    if not segment or segment[0] != MKV_SEGMENT:
+        raise MediaParseError("未找到Segment元素")
+    _, segment_start, segment_end = segment
+
+    info = _empty_info("matroska")
+    seek_positions: Dict[int, int] = {}
+    found = set()
+
+    def handle(element_id, data_start, data_end):
+        if element_id == MKV_INFO:
+            _parse_mkv_info(f, data_start, data_end, info)
+            found.add(MKV_INFO)
+        elif element_id == MKV_TRACKS:
+            _parse_mkv_tracks(f, data_start, data_end, info)
+            found.add(MKV_TRACKS)
+
+    for element_id, data_start, data_end in _iter_elements(f, segment_start, segment_end):
+        if element_id == MKV_SEEK_HEAD:
+            for seek_id, seek_start, seek_end in _iter_elements(f, data_start, data_end):
+                if seek_id != MKV_SEEK:
+                    continue
+                target = position = None
+                for child_id, child_start, child_end in _iter_elements(f, seek_start, seek_end):
+                    if child_id == MKV_SEEK_ID:
+                        target = _read_uint(f, child_start, child_end)
+                    elif child_id == MKV_SEEK_POSITION:
+                        position = _read_uint(f, child_start, child_end)
+                if target is not None and position is not None:
+                    seek_positions[target] = segment_start + position
+        elif element_id == MKV_CLUSTER:
+            # 到达媒体数据，剩余的头部元素通过SeekHead定位，避免扫描整个文件
+            break
+        else:
+            handle(element_id, data_start, data_end)
+        if MKV_INFO in found and MKV_TRACKS in found:
+            return info
+
+    for target in (MKV_INFO, MKV_TRACKS):
+        if target in found or target not in seek_positions:
+            continue
+        element = next(_iter_elements(f, seek_positions[target], segment_end), None)
+        if element and element[0] == target:
+            handle(*element)
+
+    if MKV_TRACKS not in found:
+        raise MediaParseError("未找到Tracks元素")
+    return info
+
+
+# ---------------------------------------------------------------- 入口
+
+def probe_media(file_path) -> Optional[dict]:
+    """
+    不启动子进程，直接从文件头读取媒体信息
+
+    Args:
+        file_path: 媒体文件路径
+
+    Returns:
+        dict: format、duration（秒，未知时为None）、audio_tracks（列表，
+              每项包含codec、channels、sample_rate）、video_codec；
+              无法识别文件格式时返回None
+    """
+    try:
+        file_size = os.path.getsize(file_path)
+        with open(file_path, 'rb') as f:
+            head = f.read(12)
+            f.seek(0)
+            if head[:4] == b'\x1a\x45\xdf\xa3':
+                return parse_matroska(f, file_size)
+            if head[4:8] in (b'ftyp', b'moov', b'mdat', b'free', b'wide', b'skip'):
+                return parse_mp4(f, file_size)
+    except (OSError, MediaParseError, struct.error, IndexError, EOFError):
+        pass
+    return None
+
+
+def ffprobe_media(file_path, timeout: float = 30) -> Optional[dict]:
+    """
+    使用一次ffprobe调用读取媒体信息，返回结构与 probe_media 相同
+
+    Returns:
+        dict 或 None（ffprobe不可用、超时或失败）
+    """
+    cmd = [
+        'ffprobe',
+        '-v', 'error',
+        '-print_format', 'json',
+        '-show_entries', 'format=format_name,duration:stream=codec_type,codec_name,channels,sample_rate',
+        str(file_path)
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip())
+    data = json.loads(result.stdout)
+
+    fmt = data.get('format', {})
+    info = _empty_info(fmt.get('format_name', 'unknown'))
+    duration = fmt.get('duration')
+    if duration not in (None, 'N/A'):
+        info["duration"] = float(duration)
+    for stream in data.get('streams', []):
+        if stream.get('codec_type') == 'audio':
+            sample_rate = stream.get('sample_rate')
+            info["audio_tracks"].append({
+                "codec": stream.get('codec_name', 'unknown'),
+                "channels": stream.get('channels'),
+                "sample_rate": int(sample_rate) if sample_rate else None,
+            })
+        elif stream.get('codec_type') == 'video' and info["video_codec"] is None:
+            info["video_codec"] = stream.get('codec_name', 'unknown')
+    return info
+
+
+def get_media_info(file_path, timeout: float = 30, need_duration: bool = True) -> Optional[dict]:
+    """
+    读取媒体信息：优先解析文件头，无法识别（或缺少所需的时长）时回退到ffprobe
+
+    Args:
+        file_path: 媒体文件路径
+        timeout: ffprobe回退时的超时时间（秒）
+        need_duration: 文件头里没有时长（例如未正常结束的MKV）时是否回退到ffprobe
+
+    Returns:
+        dict 或 None
+    """
+    info = probe_media(file_path)
+    if info is not None and (info["duration"] is not None or not need_duration):
+        return info
+    try:
+        return ffprobe_media(file_path, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired, RuntimeError, ValueError):
+        return info
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="读取媒体文件的时长和音轨信息")
+    parser.add_argument('files', nargs='+', help='媒体文件路径')
+    parser.add_argument('--native-only', action='store_true', help='只解析文件头，不回退到ffprobe')
+    args = parser.parse_args()
+
+    for file_path in args.files:
+        info = probe_media(file_path) if args.native_only else get_media_info(file_path)
+        print(json.dumps({"file": file_path, "info": info}, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分页会议目录
+把扫描结果写成固定大小的分片，首页只需要读取一个很小的汇总文件和最新的一页，
+加载时间与会议总数无关：
+
+    web/catalog/
+      index.json          汇总: 总数、总时长、每页大小、分片列表、每位老师的会议数
+      by_teacher.json     老师 -> 该老师会议在目录中的位置列表
+      by_month.json       月份 (YYYY-MM) -> [起始位置, 结束位置)
+      shard_00000.json    按日期从旧到新排列，每个分片 PAGE_SIZE 个会议
+
+分片按日期升序编号，新录制的会议只会追加到最后一个分片，
+增量扫描时只重写内容发生变化的分片。
+服务器用 CatalogIndex 在内存中按老师和日期范围过滤，按最新在前分页返回
+（/api/meetings?teacher=&from=&to=&page=）。
+
+用法:
+  python3 src/meeting_catalog.py
+  python3 src/meeting_catalog.py --teacher Alice --from 2025-01 --to 2025-03 --page 2
+
+作者: VideoMeetingTranscript
+"""
+
+import json
+import bisect
+import argparse
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import List, Optional
+
+CATALOG_DIR_NAME = "catalog"
+CATALOG_VERSION = 1
+PAGE_SIZE = 48
+SUMMARY_FILE = "index.json"
+TEACHER_INDEX_FILE = "by_teacher.json"
+MONTH_INDEX_FILE = "by_month.json"
+RECENT_DAYS = 7
+
+
+def default_catalog_dir() -> Path:
+    return Path(__file__).parent.parent / "web" / CATALOG_DIR_NAME
+
+
+def shard_name(number: int) -> str:
+    return f"shard_{number:05d}.json"
+
+
+def sort_key(meeting: dict):
+    return meeting["date"], meeting["folderName"]
+
+
+def date_upper_bound(value: str) -> str:
+    """把 to 参数变成包含该前缀的上界：to=2025-03 包含三月的所有会议"""
+    return value + "\uffff"
+
+
+def _write_if_changed(path: Path, data) -> bool:
+    """内容不变时不重写文件，保留mtime和浏览器缓存"""
+    text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    try:
+        if path.read_text(encoding='utf-8') == text:
+            return False
+    except OSError:
+        pass
+    tmp_file = path.with_name(path.name + ".tmp")
+    tmp_file.write_text(text, encoding='utf-8')
+    tmp_file.replace(path)
+    return True
+
+
+def build_indexes(meetings: List[dict], page_size: int = PAGE_SIZE):
+    """
+    生成汇总和二级索引
+
+    Args:
+        meetings: 按日期升序排列的会议记录
+
+    Returns:
+        (汇总, 老师索引, 月份索引)
+    """
+    by_teacher = OrderedDict()
+    by_month = OrderedDict()
+    duration = 0.0
+    for position, meeting in enumerate(meetings):
+        by_teacher.setdefault(meeting["name"], []).append(position)
+        month = meeting["date"][:7]
+        if month in by_month:
+            by_month[month][1] = position + 1
+        else:
+            by_month[month] = [position, position + 1]
+        duration += meeting.get("durationSeconds") or 0.0
+
+    shards = (len(meetings) + page_size - 1) // page_size
+    summary = {
+        "version": CATALOG_VERSION,
+        "total": len(meetings),
+        "pageSize": page_size,
+        "shards": [shard_name(i) for i in range(shards)],
+        "durationSeconds": round(duration, 1),
+        "newest": meetings[-1]["date"] if meetings else None,
+        "oldest": meetings[0]["date"] if meetings else None,
+        "teachers": {name: len(positions) for name, positions in sorted(by_teacher.items())},
+    }
+    return summary, dict(sorted(by_teacher.items())), by_month
+
+
+def write_catalog(meetings: List[dict], catalog_dir: Optional[Path] = None,
+                  page_size: int = PAGE_SIZE) -> int:
+    """
+    写出分页目录
+
+    Returns:
+        int: 实际重写的文件数
+    """
+    catalog_dir = Path(catalog_dir) if catalog_dir else default_catalog_dir()
+    catalog_dir.mkdir(parents=True, exist_ok=True)
+    ordered = sorted(meetings, key=sort_key)
+    summary, by_teacher, by_month = build_indexes(ordered, page_size)
+
+    written = 0
+    for number, name in enumerate(summary["shards"]):
+        shard = {"shard": number, "meetings": ordered[number * page_size:(number + 1) * page_size]}
+        written += _write_if_changed(catalog_dir / name, shard)
+
+    # 会议被删除后多出来的分片
+    for stale in catalog_dir.glob("shard_*.json"):
+        if stale.name not in summary["shards"]:
+            stale.unlink()
+            written += 1
+
+    written += _write_if_changed(catalog_dir / TEACHER_INDEX_FILE, by_teacher)
+    written += _write_if_changed(catalog_dir / MONTH_INDEX_FILE, by_month)
+    written += _write_if_changed(catalog_dir / SUMMARY_FILE, summary)
+    return written
+
+
+class CatalogIndex:
+    """内存中的会议目录，按老师和日期范围过滤、按最新在前分页"""
+
+    def __init__(self, meetings: List[dict], page_size: int = PAGE_SIZE):
+        self.page_size = page_size
+        self.meetings = sorted(meetings, key=sort_key)
+        self.dates = [m["date"] for m in self.meetings]
+        self.by_teacher = {}
+        for position, meeting in enumerate(self.meetings):
+            self.by_teacher.setdefault(meeting["name"], []).append(position)
+        self.teacher_dates = {
+            name: [self.dates[p] for p in positions] for name, positions in self.by_teacher.items()
+        }
+        self.duration = sum(m.get("durationSeconds") or 0.0 for m in self.meetings)
+
+    def __len__(self):
+        return len(self.meetings)
+
+    def summary(self, now: Optional[datetime] = None) -> dict:
+        now = now or datetime.now()
+        week_ago = (now - timedelta(days=RECENT_DAYS)).isoformat()
+        return {
+            "total": len(self.meetings),
+            "durationSeconds": round(self.duration, 1),
+            "recent": len(self.dates) - bisect.bisect_left(self.dates, week_ago),
+            "teachers": {name: len(positions) for name, positions in sorted(self.by_teacher.items())},
+        }
+
+    def query(self, teacher: Optional[str] = None, date_from: Optional[str] = None,
+              date_to: Optional[str] = None, page: int = 1, page_size: Optional[int] = None) -> dict:
+        """
+        过滤并分页
+
+        Args:
+            teacher: 老师名字（精确匹配）
+            date_from / date_to: 日期前缀，例如 2025、2025-03、2025-03-14，两端都包含
+            page: 页码，从1开始，第1页是最新的会议
+        """
+        page_size = page_size or self.page_size
+        if page < 1 or page_size < 1:
+            raise ValueError("page 和 pageSize 必须是正整数")
+
+        if teacher:
+            positions = self.by_teacher.get(teacher, [])
+            dates = self.teacher_dates.get(teacher, [])
+        else:
+            positions = None
+            dates = self.dates
+        lo = bisect.bisect_left(dates, date_from) if date_from else 0
+        hi = bisect.bisect_right(dates, date_upper_bound(date_to)) if date_to else len(dates)
+        total = max(0, hi - lo)
+
+        # 最新在前：第1页是区间末尾的page_size个
+        end = hi - (page - 1) * page_size
+        start = max(lo, end - page_size)
+        if positions is None:
+            selected = self.meetings[start:end] if end > lo else []
+        else:
+            selected = [self.meetings[p] for p in positions[start:end]] if end > lo else []
+
+        return {
+            "total": total,
+            "page": page,
+            "pageSize": page_size,
+            "pages": (total + page_size - 1) // page_size,
+            "meetings": selected[::-1],
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查询分页会议目录")
+    parser.add_argument('--dir', type=str, help=f'目录位置 (默认: web/{CATALOG_DIR_NAME})')
+    parser.add_argument('--teacher', type=str, help='只看某位老师')
+    parser.add_argument('--from', dest='date_from', type=str, help='开始日期，例如 2025-01')
+    parser.add_argument('--to', dest='date_to', type=str, help='结束日期（包含），例如 2025-03')
+    parser.add_argument('--page', type=int, default=1, help='页码，从1开始 (默认: 1)')
+    args = parser.parse_args()
+
+    catalog_dir = Path(args.dir) if args.dir else default_catalog_dir()
+    summary_file = catalog_dir / SUMMARY_FILE
+    if not summary_file.exists():
+        print(f"❌ 目录不存在，请先运行 web/scan_recordings.py: {summary_file}")
+        return
+    summary = json.loads(summary_file.read_text(encoding='utf-8'))
+    meetings = []
+    for name in summary["shards"]:
+        meetings.extend(json.loads((catalog_dir / name).read_text(encoding='utf-8'))["meetings"])
+
+    index = CatalogIndex(meetings, summary["pageSize"])
+    result = index.query(args.teacher, args.date_from, args.date_to, args.page)
+    print(f"📚 共 {summary['total']} 个会议, {len(summary['shards'])} 个分片, "
+          f"{summary['durationSeconds'] / 3600:.1f} 小时")
+    print(f"🔎 匹配 {result['total']} 个, 第 {result['page']}/{max(result['pages'], 1)} 页")
+    for meeting in result["meetings"]:
+        print(f"    {meeting['displayDate']}  {meeting['name']:<16} {meeting['duration']}")
+
+
+if __name__ == '__main__':
+    main()
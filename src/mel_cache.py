@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+log-mel特征缓存
+whisper.transcribe 每次都要读取整条音轨并重新计算log-mel频谱。换解码参数、换同样输入特征的
+模型（tiny ~ large-v2 都是80维，large-v3/turbo是128维）、级联解码重新识别区域时，特征都完全一样。
+
+这里把特征计算成一个单独的阶段：
+  - 按 CHUNK_SECONDS 分块流式读取16kHz音频，逐块计算STFT和mel滤波，内存占用与音频长度无关；
+    块边界处带上STFT窗口需要的上下文，结果与整段计算相同（开头镜像填充，结尾补30秒静音，和whisper一致）
+  - whisper的归一化需要全局最大值（max - 8dB截断），所以第一遍写原始的log10 mel并记录最大值，
+    第二遍在内存映射的文件上原地归一化
+  - 结果保存为 .npy（内存映射读取），按音频内容的SHA256和mel维数作为键
+
+识别时把缓存的特征直接交给解码器，不再读取音频、不再计算频谱；
+级联解码和自适应解码重新识别的区域也直接从缓存中截取特征窗口。
+
+缓存目录: 环境变量 VMT_MEL_CACHE > ~/.cache/video-meeting-transcript/mel
+
+用法:
+  python3 src/mel_cache.py compute recordings/xxx/xxx_对方.wav recordings/xxx/xxx_自己.wav
+  python3 src/mel_cache.py info
+  python3 src/mel_cache.py prune --max-gb 5
+
+作者: VideoMeetingTranscript
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from audio_io import AudioReader
+
+SAMPLE_RATE = 16000
+N_FFT = 400
+HOP_LENGTH = 160
+FRAMES_PER_SECOND = SAMPLE_RATE // HOP_LENGTH
+# whisper.transcribe 在音频末尾补30秒静音后再计算特征
+PADDING_SAMPLES = 30 * SAMPLE_RATE
+CHUNK_SECONDS = 60
+FEATURE_VERSION = 1
+INDEX_FILE = "index.json"
+
+
+def default_cache_dir() -> Path:
+    if os.environ.get("VMT_MEL_CACHE"):
+        return Path(os.environ["VMT_MEL_CACHE"]).expanduser()
+    return Path.home() / ".cache" / "video-meeting-transcript" / "mel"
+
+
+def _load_index(cache_dir: Path) -> dict:
+    try:
+        with open(cache_dir / INDEX_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return {}
+
+
+def audio_hash(audio_file, cache_dir: Optional[Path] = None) -> str:
+    """音频文件内容的SHA256；路径、大小和修改时间都没变时直接使用上次的结果"""
+    cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+    audio_file = Path(audio_file).resolve()
+    stat = audio_file.stat()
+    signature = [stat.st_size, stat.st_mtime_ns]
+    index = _load_index(cache_dir)
+    known = index.get(str(audio_file))
+    if known and known["signature"] == signature:
+        return known["sha256"]
+
+    digest = hashlib.sha256()
+    with open(audio_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    index[str(audio_file)] = {"signature": signature, "sha256": digest.hexdigest()}
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    tmp_file = cache_dir / f"{INDEX_FILE}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+    tmp_file.replace(cache_dir / INDEX_FILE)
+    return digest.hexdigest()
+
+
+def feature_paths(cache_dir: Path, sha256: str, n_mels: int):
+    base = cache_dir / sha256[:2] / f"{sha256}-mel{n_mels}-v{FEATURE_VERSION}"
+    return base.with_suffix(".npy"), base.with_suffix(".json")
+
+
+def compute_features(audio_file, n_mels: int, output: Path, chunk_seconds: int = CHUNK_SECONDS) -> dict:
+    """
+    流式计算whisper的log-mel特征并写入 output (.npy)
+
+    Returns:
+        dict: 元数据（帧数、样本数、全局最大值等）
+    """
+    import torch
+    from whisper.audio import mel_filters
+
+    reader = AudioReader(audio_file)
+    try:
+        padded = reader.samples + PADDING_SAMPLES
+        # 与 torch.stft(center=True) 后丢掉最后一帧相同
+        frames = padded // HOP_LENGTH
+        filters = mel_filters("cpu", n_mels)
+        window = torch.hann_window(N_FFT)
+        half = N_FFT // 2
+        chunk_frames = chunk_seconds * FRAMES_PER_SECOND
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = output.with_name(f"{output.stem}.{os.getpid()}.tmp.npy")
+        features = np.lib.format.open_memmap(tmp_file, mode='w+', dtype=np.float32, shape=(n_mels, frames))
+        global_max = -np.inf
+        for f0 in range(0, frames, chunk_frames):
+            f1 = min(frames, f0 + chunk_frames)
+            # 第i帧以样本 i*HOP 为中心，需要前后各 N_FFT/2 个样本
+            start, end = f0 * HOP_LENGTH - half, (f1 - 1) * HOP_LENGTH + half
+            samples = reader.read(max(0, start), end)
+            if start < 0:
+                # 音频开头镜像填充
+                samples = np.concatenate([reader.read(1, 1 - start)[::-1], samples])
+            stft = torch.stft(torch.from_numpy(samples), N_FFT, HOP_LENGTH, window=window,
+                              center=False, return_complex=True)
+            mel = filters @ (stft.abs() ** 2)
+            log_spec = torch.clamp(mel, min=1e-10).log10().numpy()
+            features[:, f0:f1] = log_spec[:, :f1 - f0]
+            global_max = max(global_max, float(log_spec.max()))
+
+        # 第二遍：全局最大值截断和缩放，与 whisper.log_mel_spectrogram 相同
+        floor = global_max - 8.0
+        for f0 in range(0, frames, chunk_frames):
+            block = features[:, f0:f0 + chunk_frames]
+            np.maximum(block, floor, out=block)
+            block += 4.0
+            block /= 4.0
+        features.flush()
+        del features
+        tmp_file.replace(output)
+    finally:
+        reader.close()
+    return {"version": FEATURE_VERSION, "n_mels": n_mels, "frames": frames, "samples": reader.samples,
+            "sample_rate": SAMPLE_RATE, "max": global_max, "source": str(audio_file)}
+
+
+@dataclass
+class MelWindow:
+    """从缓存中截取的一段特征（时间从窗口开头算起）"""
+    mel: np.ndarray
+    duration: float
+
+
+class MelFeatures:
+    """一条音轨的缓存特征 (n_mels, 帧数)，内存映射读取，包括末尾30秒静音的帧"""
+
+    def __init__(self, npy_file: Path, meta: dict, sha256: str):
+        # copy-on-write映射：数组可写（torch.from_numpy需要），但不会改动文件
+        self.array = np.load(npy_file, mmap_mode='c')
+        self.meta = meta
+        self.sha256 = sha256
+
+    @property
+    def n_mels(self) -> int:
+        return self.array.shape[0]
+
+    @property
+    def content_frames(self) -> int:
+        """不包括末尾静音填充的帧数"""
+        return self.meta["samples"] // HOP_LENGTH
+
+    @property
+    def duration(self) -> float:
+        return self.meta["samples"] / SAMPLE_RATE
+
+    def tensor(self):
+        import torch
+        return torch.from_numpy(self.array)
+
+    def window(self, start: float, end: float) -> MelWindow:
+        f0 = max(0, int(round(start * FRAMES_PER_SECOND)))
+        f1 = min(self.content_frames, int(round(end * FRAMES_PER_SECOND)))
+        f1 = max(f0, f1)
+        return MelWindow(self.array[:, f0:f1], (f1 - f0) / FRAMES_PER_SECOND)
+
+
+def load_features(audio_file, n_mels: int = 80, cache_dir: Optional[Path] = None,
+                  verbose: bool = True) -> MelFeatures:
+    """读取缓存的特征，没有时计算并写入缓存"""
+    cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+    sha256 = audio_hash(audio_file, cache_dir)
+    npy_file, meta_file = feature_paths(cache_dir, sha256, n_mels)
+    try:
+        with open(meta_file, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if npy_file.exists():
+            if verbose:
+                print(f"📦 使用缓存的log-mel特征: {Path(audio_file).name} ({n_mels}维)")
+            return MelFeatures(npy_file, meta, sha256)
+    except (OSError, json.JSONDecodeError):
+        pass
+
+    start = time.time()
+    meta = compute_features(audio_file, n_mels, npy_file)
+    tmp_file = meta_file.with_name(f"{meta_file.name}.{os.getpid()}.tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(meta, f, ensure_ascii=False)
+    tmp_file.replace(meta_file)
+    if verbose:
+        print(f"🎼 已计算log-mel特征: {Path(audio_file).name} ({n_mels}维, "
+              f"{meta['frames']} 帧, 耗时 {time.time() - start:.1f}秒)")
+    return MelFeatures(npy_file, meta, sha256)
+
+
+@contextmanager
+def whisper_frontend(mel):
+    """
+    让 whisper.transcribe 直接使用传入的特征
+
+    whisper.transcribe 的第一步是 log_mel_spectrogram(audio, padding=30秒)；
+    在这个上下文中把 mel 本身作为audio传入，就会原样返回这个特征而不是重新计算。
+    """
+    import importlib
+    module = importlib.import_module("whisper.transcribe")
+    original = module.log_mel_spectrogram
+
+    def log_mel_spectrogram(audio, *args, **kwargs):
+        if audio is mel:
+            return mel
+        return original(audio, *args, **kwargs)
+
+    module.log_mel_spectrogram = log_mel_spectrogram
+    try:
+        yield mel
+    finally:
+        module.log_mel_spectrogram = original
+
+
+def cache_entries(cache_dir: Path):
+    """缓存中的所有特征文件 (npy, json)，按最后访问时间从旧到新"""
+    entries = []
+    for npy_file in cache_dir.glob("??/*.npy"):
+        meta_file = npy_file.with_suffix(".json")
+        entries.append((npy_file.stat().st_atime, npy_file, meta_file))
+    entries.sort()
+    return [(npy_file, meta_file) for _, npy_file, meta_file in entries]
+
+
+def prune(max_bytes: int, cache_dir: Optional[Path] = None) -> int:
+    """删除最久没有使用的特征文件，直到总大小不超过max_bytes；返回删除的文件数"""
+    cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+    entries = cache_entries(cache_dir)
+    total = sum(npy.stat().st_size for npy, _ in entries)
+    removed = 0
+    for npy_file, meta_file in entries:
+        if total <= max_bytes:
+            break
+        total -= npy_file.stat().st_size
+        npy_file.unlink()
+        meta_file.unlink(missing_ok=True)
+        removed += 1
+    return removed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="预先计算或管理log-mel特征缓存")
+    parser.add_argument('--cache-dir', type=str, help='缓存目录 (默认: VMT_MEL_CACHE 或 ~/.cache/video-meeting-transcript/mel)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    compute_parser = subparsers.add_parser('compute', help='计算音频文件的特征并写入缓存')
+    compute_parser.add_argument('audio', nargs='+', help='音频文件')
+    compute_parser.add_argument('--n-mels', type=int, choices=(80, 128), default=80,
+                                help='mel维数: 80 (tiny ~ large-v2) 或 128 (large-v3 / turbo)')
+    subparsers.add_parser('info', help='显示缓存内容')
+    prune_parser = subparsers.add_parser('prune', help='删除最久没有使用的特征文件')
+    prune_parser.add_argument('--max-gb', type=float, required=True, help='缓存总大小上限 (GB)')
+    args = parser.parse_args()
+
+    cache_dir = Path(args.cache_dir) if args.cache_dir else default_cache_dir()
+    print(f"📁 特征缓存: {cache_dir}")
+    if args.command == 'compute':
+        for audio_file in args.audio:
+            if not Path(audio_file).exists():
+                print(f"❌ 音频文件不存在: {audio_file}")
+                sys.exit(1)
+            load_features(audio_file, args.n_mels, cache_dir)
+    elif args.command == 'info':
+        entries = cache_entries(cache_dir) if cache_dir.exists() else []
+        total = 0
+        for npy_file, meta_file in entries:
+            size = npy_file.stat().st_size
+            total += size
+            try:
+                meta = json.loads(meta_file.read_text(encoding='utf-8'))
+                source = f"{Path(meta['source']).name} ({meta['samples'] / SAMPLE_RATE / 60:.1f} 分钟)"
+            except (OSError, json.JSONDecodeError, KeyError):
+                source = "(元数据缺失)"
+            print(f"    {npy_file.stem[:16]}… {size / 1024 / 1024:8.1f} MB  {source}")
+        print(f"📊 共 {len(entries)} 个特征文件, {total / 1024 / 1024:.1f} MB")
+    elif args.command == 'prune':
+        removed = prune(int(args.max_gb * (1 << 30)), cache_dir)
+        print(f"🗑️ 删除了 {removed} 个特征文件")
+
+
+if __name__ == '__main__':
+    main()
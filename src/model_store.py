@@ -0,0 +1,434 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地模型库
+转录时不再联网：所有模型都事先导入到本地模型库，按SHA256校验后登记在 registry.json 中。
+
+    <模型库>/
+      registry.json                    登记表: 后端/模型 -> 文件、大小、SHA256、来源
+      whisper/<模型>/model.safetensors  fp32权重（safetensors，内存映射读取，加载时间基本就是页缓存读取）
+      whisper/<模型>/dims.json          模型结构参数
+      faster-whisper/<模型>/            CTranslate2模型目录（model.bin、config.json、tokenizer.json ...）
+
+模型库位置: 环境变量 VMT_MODEL_STORE > config.yaml 的 transcription.model_store
+> ~/.cache/video-meeting-transcript/models。整个目录可以直接复制到离线机器上。
+
+whisper后端加载模型时先查模型库，其次使用whisper下载目录（~/.cache/whisper）中已有的checkpoint，
+都没有时报错而不是下载；faster-whisper后端只使用模型库或本地Hugging Face缓存。
+
+用法:
+  python3 src/model_store.py list                                    # 已导入的模型和各后端可用的尺寸
+  python3 src/model_store.py fetch whisper small                     # 在有网络的机器上下载、校验并导入
+  python3 src/model_store.py import whisper small ~/.cache/whisper/small.pt
+  python3 src/model_store.py import faster-whisper small ./faster-whisper-small
+  python3 src/model_store.py verify                                  # 重新计算所有文件的SHA256
+  python3 src/model_store.py remove whisper small
+
+作者: VideoMeetingTranscript
+"""
+
+import os
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+REGISTRY_FILE = "registry.json"
+REGISTRY_VERSION = 1
+WEIGHTS_FILE = "model.safetensors"
+DIMS_FILE = "dims.json"
+
+# 各后端可用的模型尺寸（没有安装whisper时用于显示）
+WHISPER_SIZES = ("tiny.en", "tiny", "base.en", "base", "small.en", "small", "medium.en", "medium",
+                 "large-v1", "large-v2", "large-v3", "large", "turbo")
+BACKEND_SIZES = {
+    "whisper": WHISPER_SIZES,
+    "faster-whisper": WHISPER_SIZES + ("distil-small.en", "distil-medium.en", "distil-large-v3"),
+}
+
+
+class ModelStoreError(Exception):
+    """模型不在模型库中、文件损坏或校验失败"""
+
+
+def default_store_dir() -> Path:
+    if os.environ.get("VMT_MODEL_STORE"):
+        return Path(os.environ["VMT_MODEL_STORE"]).expanduser()
+    from asr_backends import load_transcription_config
+    configured = load_transcription_config().get("model_store")
+    if configured:
+        return Path(configured).expanduser()
+    return Path.home() / ".cache" / "video-meeting-transcript" / "models"
+
+
+def sha256_file(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def official_whisper_sha256(name: str) -> Optional[str]:
+    """openai-whisper官方checkpoint的SHA256（就在下载地址里）"""
+    import whisper
+    url = whisper._MODELS.get(name)
+    return url.split("/")[-2] if url else None
+
+
+def whisper_cache_checkpoint(name: str, download_root: Optional[str] = None) -> Optional[Path]:
+    """whisper.load_model 下载到本地的checkpoint；name也可以是checkpoint路径"""
+    if Path(name).is_file():
+        return Path(name)
+    import whisper
+    url = whisper._MODELS.get(name)
+    if not url:
+        return None
+    root = download_root or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "whisper")
+    path = Path(root) / os.path.basename(url)
+    return path if path.is_file() else None
+
+
+class ModelStore:
+    """本地模型库：导入、校验、登记和加载"""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root) if root else default_store_dir()
+        self.registry_file = self.root / REGISTRY_FILE
+        self._registry = None
+
+    @property
+    def registry(self) -> dict:
+        if self._registry is None:
+            try:
+                with open(self.registry_file, 'r', encoding='utf-8') as f:
+                    self._registry = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                self._registry = {}
+            if self._registry.get("version") != REGISTRY_VERSION:
+                self._registry = {"version": REGISTRY_VERSION, "models": {}}
+        return self._registry
+
+    def _save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.registry_file.with_name(REGISTRY_FILE + ".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.registry, f, ensure_ascii=False, indent=2)
+        tmp_file.replace(self.registry_file)
+
+    @staticmethod
+    def key(backend: str, name: str) -> str:
+        return f"{backend}/{name}"
+
+    def path(self, backend: str, name: str) -> Path:
+        return self.root / backend / name
+
+    def entry(self, backend: str, name: str) -> Optional[dict]:
+        return self.registry["models"].get(self.key(backend, name))
+
+    def entries(self) -> Dict[str, dict]:
+        return dict(sorted(self.registry["models"].items()))
+
+    def resolve(self, backend: str, name: str) -> Optional[Path]:
+        """
+        已登记模型的目录；没有登记时返回None
+
+        只检查文件是否存在、大小是否一致（完整的SHA256校验用 verify）
+
+        Raises:
+            ModelStoreError: 模型已登记但文件缺失或大小不符
+        """
+        entry = self.entry(backend, name)
+        if entry is None:
+            return None
+        directory = self.path(backend, name)
+        for relative, info in entry["files"].items():
+            file = directory / relative
+            if not file.is_file() or file.stat().st_size != info["size"]:
+                raise ModelStoreError(f"模型库中的 {self.key(backend, name)} 已损坏 ({relative})，"
+                                      f"请重新导入: python3 src/model_store.py fetch {backend} {name}")
+        return directory
+
+    def register(self, backend: str, name: str, **details) -> dict:
+        """计算模型目录中所有文件的SHA256并登记"""
+        directory = self.path(backend, name)
+        files = {}
+        for file in sorted(p for p in directory.rglob("*") if p.is_file()):
+            files[file.relative_to(directory).as_posix()] = {"size": file.stat().st_size,
+                                                             "sha256": sha256_file(file)}
+        entry = dict(backend=backend, name=name, files=files,
+                     imported_at=datetime.now().isoformat(timespec='seconds'), **details)
+        self.registry["models"][self.key(backend, name)] = entry
+        self._save()
+        return entry
+
+    def _install(self, backend: str, name: str, staging: Path):
+        """把准备好的目录原子地放到模型库中（替换旧版本）"""
+        target = self.path(backend, name)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if target.exists():
+            shutil.rmtree(target)
+        staging.rename(target)
+
+    def import_whisper(self, name: str, checkpoint: Optional[Path] = None,
+                       sha256: Optional[str] = None) -> dict:
+        """
+        导入openai-whisper的 .pt checkpoint，转换成fp32的safetensors
+
+        Args:
+            checkpoint: checkpoint文件，默认使用whisper下载目录中的文件
+            sha256: 期望的SHA256，官方模型默认使用下载地址中的值
+
+        Raises:
+            ModelStoreError: 找不到checkpoint或SHA256不符
+        """
+        import torch
+        import whisper
+        from safetensors.torch import save_file
+
+        checkpoint = Path(checkpoint) if checkpoint else whisper_cache_checkpoint(name)
+        if checkpoint is None or not checkpoint.is_file():
+            raise ModelStoreError(f"找不到 {name} 的checkpoint，请指定文件路径或使用 fetch 下载")
+        expected = sha256 or official_whisper_sha256(name)
+        actual = sha256_file(checkpoint)
+        if expected and actual != expected:
+            raise ModelStoreError(f"{checkpoint} 的SHA256不符: {actual} (期望 {expected})")
+
+        model = whisper.load_model(str(checkpoint), device="cpu")
+        if name in whisper._ALIGNMENT_HEADS:
+            model.set_alignment_heads(whisper._ALIGNMENT_HEADS[name])
+        # 包括不保存在state_dict中的buffer（注意力mask、对齐用的注意力头），加载时不需要重新计算
+        tensors = {key: value.detach().contiguous() for key, value in model.state_dict().items()}
+        sparse = []
+        for key, buffer in model.named_buffers():
+            if key in tensors:
+                continue
+            if buffer.is_sparse:
+                sparse.append(key)
+                buffer = buffer.to_dense()
+            tensors[key] = buffer.contiguous()
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{name}-", dir=self.root))
+        try:
+            save_file(tensors, str(staging / WEIGHTS_FILE), metadata={"sparse": json.dumps(sparse)})
+            with open(staging / DIMS_FILE, 'w', encoding='utf-8') as f:
+                json.dump(vars(model.dims), f, indent=2)
+            self._install("whisper", name, staging)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return self.register("whisper", name, format="safetensors", dtype=str(torch.float32),
+                             source=str(checkpoint), source_sha256=actual)
+
+    def import_faster_whisper(self, name: str, directory: Path) -> dict:
+        """导入CTranslate2格式的模型目录（例如 faster-whisper-small）"""
+        directory = Path(directory)
+        if not (directory / "model.bin").is_file():
+            raise ModelStoreError(f"{directory} 不是CTranslate2模型目录（缺少model.bin）")
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=f".{name}-", dir=self.root))
+        try:
+            for file in directory.iterdir():
+                if file.is_file():
+                    shutil.copy2(file, staging / file.name)
+            self._install("faster-whisper", name, staging)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        return self.register("faster-whisper", name, format="ctranslate2", source=str(directory))
+
+    def fetch(self, backend: str, name: str) -> dict:
+        """下载官方模型（校验SSL证书和SHA256）并导入；只在导入时联网"""
+        with tempfile.TemporaryDirectory(prefix="vmt_fetch_") as tmp:
+            if backend == "whisper":
+                import whisper
+                if name not in whisper._MODELS:
+                    raise ModelStoreError(f"未知的whisper模型: {name} (可选: {', '.join(whisper._MODELS)})")
+                # whisper._download 校验下载文件的SHA256
+                checkpoint = whisper._download(whisper._MODELS[name], tmp, False)
+                return self.import_whisper(name, Path(checkpoint))
+            if backend == "faster-whisper":
+                from faster_whisper import download_model
+                return self.import_faster_whisper(name, Path(download_model(name, output_dir=tmp)))
+        raise ModelStoreError(f"不支持的后端: {backend} (可选: {', '.join(BACKEND_SIZES)})")
+
+    def verify(self, backend: Optional[str] = None, name: Optional[str] = None) -> List[tuple]:
+        """
+        重新计算已登记文件的SHA256
+
+        Returns:
+            list: (key, 问题列表)，问题列表为空表示校验通过
+        """
+        results = []
+        for key, entry in self.entries().items():
+            if (backend and entry["backend"] != backend) or (name and entry["name"] != name):
+                continue
+            directory = self.path(entry["backend"], entry["name"])
+            problems = []
+            for relative, info in entry["files"].items():
+                file = directory / relative
+                if not file.is_file():
+                    problems.append(f"{relative} 不存在")
+                elif file.stat().st_size != info["size"]:
+                    problems.append(f"{relative} 大小不符")
+                elif sha256_file(file) != info["sha256"]:
+                    problems.append(f"{relative} SHA256不符")
+            results.append((key, problems))
+        return results
+
+    def remove(self, backend: str, name: str) -> bool:
+        if self.entry(backend, name) is None:
+            return False
+        shutil.rmtree(self.path(backend, name), ignore_errors=True)
+        del self.registry["models"][self.key(backend, name)]
+        self._save()
+        return True
+
+    def load_whisper(self, name: str, device: str = "cpu"):
+        """从safetensors加载whisper模型（不做随机初始化，权重直接放进模型）"""
+        import torch
+        from safetensors import safe_open
+        from safetensors.torch import load_file
+        from whisper.model import ModelDimensions, Whisper
+
+        directory = self.resolve("whisper", name)
+        if directory is None:
+            raise ModelStoreError(f"模型库中没有 whisper/{name}")
+        with open(directory / DIMS_FILE, 'r', encoding='utf-8') as f:
+            dims = ModelDimensions(**json.load(f))
+        with safe_open(str(directory / WEIGHTS_FILE), framework="pt") as f:
+            sparse = set(json.loads((f.metadata() or {}).get("sparse", "[]")))
+        tensors = load_file(str(directory / WEIGHTS_FILE), device="cpu")
+
+        try:
+            # 在meta设备上构建模型结构，跳过参数的随机初始化
+            with torch.device("meta"):
+                model = Whisper(dims)
+        except (NotImplementedError, RuntimeError):
+            model = Whisper(dims)
+        for key, tensor in tensors.items():
+            module_name, _, attr = key.rpartition(".")
+            module = model.get_submodule(module_name)
+            if key in sparse:
+                tensor = tensor.to_sparse()
+            if attr in module._parameters:
+                module._parameters[attr] = torch.nn.Parameter(tensor, requires_grad=False)
+            else:
+                module._buffers[attr] = tensor
+        missing = [key for key, value in list(model.named_parameters()) + list(model.named_buffers())
+                   if value.is_meta]
+        if missing:
+            raise ModelStoreError(f"whisper/{name} 缺少权重: {', '.join(missing[:5])}")
+        return model.to(device).eval()
+
+
+def load_whisper_model(name: str, device: Optional[str] = None, download_root: Optional[str] = None,
+                       in_memory: bool = False):
+    """
+    不联网加载whisper模型：先查模型库，其次使用whisper下载目录中已有的checkpoint
+
+    Raises:
+        ModelStoreError: 本地没有这个模型
+    """
+    import torch
+    device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    store = ModelStore()
+    if store.entry("whisper", name):
+        return store.load_whisper(name, device)
+
+    checkpoint = whisper_cache_checkpoint(name, download_root)
+    if checkpoint is None:
+        raise ModelStoreError(f"本地没有whisper模型 {name}（模型库: {store.root}），"
+                              f"请先在有网络的机器上运行: python3 src/model_store.py fetch whisper {name}")
+    import whisper
+    model = whisper.load_model(str(checkpoint), device=device, in_memory=in_memory)
+    if name in whisper._ALIGNMENT_HEADS:
+        model.set_alignment_heads(whisper._ALIGNMENT_HEADS[name])
+    return model
+
+
+def resolve_faster_whisper(name: str) -> str:
+    """faster-whisper的模型目录；不在模型库中时返回名称（只使用本地Hugging Face缓存）"""
+    directory = ModelStore().resolve("faster-whisper", name)
+    return str(directory) if directory else name
+
+
+def format_size(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f} MB" if size < 1 << 30 else f"{size / (1 << 30):.2f} GB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="管理本地模型库（转录时不联网）")
+    parser.add_argument('--store', type=str, help='模型库目录 (默认: VMT_MODEL_STORE 或配置文件)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('list', help='列出已导入的模型和各后端可用的尺寸')
+    fetch_parser = subparsers.add_parser('fetch', help='下载官方模型、校验并导入（需要网络）')
+    fetch_parser.add_argument('backend', choices=list(BACKEND_SIZES))
+    fetch_parser.add_argument('name', help='模型名称，例如 small')
+    import_parser = subparsers.add_parser('import', help='从本地文件导入模型')
+    import_parser.add_argument('backend', choices=list(BACKEND_SIZES))
+    import_parser.add_argument('name', help='模型名称，例如 small')
+    import_parser.add_argument('source', nargs='?',
+                               help='whisper: .pt文件（默认: ~/.cache/whisper 中的文件）；faster-whisper: 模型目录')
+    import_parser.add_argument('--sha256', type=str, help='期望的SHA256（官方whisper模型自动校验）')
+    verify_parser = subparsers.add_parser('verify', help='重新计算SHA256，检查文件是否完整')
+    verify_parser.add_argument('backend', nargs='?', choices=list(BACKEND_SIZES))
+    verify_parser.add_argument('name', nargs='?')
+    remove_parser = subparsers.add_parser('remove', help='从模型库中删除模型')
+    remove_parser.add_argument('backend', choices=list(BACKEND_SIZES))
+    remove_parser.add_argument('name')
+    args = parser.parse_args()
+
+    store = ModelStore(Path(args.store) if args.store else None)
+    print(f"📁 模型库: {store.root}")
+
+    try:
+        if args.command == 'list':
+            entries = store.entries()
+            for key, entry in entries.items():
+                size = sum(info["size"] for info in entry["files"].values())
+                print(f"    {key:<32} {entry.get('format', '-'):<12} {format_size(size):>10}  {entry['imported_at']}")
+            if not entries:
+                print("    (空)")
+            for backend, sizes in BACKEND_SIZES.items():
+                available = [size for size in sizes if store.entry(backend, size)]
+                print(f"🤖 {backend}: 可用 {', '.join(available) or '无'}; 可导入 {', '.join(sizes)}")
+        elif args.command in ('fetch', 'import'):
+            print(f"⏳ 正在{'下载并' if args.command == 'fetch' else ''}导入 {args.backend}/{args.name}...")
+            if args.command == 'fetch':
+                entry = store.fetch(args.backend, args.name)
+            elif args.backend == 'whisper':
+                entry = store.import_whisper(args.name, Path(args.source) if args.source else None, args.sha256)
+            else:
+                if not args.source:
+                    print("❌ 导入faster-whisper模型需要指定模型目录")
+                    sys.exit(1)
+                entry = store.import_faster_whisper(args.name, Path(args.source))
+            size = sum(info["size"] for info in entry["files"].values())
+            print(f"✅ 已导入 {args.backend}/{args.name}: {len(entry['files'])} 个文件, {format_size(size)}")
+        elif args.command == 'verify':
+            results = store.verify(args.backend, args.name)
+            for key, problems in results:
+                print(f"    {'✅' if not problems else '❌'} {key}" + (f": {'; '.join(problems)}" if problems else ""))
+            if not results:
+                print("    (没有需要校验的模型)")
+            if any(problems for _, problems in results):
+                sys.exit(1)
+        elif args.command == 'remove':
+            if store.remove(args.backend, args.name):
+                print(f"🗑️ 已删除 {args.backend}/{args.name}")
+            else:
+                print(f"⚠️ 模型库中没有 {args.backend}/{args.name}")
+    except ModelStoreError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预览文件生成
+为录制视频生成轻量级的预览文件，浏览时不需要读取原始的大体积MP4：
+  - 缩略图雪碧图 + WebVTT索引（拖动进度条时的预览图）
+  - 可选的低码率代理视频（faststart，moov放在文件开头，网络盘上拖动也很快）
+
+所有文件写在 <会议文件夹>/previews/ 下，进度记录在 previews/preview.json 中：
+每张雪碧图单独生成，中断后再次运行会跳过已完成的部分；源视频变化时全部重新生成。
+ffmpeg以低优先级和限定的线程数运行，适合在后台跑。
+
+用法:
+  python3 src/preview_artifacts.py recordings/xxx/xxx.mp4
+  python3 src/preview_artifacts.py recordings/xxx/xxx.mp4 --proxy --threads 1
+
+作者: VideoMeetingTranscript
+"""
+
+import os
+import sys
+import json
+import math
+import argparse
+import subprocess
+from pathlib import Path
+from typing import Optional
+
+from media_probe import get_media_info
+
+PREVIEW_DIR_NAME = "previews"
+STATE_FILE_NAME = "preview.json"
+THUMBNAILS_VTT_NAME = "thumbnails.vtt"
+PROXY_FILE_NAME = "proxy.mp4"
+
+DEFAULT_INTERVAL = 10      # 每隔多少秒截一张缩略图
+DEFAULT_THUMB_WIDTH = 160
+DEFAULT_THUMB_HEIGHT = 90
+DEFAULT_COLUMNS = 10
+DEFAULT_ROWS = 10
+DEFAULT_THREADS = 2
+DEFAULT_NICE = 10
+
+
+def format_vtt_time(seconds: float) -> str:
+    milliseconds = int(round(seconds * 1000))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{milliseconds:03d}"
+
+
+class PreviewGenerator:
+    """单个视频的预览文件生成器"""
+
+    def __init__(self, video_path, interval: int = DEFAULT_INTERVAL,
+                 thumb_width: int = DEFAULT_THUMB_WIDTH, thumb_height: int = DEFAULT_THUMB_HEIGHT,
+                 columns: int = DEFAULT_COLUMNS, rows: int = DEFAULT_ROWS,
+                 threads: int = DEFAULT_THREADS, nice: int = DEFAULT_NICE):
+        """
+        Args:
+            video_path: 源视频路径
+            interval: 缩略图间隔（秒）
+            thumb_width / thumb_height: 单张缩略图尺寸
+            columns / rows: 每张雪碧图的行列数
+            threads: ffmpeg线程数上限
+            nice: ffmpeg进程的nice值（越大优先级越低）
+        """
+        self.video_path = Path(video_path)
+        self.preview_dir = self.video_path.parent / PREVIEW_DIR_NAME
+        self.state_file = self.preview_dir / STATE_FILE_NAME
+        self.interval = interval
+        self.thumb_width = thumb_width
+        self.thumb_height = thumb_height
+        self.columns = columns
+        self.rows = rows
+        self.threads = threads
+        self.nice = nice
+
+    # ------------------------------------------------------------ 状态
+
+    def source_signature(self) -> list:
+        stat = self.video_path.stat()
+        return [self.video_path.name, stat.st_mtime_ns, stat.st_size]
+
+    def settings(self) -> dict:
+        return {
+            "interval": self.interval,
+            "thumb_width": self.thumb_width,
+            "thumb_height": self.thumb_height,
+            "columns": self.columns,
+            "rows": self.rows,
+        }
+
+    def load_state(self) -> dict:
+        """读取进度；源视频或参数变化时返回全新的状态"""
+        fresh = {
+            "source": self.source_signature(),
+            "settings": self.settings(),
+            "sprites": {},
+            "thumbnails": None,
+            "proxy": None,
+        }
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return fresh
+        if state.get("source") != fresh["source"]:
+            return fresh
+        if state.get("settings") != fresh["settings"]:
+            # 缩略图参数变化，只需重新生成雪碧图
+            state.update(settings=fresh["settings"], sprites={}, thumbnails=None)
+        return state
+
+    def save_state(self, state: dict) -> None:
+        tmp_file = self.state_file.with_name(self.state_file.name + ".tmp")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    # ------------------------------------------------------------ ffmpeg
+
+    def _run_ffmpeg(self, args: list, timeout: Optional[float] = None) -> bool:
+        cmd = ['ffmpeg', '-hide_banner', '-loglevel', 'error', '-y'] + args
+        preexec_fn = None
+        if self.nice and hasattr(os, 'nice'):
+            niceness = self.nice
+            preexec_fn = lambda: os.nice(niceness)
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, preexec_fn=preexec_fn)
+        if result.returncode != 0:
+            print(f"❌ ffmpeg失败: {result.stderr.strip()}")
+            return False
+        return True
+
+    # ------------------------------------------------------------ 雪碧图
+
+    def generate_sprites(self, state: dict, duration: float) -> bool:
+        """逐张生成雪碧图，已完成的跳过"""
+        per_sheet = self.columns * self.rows
+        thumb_count = max(1, math.ceil(duration / self.interval))
+        sheet_count = math.ceil(thumb_count / per_sheet)
+        sheet_span = per_sheet * self.interval
+
+        for sheet in range(sheet_count):
+            name = f"sprite_{sheet:03d}.jpg"
+            sprite_path = self.preview_dir / name
+            if state["sprites"].get(name) and sprite_path.exists():
+                continue
+
+            start = sheet * sheet_span
+            print(f"🖼️ 生成雪碧图 {sheet + 1}/{sheet_count}: {name}")
+            tmp_path = sprite_path.with_name(f".{name}.tmp.jpg")
+            video_filter = (
+                f"fps=1/{self.interval},"
+                f"scale={self.thumb_width}:{self.thumb_height}:force_original_aspect_ratio=decrease,"
+                f"pad={self.thumb_width}:{self.thumb_height}:(ow-iw)/2:(oh-ih)/2,"
+                f"tile={self.columns}x{self.rows}"
+            )
+            ok = self._run_ffmpeg([
+                '-ss', str(start),
+                '-t', str(sheet_span),
+                '-i', str(self.video_path),
+                '-an',
+                '-vf', video_filter,
+                '-frames:v', '1',
+                '-q:v', '5',
+                '-threads', str(self.threads),
+                str(tmp_path)
+            ])
+            if not ok or not tmp_path.exists():
+                return False
+            os.replace(tmp_path, sprite_path)
+            state["sprites"][name] = True
+            self.save_state(state)
+
+        if not state.get("thumbnails"):
+            self.write_thumbnails_vtt(thumb_count, duration)
+            state["thumbnails"] = THUMBNAILS_VTT_NAME
+            self.save_state(state)
+        return True
+
+    def write_thumbnails_vtt(self, thumb_count: int, duration: float) -> Path:
+        """写出缩略图索引：每个时间段对应雪碧图中的一个区域 (#xywh=)"""
+        per_sheet = self.columns * self.rows
+        lines = ["WEBVTT", ""]
+        for i in range(thumb_count):
+            start = i * self.interval
+            end = min(duration, start + self.interval)
+            sheet, position = divmod(i, per_sheet)
+            x = (position % self.columns) * self.thumb_width
+            y = (position // self.columns) * self.thumb_height
+            lines.append(f"{format_vtt_time(start)} --> {format_vtt_time(max(end, start + 0.001))}")
+            lines.append(f"sprite_{sheet:03d}.jpg#xywh={x},{y},{self.thumb_width},{self.thumb_height}")
+            lines.append("")
+        vtt_path = self.preview_dir / THUMBNAILS_VTT_NAME
+        with open(vtt_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines))
+        return vtt_path
+
+    # ------------------------------------------------------------ 代理视频
+
+    def generate_proxy(self, state: dict, height: int = 480, crf: int = 30) -> bool:
+        """生成低码率代理视频（H.264 + 单声道AAC，faststart）"""
+        proxy_path = self.preview_dir / PROXY_FILE_NAME
+        if state.get("proxy") and proxy_path.exists():
+            return True
+
+        print(f"🎞️ 生成代理视频: {proxy_path.name} ({height}p, crf {crf})")
+        tmp_path = proxy_path.with_name(f".{PROXY_FILE_NAME}.tmp.mp4")
+        ok = self._run_ffmpeg([
+            '-i', str(self.video_path),
+            '-map', '0:v:0',
+            '-map', '0:a:0?',              # OBS录制的第一条音轨是混音
+            '-vf', f"scale=-2:'min({height},ih)'",
+            '-c:v', 'libx264',
+            '-preset', 'veryfast',
+            '-crf', str(crf),
+            '-c:a', 'aac',
+            '-b:a', '64k',
+            '-ac', '1',
+            '-movflags', '+faststart',     # moov放在文件开头
+            '-threads', str(self.threads),
+            str(tmp_path)
+        ])
+        if not ok or not tmp_path.exists():
+            return False
+        os.replace(tmp_path, proxy_path)
+        state["proxy"] = PROXY_FILE_NAME
+        self.save_state(state)
+        return True
+
+    # ------------------------------------------------------------ 入口
+
+    def run(self, proxy: bool = False) -> bool:
+        """生成所有预览文件（可重复运行，已完成的部分会跳过）"""
+        if not self.video_path.exists():
+            print(f"❌ 视频文件不存在: {self.video_path}")
+            return False
+
+        info = get_media_info(self.video_path)
+        if not info or not info.get("duration"):
+            print(f"❌ 无法读取视频时长: {self.video_path}")
+            return False
+        duration = info["duration"]
+
+        self.preview_dir.mkdir(exist_ok=True)
+        state = self.load_state()
+        self.save_state(state)
+
+        print(f"🎬 生成预览文件: {self.video_path.name} (时长 {duration / 60:.1f} 分钟)")
+        if not self.generate_sprites(state, duration):
+            return False
+        if proxy and not self.generate_proxy(state):
+            return False
+        print(f"✅ 预览文件已生成: {self.preview_dir}")
+        return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="为录制视频生成缩略图雪碧图和低码率代理视频")
+    parser.add_argument('video', help='源视频路径')
+    parser.add_argument('--proxy', action='store_true', help='同时生成低码率代理视频')
+    parser.add_argument('--interval', type=int, default=DEFAULT_INTERVAL, help=f'缩略图间隔秒数 (默认: {DEFAULT_INTERVAL})')
+    parser.add_argument('--threads', type=int, default=DEFAULT_THREADS, help=f'ffmpeg线程数上限 (默认: {DEFAULT_THREADS})')
+    parser.add_argument('--nice', type=int, default=DEFAULT_NICE, help=f'ffmpeg进程的nice值 (默认: {DEFAULT_NICE})')
+    args = parser.parse_args()
+
+    generator = PreviewGenerator(args.video, interval=args.interval, threads=args.threads, nice=args.nice)
+    sys.exit(0 if generator.run(proxy=args.proxy) else 1)
+
+
+if __name__ == '__main__':
+    main()
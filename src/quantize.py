@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Whisper模型int8动态量化（CPU推理）
+whisper.load_model 加载的是fp32权重。动态量化把编码器和解码器中所有线性层的权重
+转换成int8，推理时激活值按batch动态量化，CPU上矩阵乘法更快，模型占用的内存也只有约1/4
+（medium/large模型最明显）。卷积、LayerNorm和词嵌入保持fp32。
+
+量化后的模型保存在缓存目录中，之后加载直接读取，不需要先加载fp32权重再转换：
+    ~/.cache/whisper/quantized/<模型>-int8-torch<版本>-whisper<版本>.pt
+目录可以用环境变量 VMT_QUANTIZED_DIR 修改。torch或whisper升级后缓存文件名会变，自动重新转换。
+
+用法:
+  python3 src/whisper_transcribe.py --quantize int8 --model medium
+  python3 src/quantize.py medium                 # 预先生成缓存
+  python3 src/quantize.py --list                 # 查看已缓存的量化模型
+  python3 benchmarks/quantize_report.py recordings/xxx/xxx_对方.wav --model medium
+
+作者: VideoMeetingTranscript
+"""
+
+import os
+import time
+import argparse
+from pathlib import Path
+from typing import Optional
+
+QUANTIZE_MODES = ("int8",)
+
+
+def cache_dir() -> Path:
+    if os.environ.get("VMT_QUANTIZED_DIR"):
+        return Path(os.environ["VMT_QUANTIZED_DIR"])
+    # 与whisper下载模型的位置相同
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(root) / "whisper" / "quantized"
+
+
+def cache_path(model_name: str, mode: str = "int8") -> Path:
+    """量化模型的缓存文件；model_name也可以是本地checkpoint路径"""
+    import torch
+    import whisper
+    source = Path(model_name)
+    if source.is_file():
+        stat = source.stat()
+        name = f"{source.stem}-{stat.st_size}-{int(stat.st_mtime)}"
+    else:
+        name = model_name
+    torch_version = torch.__version__.split("+")[0]
+    return cache_dir() / f"{name}-{mode}-torch{torch_version}-whisper{whisper.__version__}.pt"
+
+
+def select_engine():
+    """x86用fbgemm，ARM用qnnpack"""
+    import torch
+    engines = torch.backends.quantized.supported_engines
+    for engine in ("fbgemm", "x86", "qnnpack"):
+        if engine in engines:
+            torch.backends.quantized.engine = engine
+            return engine
+    raise RuntimeError(f"当前PyTorch不支持量化推理 (supported_engines: {engines})")
+
+
+def quantize_model(model, mode: str = "int8"):
+    """
+    对whisper模型的线性层做动态量化（原地修改并返回）
+
+    whisper.model.Linear 是 nn.Linear 的子类（只重写了forward里的dtype转换），
+    quantize_dynamic 按精确类型匹配，所以先把它们换回 nn.Linear。
+    """
+    import torch
+    import whisper.model
+
+    if mode not in QUANTIZE_MODES:
+        raise ValueError(f"未知的量化方式: {mode} (可选: {', '.join(QUANTIZE_MODES)})")
+    select_engine()
+    model = model.cpu().float().eval()
+    for module in model.modules():
+        if type(module) is whisper.model.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def load_quantized_model(model_name: str, mode: str = "int8", device: Optional[str] = None,
+                         download_root: Optional[str] = None, verbose: bool = True):
+    """
+    加载量化后的whisper模型，缓存不存在时从fp32模型转换并写入缓存
+
+    Raises:
+        ValueError: 未知的量化方式，或者device不是cpu（量化模型只能在CPU上运行）
+    """
+    import torch
+    from model_store import load_whisper_model
+
+    if mode not in QUANTIZE_MODES:
+        raise ValueError(f"未知的量化方式: {mode} (可选: {', '.join(QUANTIZE_MODES)})")
+    if device and device != "cpu":
+        raise ValueError(f"{mode}量化模型只能在CPU上运行 (device={device})")
+
+    path = cache_path(model_name, mode)
+    if path.exists():
+        select_engine()
+        try:
+            model = torch.load(path, map_location="cpu", weights_only=False)
+            if verbose:
+                print(f"📦 使用量化模型缓存: {path}")
+            return model.eval()
+        except Exception as e:
+            print(f"⚠️ 量化模型缓存损坏，重新转换: {e}")
+
+    start = time.time()
+    model = quantize_model(load_whisper_model(model_name, device="cpu", download_root=download_root), mode)
+    if verbose:
+        print(f"🔧 {model_name} 已量化为{mode} (耗时: {time.time() - start:.1f}秒)")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = path.with_name(path.name + ".tmp")
+        torch.save(model, tmp_file)
+        tmp_file.replace(path)
+        if verbose:
+            print(f"💾 量化模型已缓存: {path}")
+    except OSError as e:
+        print(f"⚠️ 无法写入量化模型缓存: {e}")
+    return model
+
+
+def model_bytes(model) -> int:
+    """模型权重占用的字节数（量化层按int8权重计算）"""
+    from torch.ao.nn.quantized.dynamic import Linear as QuantizedLinear
+    total = 0
+    for module in model.modules():
+        if isinstance(module, QuantizedLinear):
+            weight, bias = module._weight_bias()
+            total += weight.numel() * weight.element_size()
+            if bias is not None:
+                total += bias.numel() * bias.element_size()
+        for tensor in list(module.parameters(recurse=False)) + list(module.buffers(recurse=False)):
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把whisper模型转换成int8动态量化模型并缓存")
+    parser.add_argument('models', nargs='*', help='模型名称或本地checkpoint路径，例如 small medium')
+    parser.add_argument('--mode', choices=QUANTIZE_MODES, default="int8", help='量化方式 (默认: int8)')
+    parser.add_argument('--list', action='store_true', help='列出已缓存的量化模型')
+    args = parser.parse_args()
+
+    if args.list or not args.models:
+        directory = cache_dir()
+        files = sorted(directory.glob("*.pt")) if directory.exists() else []
+        print(f"📁 缓存目录: {directory}")
+        for path in files:
+            print(f"    {path.name:<60} {path.stat().st_size / 1024 / 1024:8.1f} MB")
+        if not files:
+            print("    (空)")
+        return
+
+    for name in args.models:
+        model = load_quantized_model(name, args.mode)
+        print(f"✅ {name}: 权重 {model_bytes(model) / 1024 / 1024:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
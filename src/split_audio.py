@@ -2,9 +2,13 @@ import librosa
 import numpy as np
 import soundfile as sf
 import os
+import bisect
 from typing import List, Tuple
 import logging
 
+from audio_io import AUDIO_SUFFIXES, BLOCK_SAMPLES, AudioReader
+from stage_metrics import stage
+
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(message)s')
 logger = logging.getLogger(__name__)
@@ -35,6 +39,82 @@ def find_silence_segments(audio: np.ndarray, sr: int,
             silent_segments.append((start_frame * 512 / sr, len(silent_frames) * 512 / sr))
     return silent_segments
 
+def find_speech_regions(audio: np.ndarray, sr: int,
+                        silence_threshold: float = 0.01,
+                        min_silence_duration: float = 0.5,
+                        padding: float = 0.2,
+                        min_speech_duration: float = 0.2) -> List[Tuple[float, float]]:
+    """
+    基于静音检测的语音活动检测（VAD）
+    Args:
+        audio: 音频数据
+        sr: 采样率
+        silence_threshold: 低于该RMS能量视为静音
+        min_silence_duration: 短于该时长的静音不切开（句中停顿）
+        padding: 每个语音区域前后保留的余量（秒），避免切掉弱起的辅音
+        min_speech_duration: 短于该时长的孤立语音区域视为噪声丢弃
+    Returns: 语音区域列表，每个元素为(开始时间, 结束时间)，互不重叠且按时间排序
+    """
+    duration = len(audio) / sr
+    silences = find_silence_segments(audio, sr, min_silence_duration, silence_threshold)
+    regions = []
+    cursor = 0.0
+    for silence_start, silence_end in silences + [(duration, duration)]:
+        if silence_start - cursor >= min_speech_duration:
+            start = max(0.0, cursor - padding)
+            end = min(duration, silence_start + padding)
+            if regions and start <= regions[-1][1]:
+                regions[-1] = (regions[-1][0], end)
+            else:
+                regions.append((start, end))
+        cursor = silence_end
+    return regions
+
+def compact_speech(audio: np.ndarray, sr: int, regions: List[Tuple[float, float]],
+                   gap: float = 0.3) -> Tuple[np.ndarray, List[Tuple[float, float, float]]]:
+    """
+    把语音区域拼接成一段紧凑的音频，区域之间插入短暂静音
+    Returns: (紧凑音频, 时间映射)，映射的每个元素为(紧凑时间起点, 原始时间起点, 时长)
+    """
+    gap_samples = np.zeros(int(gap * sr), dtype=audio.dtype)
+    pieces = []
+    mapping = []
+    compact_time = 0.0
+    for start, end in regions:
+        piece = audio[int(start * sr):int(end * sr)]
+        if len(piece) == 0:
+            continue
+        if pieces:
+            pieces.append(gap_samples)
+            compact_time += len(gap_samples) / sr
+        mapping.append((compact_time, start, len(piece) / sr))
+        pieces.append(piece)
+        compact_time += len(piece) / sr
+    compact = np.concatenate(pieces) if pieces else np.zeros(0, dtype=audio.dtype)
+    return compact, mapping
+
+def to_original_time(t: float, mapping: List[Tuple[float, float, float]], starts: List[float] = None) -> float:
+    """
+    把紧凑音频上的时间换算回原始时间线（落在插入的静音里时取前一个区域的结尾）
+    starts: 预先取出的映射起点列表 [m[0] for m in mapping]，批量换算时避免重复构造
+    """
+    if not mapping:
+        return t
+    if starts is None:
+        starts = [m[0] for m in mapping]
+    index = max(0, bisect.bisect_right(starts, t) - 1)
+    compact_start, original_start, length = mapping[index]
+    return original_start + min(max(0.0, t - compact_start), length)
+
+def remap_segments(segments: List[dict], mapping: List[Tuple[float, float, float]]) -> List[dict]:
+    """把识别结果的start/end从紧凑音频换算回原始时间线"""
+    starts = [m[0] for m in mapping]
+    return [
+        dict(seg, start=to_original_time(seg['start'], mapping, starts),
+             end=to_original_time(seg['end'], mapping, starts))
+        for seg in segments
+    ]
+
 def find_best_split_point(audio: np.ndarray, sr: int, target_time: float, search_window: float = 30.0) -> float:
     """
     在目标时间点附近找到最佳分割点（优先静音区，否则能量最低点）
@@ -47,7 +127,14 @@ def find_best_split_point(audio: np.ndarray, sr: int, target_time: float, search
     """
     start_frame = max(0, int((target_time - search_window) * sr))
     end_frame = min(len(audio), int((target_time + search_window) * sr))
-    search_audio = audio[start_frame:end_frame]
+    return best_split_in_window(audio[start_frame:end_frame], sr, start_frame, target_time, search_window)
+
+def best_split_in_window(search_audio: np.ndarray, sr: int, start_frame: int,
+                         target_time: float, search_window: float = 30.0) -> float:
+    """
+    find_best_split_point 的搜索部分：search_audio 是从样本 start_frame 开始的搜索窗口
+    （分块读取音频时只需要读入各分割点附近的窗口）
+    """
     silent_segments = find_silence_segments(search_audio, sr, min_silence_duration=1.0, silence_threshold=0.015)
     if silent_segments:
         # 找到最接近目标时间的静音段
@@ -64,48 +151,61 @@ def split_audio_file(input_file: str, output_dir: str, num_parts: int = 4) -> Li
     智能分割音频文件，分割点优先选静音区
     Returns: 分割后的音频文件路径列表
     """
-    os.makedirs(output_dir, exist_ok=True)
-    logger.info(f"📖 加载音频文件: {input_file}")
-    audio, sr = librosa.load(input_file, sr=None)
-    duration = len(audio) / sr
-    target_length = duration / num_parts
-    logger.info(f"⏱️ 音频总时长: {duration:.1f}秒")
-    logger.info(f"📊 目标分片长度: {target_length:.1f}秒")
+    with stage("split_audio", parts=num_parts) as metrics:
+        os.makedirs(output_dir, exist_ok=True)
+        logger.info(f"📖 打开音频文件: {input_file}")
+        reader = AudioReader(input_file, sample_rate=None)
+        sr = reader.sample_rate
+        total = reader.samples
+        duration = total / sr
+        metrics.update(audio_seconds=duration)
+        target_length = duration / num_parts
+        logger.info(f"⏱️ 音频总时长: {duration:.1f}秒")
+        logger.info(f"📊 目标分片长度: {target_length:.1f}秒")
     
-    # 找到分割点
-    split_points = [0]
-    for i in range(1, num_parts):
-        target_time = i * target_length
-        split_point = find_best_split_point(audio, sr, target_time, search_window=30.0)
-        split_points.append(split_point)
-    split_points.append(duration)
+        # 找到分割点
+        split_points = [0]
+        for i in range(1, num_parts):
+            target_time = i * target_length
+            # 只读取分割点前后30秒的窗口（flac按帧定位，不需要解码整个文件）
+            start_frame = max(0, int((target_time - 30.0) * sr))
+            end_frame = min(total, int((target_time + 30.0) * sr))
+            search_audio = reader.read(start_frame, end_frame)
+            split_point = best_split_in_window(search_audio, sr, start_frame, target_time, search_window=30.0)
+            split_points.append(split_point)
+        split_points.append(duration)
     
-    # 验证分割点
-    total_duration = 0
-    for i in range(len(split_points)-1):
-        segment_duration = split_points[i+1] - split_points[i]
-        total_duration += segment_duration
-        logger.info(f"分片 {i+1} 时长: {segment_duration:.1f}秒")
+        # 验证分割点
+        total_duration = 0
+        for i in range(len(split_points)-1):
+            segment_duration = split_points[i+1] - split_points[i]
+            total_duration += segment_duration
+            logger.info(f"分片 {i+1} 时长: {segment_duration:.1f}秒")
     
-    # 验证总时长
-    if abs(total_duration - duration) > 0.1:  # 允许0.1秒的误差
-        logger.error(f"❌ 分片总时长 ({total_duration:.1f}秒) 与原音频时长 ({duration:.1f}秒) 不匹配！")
-        raise ValueError("分片总时长与原音频时长不匹配")
-    logger.info(f"✅ 分片总时长验证通过: {total_duration:.1f}秒")
+        # 验证总时长
+        if abs(total_duration - duration) > 0.1:  # 允许0.1秒的误差
+            logger.error(f"❌ 分片总时长 ({total_duration:.1f}秒) 与原音频时长 ({duration:.1f}秒) 不匹配！")
+            reader.close()
+            raise ValueError("分片总时长与原音频时长不匹配")
+        logger.info(f"✅ 分片总时长验证通过: {total_duration:.1f}秒")
     
-    # 分割并保存音频
-    output_files = []
-    for i in range(num_parts):
-        start_frame = int(split_points[i] * sr)
-        end_frame = int(split_points[i+1] * sr)
-        segment = audio[start_frame:end_frame]
-        base_name = os.path.splitext(os.path.basename(input_file))[0]
-        output_file = os.path.join(output_dir, f"{base_name}_part{i+1}.wav")
-        sf.write(output_file, segment, sr)
-        output_files.append(output_file)
-        logger.info(f"💾 保存分片 {i+1}: {output_file}")
-        logger.info(f"⏱️ 分片时长: {len(segment)/sr:.1f}秒")
-        logger.info(f"📍 时间戳: {split_points[i]:.1f}s - {split_points[i+1]:.1f}s")
+        # 分块读取并保存音频，分片与输入格式相同（wav或flac）
+        output_files = []
+        base_name, suffix = os.path.splitext(os.path.basename(input_file))
+        if suffix.lower() not in AUDIO_SUFFIXES:
+            suffix = ".wav"
+        with reader:
+            for i in range(num_parts):
+                start_frame = int(split_points[i] * sr)
+                end_frame = min(total, int(split_points[i+1] * sr))
+                output_file = os.path.join(output_dir, f"{base_name}_part{i+1}{suffix}")
+                with sf.SoundFile(output_file, 'w', samplerate=sr, channels=1, subtype='PCM_16') as out:
+                    for block_start in range(start_frame, end_frame, BLOCK_SAMPLES):
+                        out.write(reader.read(block_start, min(end_frame, block_start + BLOCK_SAMPLES)))
+                output_files.append(output_file)
+                logger.info(f"💾 保存分片 {i+1}: {output_file}")
+                logger.info(f"⏱️ 分片时长: {(end_frame - start_frame)/sr:.1f}秒")
+                logger.info(f"📍 时间戳: {split_points[i]:.1f}s - {split_points[i+1]:.1f}s")
     
     return output_files
 
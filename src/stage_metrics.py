@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+处理阶段指标
+记录每个处理阶段的墙钟时间、CPU时间（含子进程）、峰值内存、磁盘读写字节数
+和处理的音频时长（由此得到实时率RTF），每个阶段一行追加到JSON Lines文件：
+
+    with stage("transcribe", audio_seconds=1440, speaker="对方") as m:
+        ...
+        m.update(segments=123)
+
+同一次工作流程中的所有脚本共享一个job id（环境变量 VMT_METRICS_JOB，
+由 auto_recording_workflow.py 设置并传给子进程），方便按任务汇总。
+默认写到 recordings/.metrics.jsonl，可以用环境变量 VMT_METRICS_FILE 修改，
+设置 VMT_METRICS_FILE=off 关闭记录。
+
+用法:
+  python3 src/stage_metrics.py summary
+  python3 src/stage_metrics.py prometheus > /var/lib/node_exporter/vmt.prom
+  python3 src/stage_metrics.py serve --port 9108
+
+作者: VideoMeetingTranscript
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import argparse
+from collections import defaultdict
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+METRICS_FILE_NAME = ".metrics.jsonl"
+JOB_ENV = "VMT_METRICS_JOB"
+FILE_ENV = "VMT_METRICS_FILE"
+DEFAULT_METRICS_PORT = 9108
+
+
+def default_metrics_file() -> Optional[Path]:
+    configured = os.environ.get(FILE_ENV)
+    if configured:
+        return None if configured.lower() in ("off", "0", "none") else Path(configured)
+    return Path(__file__).parent.parent / "recordings" / METRICS_FILE_NAME
+
+
+def current_job_id() -> str:
+    """当前任务的id；没有设置时生成一个并写入环境变量，子进程会继承"""
+    job = os.environ.get(JOB_ENV)
+    if not job:
+        job = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        os.environ[JOB_ENV] = job
+    return job
+
+
+def _rusage():
+    """(本进程CPU秒数, 已结束子进程CPU秒数, 本进程峰值RSS字节, 子进程峰值RSS字节)"""
+    if resource is None:
+        return 0.0, 0.0, 0, 0
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    # Linux上ru_maxrss单位是KB，macOS上是字节
+    scale = 1 if sys.platform == "darwin" else 1024
+    return (own.ru_utime + own.ru_stime, children.ru_utime + children.ru_stime,
+            own.ru_maxrss * scale, children.ru_maxrss * scale)
+
+
+def _io_bytes():
+    """从 /proc/self/io 读取实际的磁盘读写字节数（包含已结束的子进程），不支持时返回None"""
+    try:
+        with open("/proc/self/io", "r") as f:
+            values = dict(line.split(":", 1) for line in f if ":" in line)
+        return int(values["read_bytes"]), int(values["write_bytes"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class StageMetrics:
+    """一个处理阶段的指标，作为上下文管理器使用"""
+
+    def __init__(self, name: str, audio_seconds: Optional[float] = None,
+                 metrics_file: Optional[Path] = None, **labels):
+        self.name = name
+        self.audio_seconds = audio_seconds
+        self.metrics_file = metrics_file if metrics_file is not None else default_metrics_file()
+        self.labels = labels
+        self.record = None
+
+    def update(self, **fields) -> None:
+        """补充字段（例如处理完成后才知道的片段数）"""
+        if "audio_seconds" in fields:
+            self.audio_seconds = fields.pop("audio_seconds")
+        self.labels.update(fields)
+
+    def __enter__(self):
+        self._started = datetime.now()
+        self._wall = time.perf_counter()
+        self._cpu, self._cpu_children, _, _ = _rusage()
+        self._io = _io_bytes()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self._wall
+        cpu, cpu_children, peak_rss, peak_rss_children = _rusage()
+        io = _io_bytes()
+
+        record = {
+            "job": current_job_id(),
+            "stage": self.name,
+            "script": Path(sys.argv[0]).name if sys.argv and sys.argv[0] else None,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "started": self._started.isoformat(timespec='seconds'),
+            "ok": exc_type is None,
+            "wall_seconds": round(wall, 4),
+            "cpu_seconds": round(cpu - self._cpu, 4),
+            "cpu_children_seconds": round(cpu_children - self._cpu_children, 4),
+            # ru_maxrss是进程生命周期内的峰值，不是本阶段单独的峰值
+            "peak_rss_bytes": peak_rss,
+            "peak_rss_children_bytes": peak_rss_children,
+        }
+        if io and self._io:
+            record["read_bytes"] = io[0] - self._io[0]
+            record["write_bytes"] = io[1] - self._io[1]
+        if self.audio_seconds:
+            record["audio_seconds"] = round(self.audio_seconds, 3)
+            record["rtf"] = round(wall / self.audio_seconds, 5)
+        record.update(self.labels)
+        self.record = record
+        write_record(record, self.metrics_file)
+        return False
+
+
+def stage(name: str, audio_seconds: Optional[float] = None, **labels) -> StageMetrics:
+    """记录一个处理阶段的指标"""
+    return StageMetrics(name, audio_seconds, **labels)
+
+
+def write_record(record: dict, metrics_file: Optional[Path] = None) -> None:
+    """追加一行指标；写入失败只给出警告，不影响处理流程"""
+    if metrics_file is None:
+        return
+    try:
+        metrics_file.parent.mkdir(parents=True, exist_ok=True)
+        # 一行一次write，多个进程同时追加也不会交错
+        with open(metrics_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"⚠️ 无法写入指标文件 {metrics_file}: {e}")
+
+
+def read_records(metrics_file: Optional[Path] = None) -> list:
+    metrics_file = metrics_file or default_metrics_file()
+    records = []
+    if not metrics_file or not metrics_file.exists():
+        return records
+    with open(metrics_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+def aggregate(records: list) -> dict:
+    """按阶段汇总"""
+    stages = defaultdict(lambda: defaultdict(float))
+    for record in records:
+        s = stages[record["stage"]]
+        s["runs"] += 1
+        s["failures"] += 0 if record.get("ok", True) else 1
+        s["wall_seconds"] += record.get("wall_seconds", 0.0)
+        s["cpu_seconds"] += record.get("cpu_seconds", 0.0) + record.get("cpu_children_seconds", 0.0)
+        s["audio_seconds"] += record.get("audio_seconds", 0.0)
+        s["read_bytes"] += record.get("read_bytes", 0)
+        s["write_bytes"] += record.get("write_bytes", 0)
+        s["peak_rss_bytes"] = max(s["peak_rss_bytes"], record.get("peak_rss_bytes", 0),
+                                  record.get("peak_rss_children_bytes", 0))
+        if "rtf" in record:
+            s["last_rtf"] = record["rtf"]
+    return stages
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_prometheus(records: list) -> str:
+    """生成Prometheus文本格式的指标"""
+    metrics = [
+        ("vmt_stage_runs_total", "counter", "Number of completed stage runs", "runs"),
+        ("vmt_stage_failures_total", "counter", "Number of failed stage runs", "failures"),
+        ("vmt_stage_wall_seconds_total", "counter", "Wall-clock time spent in the stage", "wall_seconds"),
+        ("vmt_stage_cpu_seconds_total", "counter", "CPU time spent in the stage, including children", "cpu_seconds"),
+        ("vmt_stage_audio_seconds_total", "counter", "Seconds of audio processed by the stage", "audio_seconds"),
+        ("vmt_stage_read_bytes_total", "counter", "Bytes read from storage by the stage", "read_bytes"),
+        ("vmt_stage_write_bytes_total", "counter", "Bytes written to storage by the stage", "write_bytes"),
+        ("vmt_stage_peak_rss_bytes", "gauge", "Highest peak RSS observed for the stage", "peak_rss_bytes"),
+        ("vmt_stage_last_rtf", "gauge", "Real-time factor of the most recent run", "last_rtf"),
+    ]
+    stages = aggregate(records)
+    lines = []
+    for metric, kind, help_text, key in metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        for name, values in sorted(stages.items()):
+            if key in values:
+                lines.append(f'{metric}{{stage="{_escape_label(name)}"}} {values[key]:g}')
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    metrics_file = None
+
+    def do_GET(self):
+        if self.path.split('?')[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus(read_records(self.metrics_file)).encode('utf-8')
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="查看和导出处理阶段的性能指标")
+    parser.add_argument('--file', type=str, help=f'指标文件 (默认: recordings/{METRICS_FILE_NAME})')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    summary_parser = subparsers.add_parser('summary', help='按阶段汇总')
+    summary_parser.add_argument('--job', type=str, help='只汇总某个任务')
+    subparsers.add_parser('prometheus', help='输出Prometheus文本格式')
+    serve_parser = subparsers.add_parser('serve', help='启动Prometheus抓取端点 (/metrics)')
+    serve_parser.add_argument('--host', default='127.0.0.1', help='监听地址 (默认: 127.0.0.1)')
+    serve_parser.add_argument('--port', type=int, default=DEFAULT_METRICS_PORT,
+                              help=f'监听端口 (默认: {DEFAULT_METRICS_PORT})')
+    args = parser.parse_args()
+
+    metrics_file = Path(args.file) if args.file else default_metrics_file()
+
+    if args.command == 'prometheus':
+        sys.stdout.write(render_prometheus(read_records(metrics_file)))
+        return
+
+    if args.command == 'serve':
+        MetricsHandler.metrics_file = metrics_file
+        server = ThreadingHTTPServer((args.host, args.port), MetricsHandler)
+        print(f"📈 指标端点: http://{args.host}:{args.port}/metrics ({metrics_file})")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        return
+
+    records = read_records(metrics_file)
+    if args.job:
+        records = [r for r in records if r.get("job") == args.job]
+    if not records:
+        print("📭 没有指标记录")
+        return
+    print(f"📊 {len(records)} 条记录, {len({r.get('job') for r in records})} 个任务")
+    print(f"{'阶段':<20}{'次数':>6}{'墙钟(s)':>12}{'CPU(s)':>12}{'音频(s)':>12}{'RTF':>9}{'峰值内存(MB)':>14}")
+    for name, s in sorted(aggregate(records).items(), key=lambda item: -item[1]["wall_seconds"]):
+        rtf = s["wall_seconds"] / s["audio_seconds"] if s["audio_seconds"] else 0.0
+        print(f"{name:<20}{int(s['runs']):>6}{s['wall_seconds']:>12.1f}{s['cpu_seconds']:>12.1f}"
+              f"{s['audio_seconds']:>12.0f}{rtf:>9.3f}{s['peak_rss_bytes'] / 1048576:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
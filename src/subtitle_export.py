@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+字幕文件导出
+把转录JSON转换为WebVTT和SRT字幕，浏览器可以直接用 <track> 原生渲染，
+外部播放器和剪辑工具也可以直接使用。
+
+用法:
+  python3 src/subtitle_export.py recordings/xxx/xxx_transcription.json
+  python3 src/subtitle_export.py a.json b.json --formats vtt
+
+作者: VideoMeetingTranscript
+"""
+
+import json
+import argparse
+from pathlib import Path
+from typing import List
+
+# 起止时间相同的片段在WebVTT中是无效的，最短显示时长（秒）
+MIN_CUE_DURATION = 0.01
+
+CAPTION_FORMATS = ("vtt", "srt")
+
+
+def format_timestamp(seconds: float, decimal_marker: str = '.') -> str:
+    """格式化为 HH:MM:SS.mmm（SRT使用逗号作为毫秒分隔符）"""
+    milliseconds = max(0, int(round(seconds * 1000)))
+    hours, milliseconds = divmod(milliseconds, 3600000)
+    minutes, milliseconds = divmod(milliseconds, 60000)
+    secs, milliseconds = divmod(milliseconds, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}{decimal_marker}{milliseconds:03d}"
+
+
+def _sorted_segments(segments: List[dict]) -> List[dict]:
+    # 与 web/transcript_index.py 相同的排序规则，字幕序号和时间索引的序号保持一致
+    return sorted(segments, key=lambda s: (s['start'], s['end']))
+
+
+def _cue_text(text: str) -> str:
+    # 字幕正文不能包含空行，也不能出现 "-->"
+    lines = [line.strip() for line in text.replace('-->', '->').splitlines()]
+    return '\n'.join(line for line in lines if line)
+
+
+def _escape_vtt(text: str) -> str:
+    return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def _cue_times(segment: dict):
+    start = float(segment['start'])
+    end = max(float(segment['end']), start + MIN_CUE_DURATION)
+    return start, end
+
+
+def to_webvtt(segments: List[dict], include_speaker: bool = True) -> str:
+    """
+    生成WebVTT字幕
+
+    Args:
+        segments: 转录片段列表
+        include_speaker: 是否用 <v 说话人> 标注说话人（合并字幕时使用）
+    """
+    blocks = ["WEBVTT"]
+    for index, segment in enumerate(_sorted_segments(segments)):
+        text = _cue_text(segment['text'])
+        if not text:
+            continue
+        start, end = _cue_times(segment)
+        text = _escape_vtt(text)
+        if include_speaker and segment.get('speaker'):
+            text = f"<v {_escape_vtt(segment['speaker'])}>{text}"
+        blocks.append(f"{index}\n{format_timestamp(start)} --> {format_timestamp(end)}\n{text}")
+    return "\n\n".join(blocks) + "\n"
+
+
+def to_srt(segments: List[dict], include_speaker: bool = True) -> str:
+    """
+    生成SRT字幕
+
+    Args:
+        segments: 转录片段列表
+        include_speaker: 是否在正文前加上 "[说话人] "（合并字幕时使用）
+    """
+    blocks = []
+    for segment in _sorted_segments(segments):
+        text = _cue_text(segment['text'])
+        if not text:
+            continue
+        start, end = _cue_times(segment)
+        if include_speaker and segment.get('speaker'):
+            text = f"[{segment['speaker']}] {text}"
+        blocks.append(
+            f"{len(blocks) + 1}\n"
+            f"{format_timestamp(start, ',')} --> {format_timestamp(end, ',')}\n"
+            f"{text}"
+        )
+    return "\n\n".join(blocks) + ("\n" if blocks else "")
+
+
+def caption_paths(json_path, formats=CAPTION_FORMATS) -> List[Path]:
+    """转录JSON旁边同名的字幕文件路径"""
+    return [Path(json_path).with_suffix(f".{fmt}") for fmt in formats]
+
+
+def write_caption_files(segments: List[dict], json_path, include_speaker: bool = True,
+                        formats=CAPTION_FORMATS) -> List[Path]:
+    """
+    在转录JSON旁边写出同名的 .vtt / .srt 字幕文件
+
+    Args:
+        segments: 转录片段列表
+        json_path: 对应的转录JSON路径（只用来确定输出文件名）
+        include_speaker: 是否标注说话人
+        formats: 要生成的格式
+
+    Returns:
+        list: 写出的文件路径
+    """
+    writers = {"vtt": to_webvtt, "srt": to_srt}
+    written = []
+    for fmt, caption_path in zip(formats, caption_paths(json_path, formats)):
+        with open(caption_path, 'w', encoding='utf-8') as f:
+            f.write(writers[fmt](segments, include_speaker=include_speaker))
+        written.append(caption_path)
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="把转录JSON转换为WebVTT/SRT字幕")
+    parser.add_argument('files', nargs='+', help='转录JSON文件路径')
+    parser.add_argument('--formats', nargs='+', choices=CAPTION_FORMATS, default=list(CAPTION_FORMATS),
+                        help='要生成的字幕格式 (默认: vtt srt)')
+    parser.add_argument('--no-speaker', action='store_true', help='不标注说话人')
+    args = parser.parse_args()
+
+    for file_path in args.files:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            segments = json.load(f)
+        for caption_path in write_caption_files(segments, file_path, not args.no_speaker, args.formats):
+            print(f"📄 {caption_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会议说话统计
+为每个会议计算每个说话人的说话时长（区间并集，同一说话人重叠的片段不会重复计算）、
+发言轮次、每分钟词数，以及两人同时说话的时长和静音比例；
+再按老师和按月份累加成汇总，保存在 recordings/.stats.json。
+
+汇总是增量维护的：转录文件按 mtime/size 判断是否变化，变化的会议先从汇总中减去旧值
+再加上新值，不需要重新读取所有转录文件。看板和 /api/stats 直接读取这个文件。
+
+用法:
+  python3 src/talk_stats.py update
+  python3 src/talk_stats.py show --teacher SamT
+  python3 src/talk_stats.py show --month 2025-03
+  python3 src/talk_stats.py meeting recordings/xxx/xxx_transcription.json
+
+作者: VideoMeetingTranscript
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from audio_io import AUDIO_SUFFIXES, audio_duration as read_duration
+from transcript_search import default_recordings_dir, find_transcripts, parse_meeting_folder
+
+STATS_FILE_NAME = ".stats.json"
+STATS_VERSION = 1
+
+# 汇总中可以直接相加的字段
+_ROLLUP_FIELDS = ("meetings", "duration", "speech_seconds", "overlap_seconds", "silence_seconds")
+_SPEAKER_FIELDS = ("talk_seconds", "turns", "segments", "words")
+
+
+def merge_intervals(intervals: List[Tuple[float, float]]) -> List[Tuple[float, float]]:
+    """合并重叠的时间区间"""
+    merged = []
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def union_seconds(intervals: List[Tuple[float, float]]) -> float:
+    return sum(end - start for start, end in merge_intervals(intervals))
+
+
+def intersection_seconds(a: List[Tuple[float, float]], b: List[Tuple[float, float]]) -> float:
+    """两组已合并区间的交集时长（双指针）"""
+    total = 0.0
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start = max(a[i][0], b[j][0])
+        end = min(a[i][1], b[j][1])
+        if end > start:
+            total += end - start
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return total
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def meeting_stats(segments: List[dict], duration: Optional[float] = None) -> dict:
+    """
+    计算一个会议的说话统计
+
+    Args:
+        segments: 合并后的转录片段（包含 speaker/start/end/text）
+        duration: 录音时长（秒）；为None时使用最后一个片段的结束时间
+
+    Returns:
+        dict: duration, speech_seconds, overlap_seconds, silence_seconds, silence_ratio,
+              turns, speakers: {说话人: {talk_seconds, turns, segments, words, wpm, share}}
+    """
+    ordered = sorted(segments, key=lambda s: (s['start'], s['end']))
+    if duration is None:
+        duration = max((s['end'] for s in ordered), default=0.0)
+
+    intervals = {}
+    speakers = {}
+    previous = None
+    for seg in ordered:
+        speaker = seg.get('speaker') or "未知"
+        s = speakers.setdefault(speaker, {"talk_seconds": 0.0, "turns": 0, "segments": 0, "words": 0})
+        s["segments"] += 1
+        s["words"] += count_words(seg.get('text', ''))
+        # 说话人切换才算新的一轮发言
+        if speaker != previous:
+            s["turns"] += 1
+            previous = speaker
+        intervals.setdefault(speaker, []).append((float(seg['start']), float(seg['end'])))
+
+    merged = {speaker: merge_intervals(values) for speaker, values in intervals.items()}
+    speech = union_seconds([interval for values in merged.values() for interval in values])
+    overlap = 0.0
+    names = list(merged)
+    for i, a in enumerate(names):
+        for b in names[i + 1:]:
+            overlap += intersection_seconds(merged[a], merged[b])
+
+    for speaker, s in speakers.items():
+        s["talk_seconds"] = round(sum(end - start for start, end in merged[speaker]), 3)
+    silence = max(0.0, duration - speech)
+    stats = {
+        "duration": round(duration, 3),
+        "speech_seconds": round(speech, 3),
+        "overlap_seconds": round(overlap, 3),
+        "silence_seconds": round(silence, 3),
+        "turns": sum(s["turns"] for s in speakers.values()),
+        "speakers": speakers,
+    }
+    return with_ratios(stats)
+
+
+def with_ratios(stats: dict) -> dict:
+    """根据累加字段计算比例（单个会议和汇总共用）"""
+    duration = stats.get("duration") or 0.0
+    stats["silence_ratio"] = round(stats["silence_seconds"] / duration, 4) if duration else 0.0
+    talk_total = sum(s["talk_seconds"] for s in stats["speakers"].values())
+    for s in stats["speakers"].values():
+        s["wpm"] = round(s["words"] / (s["talk_seconds"] / 60), 1) if s["talk_seconds"] else 0.0
+        s["share"] = round(s["talk_seconds"] / talk_total, 4) if talk_total else 0.0
+    return stats
+
+
+def audio_duration(transcript_path: Path) -> Optional[float]:
+    """从会议文件夹中提取出的wav/flac音轨读取录音时长（只读文件头）"""
+    for suffix in AUDIO_SUFFIXES:
+        for audio_file in sorted(transcript_path.parent.glob(f"*{suffix}")):
+            duration = read_duration(audio_file)
+            if duration is not None:
+                return duration
+    return None
+
+
+def compute_transcript_stats(transcript_path) -> dict:
+    transcript_path = Path(transcript_path)
+    with open(transcript_path, 'r', encoding='utf-8') as f:
+        segments = json.load(f)
+    return meeting_stats(segments, audio_duration(transcript_path))
+
+
+# ------------------------------------------------------------ 汇总
+
+def empty_rollup() -> dict:
+    rollup = {field: 0 for field in _ROLLUP_FIELDS}
+    rollup["turns"] = 0
+    rollup["speakers"] = {}
+    return rollup
+
+
+def apply_to_rollup(rollup: dict, stats: dict, sign: int = 1) -> None:
+    """把一个会议的统计加到（sign=-1时减出）汇总中"""
+    rollup["meetings"] += sign
+    for field in ("duration", "speech_seconds", "overlap_seconds", "silence_seconds"):
+        rollup[field] = round(rollup[field] + sign * stats[field], 3)
+    rollup["turns"] += sign * stats["turns"]
+    for speaker, values in stats["speakers"].items():
+        target = rollup["speakers"].setdefault(speaker, {field: 0 for field in _SPEAKER_FIELDS})
+        for field in _SPEAKER_FIELDS:
+            target[field] = round(target[field] + sign * values[field], 3)
+    for speaker in [name for name, values in rollup["speakers"].items() if values["segments"] <= 0]:
+        del rollup["speakers"][speaker]
+    with_ratios(rollup)
+
+
+def transcript_signature(transcript_path: Path) -> list:
+    stat = transcript_path.stat()
+    return [transcript_path.name, stat.st_mtime_ns, stat.st_size]
+
+
+def meeting_month(meeting_id: str) -> str:
+    _, date_str = parse_meeting_folder(meeting_id)
+    return date_str[:7] if date_str else "未知"
+
+
+def empty_store() -> dict:
+    return {"version": STATS_VERSION, "meetings": {}, "teachers": {}, "months": {}}
+
+
+def load_store(stats_file: Path) -> dict:
+    try:
+        with open(stats_file, 'r', encoding='utf-8') as f:
+            store = json.load(f)
+        if store.get("version") == STATS_VERSION:
+            return store
+    except (OSError, ValueError):
+        pass
+    return empty_store()
+
+
+def save_store(stats_file: Path, store: dict) -> None:
+    tmp_file = stats_file.with_name(stats_file.name + ".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(store, f, ensure_ascii=False, indent=1)
+    tmp_file.replace(stats_file)
+
+
+def _remove_meeting(store: dict, meeting_id: str) -> None:
+    entry = store["meetings"].pop(meeting_id, None)
+    if entry is None:
+        return
+    for group, key in (("teachers", entry["teacher"]), ("months", entry["month"])):
+        rollup = store[group].get(key)
+        if rollup is not None:
+            apply_to_rollup(rollup, entry["stats"], -1)
+            if rollup["meetings"] <= 0:
+                del store[group][key]
+
+
+def _add_meeting(store: dict, meeting_id: str, transcript_path: Path, stats: dict) -> None:
+    teacher, _ = parse_meeting_folder(meeting_id)
+    entry = {
+        "teacher": teacher,
+        "month": meeting_month(meeting_id),
+        "signature": transcript_signature(transcript_path),
+        "stats": stats,
+    }
+    store["meetings"][meeting_id] = entry
+    for group, key in (("teachers", entry["teacher"]), ("months", entry["month"])):
+        apply_to_rollup(store[group].setdefault(key, empty_rollup()), stats)
+
+
+def update_stats(recordings_dir: Optional[Path] = None, stats_file: Optional[Path] = None,
+                 rebuild: bool = False, verbose: bool = True) -> dict:
+    """
+    增量更新统计：只重新计算新增或变化的转录文件，并移除已删除的会议
+
+    Returns:
+        dict: 统计信息 (computed, removed, unchanged)
+    """
+    recordings_dir = Path(recordings_dir or default_recordings_dir())
+    stats_file = Path(stats_file or recordings_dir / STATS_FILE_NAME)
+    store = empty_store() if rebuild else load_store(stats_file)
+    transcripts = find_transcripts(recordings_dir)
+
+    result = {"computed": 0, "removed": 0, "unchanged": 0}
+    for meeting_id, transcript_path in transcripts.items():
+        entry = store["meetings"].get(meeting_id)
+        if entry and entry["signature"] == transcript_signature(transcript_path):
+            result["unchanged"] += 1
+            continue
+        try:
+            stats = compute_transcript_stats(transcript_path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"警告: 无法统计 {transcript_path}: {e}")
+            continue
+        _remove_meeting(store, meeting_id)
+        _add_meeting(store, meeting_id, transcript_path, stats)
+        result["computed"] += 1
+        if verbose:
+            print(f"📊 已统计 {meeting_id}")
+
+    for meeting_id in set(store["meetings"]) - set(transcripts):
+        _remove_meeting(store, meeting_id)
+        result["removed"] += 1
+
+    if result["computed"] or result["removed"] or not stats_file.exists():
+        save_store(stats_file, store)
+    return result
+
+
+def update_meeting_stats(transcript_path, stats_file: Optional[Path] = None) -> dict:
+    """
+    转录文件写入后立即更新这一个会议的统计和汇总（供 whisper_transcribe.py 调用）
+
+    Args:
+        transcript_path: recordings/<会议文件夹>/*_transcription.json
+
+    Returns:
+        dict: 该会议的统计
+    """
+    transcript_path = Path(transcript_path)
+    meeting_id = transcript_path.parent.name
+    stats_file = Path(stats_file or transcript_path.parent.parent / STATS_FILE_NAME)
+    store = load_store(stats_file)
+    stats = compute_transcript_stats(transcript_path)
+    _remove_meeting(store, meeting_id)
+    _add_meeting(store, meeting_id, transcript_path, stats)
+    save_store(stats_file, store)
+    return stats
+
+
+def query_stats(store: dict, teacher: Optional[str] = None, month: Optional[str] = None) -> dict:
+    """从汇总中取数据，不读取任何转录文件"""
+    if teacher and month:
+        # 两个条件同时指定时，只需合并该老师该月的会议统计
+        rollup = empty_rollup()
+        for entry in store["meetings"].values():
+            if entry["teacher"] == teacher and entry["month"] == month:
+                apply_to_rollup(rollup, entry["stats"])
+        return {"teacher": teacher, "month": month, "stats": rollup}
+    if teacher:
+        return {"teacher": teacher, "stats": store["teachers"].get(teacher, empty_rollup())}
+    if month:
+        return {"month": month, "stats": store["months"].get(month, empty_rollup())}
+    return {"teachers": store["teachers"], "months": store["months"]}
+
+
+def format_stats(stats: dict) -> List[str]:
+    lines = [
+        f"   录音时长: {stats['duration'] / 60:.1f} 分钟, 有人说话 {stats['speech_seconds'] / 60:.1f} 分钟, "
+        f"静音 {stats['silence_ratio']:.0%}, 同时说话 {stats['overlap_seconds']:.0f} 秒",
+    ]
+    for speaker, s in sorted(stats["speakers"].items()):
+        lines.append(
+            f"   {speaker}: {s['talk_seconds'] / 60:.1f} 分钟 ({s['share']:.0%}), {s['turns']} 轮, "
+            f"{s['segments']} 片段, {s['wpm']:.0f} 词/分钟"
+        )
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会议说话时长统计")
+    parser.add_argument('--recordings-dir', type=str, help='录制目录 (默认: 项目根目录下的recordings)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    update_parser = subparsers.add_parser('update', help='增量更新统计')
+    update_parser.add_argument('--rebuild', action='store_true', help='清空后重新统计')
+    show_parser = subparsers.add_parser('show', help='查看按老师/月份的汇总')
+    show_parser.add_argument('--teacher', type=str, help='老师名字')
+    show_parser.add_argument('--month', type=str, help='月份 YYYY-MM')
+    show_parser.add_argument('--json', action='store_true', help='以JSON格式输出')
+    meeting_parser = subparsers.add_parser('meeting', help='统计单个转录文件（不写入汇总）')
+    meeting_parser.add_argument('transcript', help='转录JSON文件')
+    args = parser.parse_args()
+
+    recordings_dir = Path(args.recordings_dir) if args.recordings_dir else default_recordings_dir()
+    stats_file = recordings_dir / STATS_FILE_NAME
+
+    if args.command == 'meeting':
+        print(f"📊 {args.transcript}")
+        print("\n".join(format_stats(compute_transcript_stats(args.transcript))))
+        return
+
+    if args.command == 'update':
+        if not recordings_dir.exists():
+            print(f"❌ recordings目录不存在: {recordings_dir}")
+            sys.exit(1)
+        result = update_stats(recordings_dir, stats_file, rebuild=args.rebuild)
+        print(f"✅ 统计更新完成: 新统计 {result['computed']}, 移除 {result['removed']}, 未变化 {result['unchanged']}")
+        return
+
+    result = query_stats(load_store(stats_file), args.teacher, args.month)
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+        return
+    if "stats" in result:
+        title = " ".join(v for v in (result.get("teacher"), result.get("month")) if v)
+        print(f"📊 {title}: {result['stats']['meetings']} 个会议")
+        print("\n".join(format_stats(result["stats"])))
+        return
+    for group, label in (("teachers", "老师"), ("months", "月份")):
+        print(f"\n📊 按{label}:")
+        for key, rollup in sorted(result[group].items()):
+            print(f"  {key}: {rollup['meetings']} 个会议")
+            print("\n".join(format_stats(rollup)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转录结果过滤
+去掉Whisper输出中的幻觉和重复片段：
+  - repeat:      同一说话人在时间窗口内重复出现的相同/几乎相同的片段（循环输出）
+  - crosstalk:   与另一说话人时间重叠、内容几乎相同的片段（串音被转录了两次）；
+                 保留原声那一份：有音轨时比较片段在各自音轨上的能量（串音副本低很多），
+                 否则比较片段的 avg_logprob，两者都没有时才保留先出现的
+  - compression: 文本压缩率异常高的片段（片段内部在循环，例如 "I I I I I ..."）
+  - filler:      只有 "yeah"/"um" 等语气词的片段（可选，默认保留）
+
+文本相似度用词级n-gram的滚动哈希指纹（Rabin-Karp）计算Jaccard系数，
+只和滑动时间窗口内已保留的片段比较。
+
+用法:
+  python3 src/transcript_filter.py recordings/xxx/xxx_transcription.json
+  python3 src/transcript_filter.py a.json --output a_filtered.json --drop-fillers
+
+作者: VideoMeetingTranscript
+"""
+
+import re
+import json
+import zlib
+import argparse
+from collections import deque, Counter
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+DEFAULT_WINDOW = 30.0              # 重复检测的时间窗口（秒）
+DEFAULT_SIMILARITY = 0.8           # Jaccard相似度阈值
+DEFAULT_MAX_COMPRESSION = 2.4      # 与Whisper的compression_ratio_threshold相同
+SHINGLE_SIZE = 3                   # 指纹使用的词级n-gram长度
+MAX_SHORT_REPEATS = 2              # 短片段（不足一个n-gram）在窗口内允许重复的次数
+CROSSTALK_TOLERANCE = 1.0          # 判断两个说话人片段"同时"的时间容差（秒）
+FILLER_WORDS = {"yeah", "um", "uh", "ah", "mm", "hmm", "oh", "ok", "okay"}
+
+_HASH_BASE = 1000003
+_HASH_MOD = (1 << 61) - 1
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_words(text: str) -> List[str]:
+    """小写并去掉标点，返回词列表"""
+    return _WORD_PATTERN.findall(text.lower())
+
+
+def fingerprint(words: List[str], k: int = SHINGLE_SIZE) -> frozenset:
+    """
+    词级k-gram的滚动哈希集合
+
+    每个词先映射为crc32，再用多项式滚动哈希在词序列上滑动，
+    每前进一个词只需O(1)更新
+    """
+    if len(words) < k:
+        return frozenset()
+    ids = [zlib.crc32(word.encode('utf-8')) + 1 for word in words]
+    high = pow(_HASH_BASE, k - 1, _HASH_MOD)
+    h = 0
+    for token in ids[:k]:
+        h = (h * _HASH_BASE + token) % _HASH_MOD
+    hashes = {h}
+    for i in range(k, len(ids)):
+        h = ((h - ids[i - k] * high) * _HASH_BASE + ids[i]) % _HASH_MOD
+        hashes.add(h)
+    return frozenset(hashes)
+
+
+def jaccard(a: frozenset, b: frozenset) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def compression_ratio(text: str) -> float:
+    """文本长度与zlib压缩后长度之比，循环输出的文本压缩率很高"""
+    data = text.encode('utf-8')
+    if not data:
+        return 0.0
+    return len(data) / len(zlib.compress(data))
+
+
+def segment_confidence(segment: dict) -> Optional[float]:
+    """没有音轨时判断串音副本的依据：后端给出的平均对数概率"""
+    return segment.get('avg_logprob')
+
+
+def _prefer(segment: dict, other: dict, score: Callable[[dict], Optional[float]]) -> bool:
+    """segment 是否比已保留的 other 更可能是原声"""
+    a = score(segment)
+    if a is None:
+        return False
+    b = score(other)
+    return b is not None and a > b
+
+
+class _Entry:
+    __slots__ = ("segment", "words", "key", "prints")
+
+    def __init__(self, segment: dict, words: List[str]):
+        self.segment = segment
+        self.words = words
+        self.key = " ".join(words)
+        self.prints = fingerprint(words)
+
+    def similar(self, other: "_Entry", threshold: float) -> bool:
+        if self.prints and other.prints:
+            return jaccard(self.prints, other.prints) >= threshold
+        return self.key == other.key
+
+
+def filter_transcriptions(transcriptions: List[dict], window: float = DEFAULT_WINDOW,
+                          similarity: float = DEFAULT_SIMILARITY,
+                          max_compression: float = DEFAULT_MAX_COMPRESSION,
+                          cross_speaker: bool = True,
+                          drop_fillers: bool = False,
+                          score: Callable[[dict], Optional[float]] = segment_confidence) -> Tuple[List[dict], dict]:
+    """
+    过滤转录片段
+
+    Args:
+        transcriptions: 转录片段（可以包含多个说话人）
+        window: 重复检测的时间窗口（秒）
+        similarity: 判定为重复的Jaccard相似度
+        max_compression: 超过该压缩率的片段视为循环输出
+        cross_speaker: 是否去掉与另一说话人同时出现的重复片段
+        drop_fillers: 是否去掉只有语气词的片段
+        score: 跨说话人重复时给两个片段打分，保留分数高的（默认: avg_logprob；filter_dual 有音轨时用能量）
+
+    Returns:
+        (保留的片段（按时间排序）, 统计信息)
+    """
+    ordered = sorted(transcriptions, key=lambda s: (s['start'], s['end']))
+    recent = deque()             # 窗口内已保留的片段
+    kept = []
+    removed = set()              # 被后来的原声片段替换掉的串音副本（id）
+    dropped = Counter()
+    fillers = 0
+
+    for segment in ordered:
+        words = normalize_words(segment.get('text', ''))
+        if not words:
+            dropped["empty"] += 1
+            continue
+
+        if all(word in FILLER_WORDS for word in words):
+            fillers += 1
+            if drop_fillers:
+                dropped["filler"] += 1
+                continue
+
+        if len(words) >= SHINGLE_SIZE and compression_ratio(" ".join(words)) > max_compression:
+            dropped["compression"] += 1
+            continue
+
+        while recent and recent[0].segment['end'] < segment['start'] - window:
+            recent.popleft()
+
+        entry = _Entry(segment, words)
+        speaker = segment.get('speaker')
+        reason = None
+        replaced = None
+        short_repeats = 0
+        for other in recent:
+            if not entry.similar(other, similarity):
+                continue
+            if other.segment.get('speaker') == speaker:
+                if entry.prints:
+                    reason = "repeat"
+                    break
+                short_repeats += 1
+                if short_repeats >= MAX_SHORT_REPEATS:
+                    reason = "repeat"
+                    break
+            elif cross_speaker and entry.prints and (
+                    segment['start'] <= other.segment['end'] + CROSSTALK_TOLERANCE
+                    and other.segment['start'] <= segment['end'] + CROSSTALK_TOLERANCE):
+                if _prefer(segment, other.segment, score):
+                    replaced = other
+                else:
+                    reason = "crosstalk"
+                break
+        if reason:
+            dropped[reason] += 1
+            continue
+        if replaced is not None:
+            dropped["crosstalk"] += 1
+            recent.remove(replaced)
+            removed.add(id(replaced.segment))
+
+        recent.append(entry)
+        kept.append(segment)
+
+    if removed:
+        kept = [s for s in kept if id(s) not in removed]
+
+    stats = {
+        "input": len(ordered),
+        "kept": len(kept),
+        "dropped": dict(dropped),
+        "fillers": fillers,
+        "input_chars": sum(len(s.get('text', '')) for s in ordered),
+        "kept_chars": sum(len(s.get('text', '')) for s in kept),
+    }
+    return kept, stats
+
+
+def filter_dual(self_transcriptions: List[dict], other_transcriptions: List[dict],
+                audio_files: Optional[Dict[str, object]] = None, **options):
+    """
+    同时过滤两个说话人的结果（跨说话人去重需要一起处理）
+
+    Args:
+        audio_files: {说话人: 音轨文件}，指定时跨说话人重复的片段保留自己音轨上能量更高的那一份
+
+    Returns:
+        (自己的片段, 对方的片段, 统计信息)
+    """
+    segments = self_transcriptions + other_transcriptions
+    if audio_files:
+        from crosstalk import TrackLevels
+        with TrackLevels(audio_files) as levels:
+            kept, stats = filter_transcriptions(segments, score=levels, **options)
+    else:
+        kept, stats = filter_transcriptions(segments, **options)
+    self_speaker = self_transcriptions[0]['speaker'] if self_transcriptions else "自己"
+    self_kept = [s for s in kept if s.get('speaker') == self_speaker]
+    other_kept = [s for s in kept if s.get('speaker') != self_speaker]
+    return self_kept, other_kept, stats
+
+
+def find_track_files(transcript_file) -> Optional[Dict[str, Path]]:
+    """合并转录 <base>_transcription.json 旁边的 <base>_自己 / <base>_对方 音轨，找不到时返回None"""
+    from audio_io import SPEAKERS, track_file
+    path = Path(transcript_file)
+    base_name = path.stem[:-len("_transcription")] if path.stem.endswith("_transcription") else path.stem
+    files = {speaker: track_file(path.parent, base_name, speaker) for speaker in SPEAKERS}
+    return files if all(files.values()) else None
+
+
+def format_stats(stats: dict) -> str:
+    removed = stats["input"] - stats["kept"]
+    details = ", ".join(f"{reason} {count}" for reason, count in sorted(stats["dropped"].items())) or "无"
+    return (f"保留 {stats['kept']}/{stats['input']} 个片段 (去掉 {removed}: {details}), "
+            f"文本 {stats['input_chars']} -> {stats['kept_chars']} 字符, 语气词片段 {stats['fillers']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="去掉转录结果中的重复和幻觉片段")
+    parser.add_argument('file', help='转录JSON文件')
+    parser.add_argument('--output', type=str, help='输出文件 (默认: 覆盖原文件)')
+    parser.add_argument('--window', type=float, default=DEFAULT_WINDOW, help=f'重复检测窗口秒数 (默认: {DEFAULT_WINDOW})')
+    parser.add_argument('--similarity', type=float, default=DEFAULT_SIMILARITY,
+                        help=f'重复判定的相似度阈值 (默认: {DEFAULT_SIMILARITY})')
+    parser.add_argument('--drop-fillers', action='store_true', help='去掉只有语气词的片段')
+    parser.add_argument('--dry-run', action='store_true', help='只输出统计，不写文件')
+    args = parser.parse_args()
+
+    with open(args.file, 'r', encoding='utf-8') as f:
+        transcriptions = json.load(f)
+    options = dict(window=args.window, similarity=args.similarity, drop_fillers=args.drop_fillers)
+    audio_files = find_track_files(args.file)
+    if audio_files:
+        # 旁边有两条音轨时，串音按能量决定保留哪个说话人的片段
+        from crosstalk import TrackLevels
+        print(f"🔊 串音按音轨能量判断: {', '.join(Path(p).name for p in audio_files.values())}")
+        with TrackLevels(audio_files) as levels:
+            kept, stats = filter_transcriptions(transcriptions, score=levels, **options)
+    else:
+        kept, stats = filter_transcriptions(transcriptions, **options)
+    print(f"🧹 {format_stats(stats)}")
+    if args.dry_run:
+        return
+    output = args.output or args.file
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(kept, f, ensure_ascii=False, indent=2)
+    print(f"📄 {output}")
+
+
+if __name__ == '__main__':
+    main()
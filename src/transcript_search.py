@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会议转录全文检索
+使用SQLite FTS5为 recordings/ 下所有 *_transcription.json 建立倒排索引，
+按文件 mtime/size 增量更新，查询结果带会议、说话人和起止时间，
+并给出可以直接跳转到播放器对应时间点的链接。
+
+索引使用 trigram 分词（SQLite 3.34+）：unicode61 不切分中文，一整段中文会成为一个词，
+搜中文子串永远找不到；trigram 按任意3个字符建索引，中英文都按子串匹配。代价：
+  - 索引大约是按词分词的三倍
+  - 英文也按子串匹配（"present" 也会命中 "presentation"），不再需要 * 前缀语法
+  - 少于3个字符的检索词（例如两个字的中文词）不能使用索引，改为在片段文本上逐行 LIKE 过滤；
+    检索词全都很短时会扫描全部片段，结果按日期而不是相关度排序
+旧的 unicode61 索引在第一次打开时自动重建。
+
+用法:
+  python3 src/transcript_search.py index
+  python3 src/transcript_search.py search "present perfect"
+  python3 src/transcript_search.py search "homework" --teacher SamT --speaker 对方
+
+作者: VideoMeetingTranscript
+"""
+
+import re
+import sys
+import json
+import sqlite3
+import argparse
+from pathlib import Path
+from typing import List, Optional, Tuple
+from urllib.parse import urlencode
+
+SEARCH_DB_NAME = ".search.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meetings (
+    id TEXT PRIMARY KEY,
+    teacher TEXT,
+    date TEXT,
+    transcript_path TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS segments (
+    id INTEGER PRIMARY KEY,
+    meeting_id TEXT NOT NULL,
+    speaker TEXT,
+    start_time REAL NOT NULL,
+    end_time REAL NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS segments_meeting ON segments(meeting_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+    text,
+    content='segments',
+    content_rowid='id',
+    tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS segments_ai AFTER INSERT ON segments BEGIN
+    INSERT INTO segments_fts(rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS segments_ad AFTER DELETE ON segments BEGIN
+    INSERT INTO segments_fts(segments_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+"""
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+# trigram索引能检索的最短子串
+MIN_INDEXED_CHARS = 3
+SNIPPET_CONTEXT = 40
+
+
+def default_recordings_dir() -> Path:
+    return Path(__file__).parent.parent / "recordings"
+
+
+def connect(db_path) -> sqlite3.Connection:
+    """打开（必要时创建）检索数据库"""
+    conn = sqlite3.connect(str(db_path), timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    row = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'segments_fts'").fetchone()
+    rebuild = row is not None and "trigram" not in row[0]
+    if rebuild:
+        # 旧版本的unicode61索引：换成trigram后从segments表重建
+        with conn:
+            conn.execute("DROP TABLE segments_fts")
+    conn.executescript(SCHEMA)
+    if rebuild:
+        with conn:
+            conn.execute("INSERT INTO segments_fts(segments_fts) VALUES ('rebuild')")
+    return conn
+
+
+def parse_meeting_folder(folder_name: str):
+    """从文件夹名 Name_YYYY-MM-DD HH-MM-SS 中解析老师和日期"""
+    if '_' in folder_name:
+        teacher, date_str = folder_name.rsplit('_', 1)
+        return teacher, date_str
+    return folder_name, None
+
+
+def index_transcript(conn: sqlite3.Connection, meeting_id: str, transcript_path: Path) -> int:
+    """
+    (重新)索引一个会议的转录文件
+
+    Returns:
+        int: 写入的片段数
+    """
+    stat = transcript_path.stat()
+    with open(transcript_path, 'r', encoding='utf-8') as f:
+        segments = json.load(f)
+
+    teacher, date_str = parse_meeting_folder(meeting_id)
+    with conn:
+        conn.execute("DELETE FROM segments WHERE meeting_id = ?", (meeting_id,))
+        conn.executemany(
+            "INSERT INTO segments (meeting_id, speaker, start_time, end_time, text) VALUES (?, ?, ?, ?, ?)",
+            [
+                (meeting_id, seg.get('speaker'), float(seg['start']), float(seg['end']), seg['text'])
+                for seg in segments if seg.get('text')
+            ]
+        )
+        conn.execute(
+            "INSERT OR REPLACE INTO meetings (id, teacher, date, transcript_path, mtime_ns, size) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (meeting_id, teacher, date_str, str(transcript_path), stat.st_mtime_ns, stat.st_size)
+        )
+    return len(segments)
+
+
+def remove_meeting(conn: sqlite3.Connection, meeting_id: str) -> None:
+    with conn:
+        conn.execute("DELETE FROM segments WHERE meeting_id = ?", (meeting_id,))
+        conn.execute("DELETE FROM meetings WHERE id = ?", (meeting_id,))
+
+
+def find_transcripts(recordings_dir: Path) -> dict:
+    """返回 会议文件夹名 -> 合并转录文件路径"""
+    transcripts = {}
+    for folder in recordings_dir.iterdir():
+        if not folder.is_dir() or folder.name.startswith('.'):
+            continue
+        candidates = sorted(folder.glob('*_transcription.json'))
+        if candidates:
+            transcripts[folder.name] = candidates[0]
+    return transcripts
+
+
+def update_index(recordings_dir: Optional[Path] = None, db_path: Optional[Path] = None,
+                 rebuild: bool = False, verbose: bool = True) -> dict:
+    """
+    增量更新检索索引：只重新索引新增或变化的转录文件，并移除已删除的会议
+
+    Returns:
+        dict: 统计信息 (indexed, removed, unchanged)
+    """
+    recordings_dir = Path(recordings_dir or default_recordings_dir())
+    db_path = Path(db_path or recordings_dir / SEARCH_DB_NAME)
+    conn = connect(db_path)
+    try:
+        if rebuild:
+            with conn:
+                conn.execute("DELETE FROM segments")
+                conn.execute("DELETE FROM meetings")
+
+        known = {
+            row[0]: (row[1], row[2], row[3])
+            for row in conn.execute("SELECT id, transcript_path, mtime_ns, size FROM meetings")
+        }
+        transcripts = find_transcripts(recordings_dir)
+
+        stats = {"indexed": 0, "removed": 0, "unchanged": 0}
+        for meeting_id, transcript_path in transcripts.items():
+            stat = transcript_path.stat()
+            if known.get(meeting_id) == (str(transcript_path), stat.st_mtime_ns, stat.st_size):
+                stats["unchanged"] += 1
+                continue
+            try:
+                count = index_transcript(conn, meeting_id, transcript_path)
+                stats["indexed"] += 1
+                if verbose:
+                    print(f"📚 已索引 {meeting_id}: {count} 个片段")
+            except (OSError, ValueError, KeyError) as e:
+                print(f"警告: 无法索引 {transcript_path}: {e}")
+
+        for meeting_id in set(known) - set(transcripts):
+            remove_meeting(conn, meeting_id)
+            stats["removed"] += 1
+
+        if stats["indexed"] or stats["removed"]:
+            with conn:
+                conn.execute("INSERT INTO segments_fts(segments_fts) VALUES ('optimize')")
+        return stats
+    finally:
+        conn.close()
+
+
+def index_transcript_file(transcript_path, db_path: Optional[Path] = None) -> int:
+    """
+    转录文件写入后立即更新索引（供 whisper_transcribe.py 调用）
+
+    Args:
+        transcript_path: recordings/<会议文件夹>/*_transcription.json
+    """
+    transcript_path = Path(transcript_path)
+    meeting_folder = transcript_path.parent
+    db_path = Path(db_path or meeting_folder.parent / SEARCH_DB_NAME)
+    conn = connect(db_path)
+    try:
+        return index_transcript(conn, meeting_folder.name, transcript_path)
+    finally:
+        conn.close()
+
+
+def build_match_query(query: str) -> Tuple[str, List[str]]:
+    """
+    把用户输入转换成安全的FTS5查询：每个词加引号（全部命中，按子串匹配）
+
+    Returns:
+        (FTS5查询, 少于 MIN_INDEXED_CHARS 个字符、需要用LIKE过滤的词)
+    """
+    terms = []
+    short = []
+    for token in TOKEN_PATTERN.findall(query):
+        if len(token) >= MIN_INDEXED_CHARS:
+            terms.append(f'"{token}"')
+        else:
+            short.append(token)
+    return ' '.join(terms), short
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+def _like_snippet(text: str, terms: List[str]) -> str:
+    """没有FTS匹配时的摘要：截取第一个命中附近的文本，命中的词用 [] 标出"""
+    lower = text.lower()
+    first = min((i for i in (lower.find(t.lower()) for t in terms) if i >= 0), default=0)
+    start = max(0, first - SNIPPET_CONTEXT)
+    end = min(len(text), first + SNIPPET_CONTEXT)
+    part = text[start:end]
+    pattern = re.compile("|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)), re.IGNORECASE)
+    part = pattern.sub(lambda m: f"[{m.group(0)}]", part)
+    return ("…" if start > 0 else "") + part + ("…" if end < len(text) else "")
+
+
+def player_link(meeting_id: str, start: float) -> str:
+    """播放器深链接，打开会议并跳转到指定时间"""
+    return "player.html?" + urlencode({"folder": meeting_id, "t": f"{start:.2f}"})
+
+
+def search(query: str, db_path: Optional[Path] = None, limit: int = 20, offset: int = 0,
+           teacher: Optional[str] = None, speaker: Optional[str] = None,
+           raw: bool = False) -> List[dict]:
+    """
+    全文检索
+
+    Args:
+        query: 检索词
+        db_path: 检索数据库路径
+        limit / offset: 分页
+        teacher: 只返回该老师的会议
+        speaker: 只返回该说话人的片段 ("自己" 或 "对方")
+        raw: 为True时直接把query作为FTS5查询语法使用
+
+    Returns:
+        list: 按相关度排序的命中，每项包含 meeting_id, teacher, date, speaker, start, end,
+              text, snippet, score, link
+    """
+    db_path = Path(db_path or default_recordings_dir() / SEARCH_DB_NAME)
+    match, short = (query, []) if raw else build_match_query(query)
+    if not match and not short:
+        return []
+
+    if match:
+        sql = [
+            "SELECT s.meeting_id, m.teacher, m.date, s.speaker, s.start_time, s.end_time, s.text,",
+            "       snippet(segments_fts, 0, '[', ']', '…', 48), bm25(segments_fts)",
+            "FROM segments_fts",
+            "JOIN segments s ON s.id = segments_fts.rowid",
+            "JOIN meetings m ON m.id = s.meeting_id",
+            "WHERE segments_fts MATCH ?",
+        ]
+        params = [match]
+    else:
+        # 只有短检索词：不能使用trigram索引，逐行过滤
+        sql = [
+            "SELECT s.meeting_id, m.teacher, m.date, s.speaker, s.start_time, s.end_time, s.text, NULL, 0.0",
+            "FROM segments s",
+            "JOIN meetings m ON m.id = s.meeting_id",
+            "WHERE 1",
+        ]
+        params = []
+    for term in short:
+        sql.append("AND s.text LIKE ? ESCAPE '\\'")
+        params.append(_like_pattern(term))
+    if teacher:
+        sql.append("AND m.teacher = ?")
+        params.append(teacher)
+    if speaker:
+        sql.append("AND s.speaker = ?")
+        params.append(speaker)
+    sql.append("ORDER BY bm25(segments_fts) LIMIT ? OFFSET ?" if match else
+               "ORDER BY m.date DESC, s.start_time LIMIT ? OFFSET ?")
+    params.extend([limit, offset])
+
+    conn = connect(db_path)
+    try:
+        rows = conn.execute("\n".join(sql), params).fetchall()
+    except sqlite3.OperationalError as e:
+        raise ValueError(f"无效的检索语句 {match!r}: {e}") from e
+    finally:
+        conn.close()
+
+    return [
+        {
+            "meeting_id": meeting_id,
+            "teacher": teacher_name,
+            "date": date_str,
+            "speaker": speaker_name,
+            "start": start,
+            "end": end,
+            "text": text,
+            "snippet": snippet if snippet is not None else _like_snippet(text, short),
+            "score": -score,
+            "link": player_link(meeting_id, start),
+        }
+        for meeting_id, teacher_name, date_str, speaker_name, start, end, text, snippet, score in rows
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会议转录全文检索")
+    parser.add_argument('--recordings-dir', type=str, help='录制目录 (默认: 项目根目录下的recordings)')
+    parser.add_argument('--db', type=str, help='检索数据库路径 (默认: recordings/.search.db)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    index_parser = subparsers.add_parser('index', help='增量更新检索索引')
+    index_parser.add_argument('--rebuild', action='store_true', help='清空后重建索引')
+
+    search_parser = subparsers.add_parser('search', help='检索转录内容')
+    search_parser.add_argument('query', help='检索词（按子串匹配，中英文均可）')
+    search_parser.add_argument('--limit', type=int, default=20, help='返回条数 (默认: 20)')
+    search_parser.add_argument('--teacher', type=str, help='只检索该老师的会议')
+    search_parser.add_argument('--speaker', type=str, help='只检索该说话人 (自己/对方)')
+    search_parser.add_argument('--raw', action='store_true', help='直接使用FTS5查询语法')
+    search_parser.add_argument('--json', action='store_true', help='以JSON格式输出')
+
+    args = parser.parse_args()
+    recordings_dir = Path(args.recordings_dir) if args.recordings_dir else default_recordings_dir()
+    db_path = Path(args.db) if args.db else recordings_dir / SEARCH_DB_NAME
+
+    if args.command == 'index':
+        if not recordings_dir.exists():
+            print(f"❌ recordings目录不存在: {recordings_dir}")
+            sys.exit(1)
+        stats = update_index(recordings_dir, db_path, rebuild=args.rebuild)
+        print(f"✅ 索引更新完成: 新索引 {stats['indexed']}, 移除 {stats['removed']}, 未变化 {stats['unchanged']}")
+        return
+
+    try:
+        hits = search(args.query, db_path, limit=args.limit, teacher=args.teacher,
+                      speaker=args.speaker, raw=args.raw)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    if args.json:
+        print(json.dumps(hits, ensure_ascii=False, indent=2))
+        return
+    if not hits:
+        print("🔍 没有找到匹配的片段")
+        return
+    for i, hit in enumerate(hits, 1):
+        print(f"{i:2d}. {hit['meeting_id']} [{hit['start']:.1f}s-{hit['end']:.1f}s] {hit['speaker']}: {hit['snippet']}")
+        print(f"    🔗 web/{hit['link']}")
+
+
+if __name__ == '__main__':
+    main()
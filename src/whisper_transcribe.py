@@ -1,7 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-使用OpenAI Whisper进行语音识别并生成结构化JSON文件
+语音识别并生成结构化JSON文件
+识别引擎由 asr_backends 提供（openai-whisper / faster-whisper / fake），
+通过 config/config.yaml 的 transcription.backend 或 --backend 参数选择。
+模型只从本地模型库加载，转录时不联网（见 model_store.py）。
 """
 
 import os
@@ -9,16 +12,19 @@ import sys
 import json
 import argparse
 from pathlib import Path
-import ssl
-import urllib.request
 import time
 from datetime import datetime
-from concurrent.futures import ProcessPoolExecutor
 
-# 绕过SSL证书验证
-ssl._create_default_https_context = ssl._create_unverified_context
+from asr_backends import BACKENDS, DECODING_MODES, SAMPLE_RATE, get_backend
+from cascade import CascadeBackend, get_cascade_backend
+from cpu_scheduler import apply_worker_settings, describe_settings, effective_settings, plan_workers
+from quantize import QUANTIZE_MODES
+from stage_metrics import stage
+from subtitle_export import caption_paths, write_caption_files
+from transcript_filter import filter_transcriptions, filter_dual, format_stats as format_filter_stats
 
-import whisper
+FILLER_WORDS = ("yeah", "um", "uh", "ah", "mm", "hmm")
+DEFAULT_VAD_THRESHOLD = 0.01
 
 
 def format_time(seconds):
@@ -33,14 +39,18 @@ def format_time(seconds):
         return f"{hours:.1f}小时"
 
 
-def transcribe_audio(audio_file, speaker_name, model):
+def transcribe_audio(audio_file, speaker_name, backend, vad=False, vad_threshold=DEFAULT_VAD_THRESHOLD,
+                     exclude_regions=None):
     """
-    使用Whisper转录音频文件
+    转录音频文件
     
     Args:
         audio_file: 音频文件路径
         speaker_name: 说话人名称 ("自己" 或 "对方")
-        model: Whisper模型
+        backend: 识别后端 (asr_backends.ASRBackend)
+        vad: 为True时先做能量VAD，只把语音区域送给识别后端
+        vad_threshold: VAD的静音RMS阈值
+        exclude_regions: 需要跳过的 (开始, 结束) 区域，例如另一条音轨的串音（会自动启用VAD）
     
     Returns:
         list: 转录结果列表，每个元素包含start, end, text, speaker
@@ -51,33 +61,57 @@ def transcribe_audio(audio_file, speaker_name, model):
     file_size = os.path.getsize(audio_file) / (1024 * 1024)  # MB
     print(f"📊 音频文件大小: {file_size:.1f} MB")
     
-    # 使用Whisper进行转录，包含时间戳
-    print(f"🔄 开始Whisper转录处理...")
+    # 进行转录，包含时间戳
+    print(f"🔄 开始转录处理 ({backend.describe()})...")
     start_time = time.time()
     
     try:
-        # 获取音频时长
-        import librosa
-        audio_duration = librosa.get_duration(path=str(audio_file))
+        # 获取音频时长（wav/flac只读文件头）
+        from audio_io import audio_duration as read_duration
+        audio_duration = read_duration(audio_file)
+        if audio_duration is None:
+            import librosa
+            audio_duration = librosa.get_duration(path=str(audio_file))
         print(f"⏱️ 音频时长: {format_time(audio_duration)}")
         
         # 预处理阶段
         print(f"🔧 开始音频预处理...")
         preprocess_start = time.time()
+        if vad or exclude_regions is not None:
+            with stage("vad", audio_seconds=audio_duration, speaker=speaker_name) as metrics:
+                audio_input, mapping = prepare_speech_audio(audio_file, audio_duration, vad_threshold, exclude_regions)
+                metrics.update(speech_seconds=round(sum(length for _, _, length in mapping), 3))
+        else:
+            audio_input, mapping = audio_file, None
+        print(f"⏱️ 预处理耗时: {format_time(time.time() - preprocess_start)}")
         
         # 执行转录
         print(f"🤖 开始模型推理...")
         inference_start = time.time()
-        result = model.transcribe(
-            str(audio_file),
-            word_timestamps=True,
-            language='en',
-            beam_size=5,
-            temperature=0.4,
-            condition_on_previous_text=False,
-            no_speech_threshold=0.5,
-            logprob_threshold=-2.0
-        )
+        with stage("transcribe", audio_seconds=audio_duration, speaker=speaker_name,
+                   backend=backend.name, model=backend.model_size) as metrics:
+            if isinstance(backend, CascadeBackend):
+                backend.clear_stats()
+            else:
+                backend.decode_stats.clear()
+            if mapping is not None and not mapping:
+                segments = []  # 整条音轨都是静音
+            else:
+                segments = backend.transcribe(audio_input)
+            metrics.update(segments=len(segments))
+            if backend.decoding == "adaptive":
+                metrics.update(beam_seconds=round(backend.decode_stats["beam_seconds"], 3))
+                print(f"🎯 自适应解码: {backend.format_decode_stats()}")
+            if isinstance(backend, CascadeBackend):
+                metrics.update(slow_seconds=round(backend.stats["slow_seconds"], 3),
+                               slow_regions=backend.stats["regions"])
+                print(f"🪜 级联解码: {backend.format_stats(audio_duration)}")
+            settings = effective_settings()
+            metrics.update(threads=settings["threads"], cpus=settings.get("cpus"))
+            print(f"🧵 {describe_settings(settings)}")
+        if mapping:
+            from split_audio import remap_segments
+            segments = remap_segments(segments, mapping)
         
         inference_time = time.time() - inference_start
         processing_time = time.time() - start_time
@@ -85,37 +119,28 @@ def transcribe_audio(audio_file, speaker_name, model):
         print(f"⏱️ 总处理耗时: {format_time(processing_time)}")
         
     except Exception as e:
-        print(f"❌ Whisper转录失败: {e}")
+        print(f"❌ 转录失败: {e}")
         raise e
     
     print(f"📝 开始处理转录结果...")
-    transcriptions = []
     
     # 处理segments（句子级别的时间戳）
-    total_segments = len(result.get('segments', []))
+    total_segments = len(segments)
     meaningful_segments = 0
     print(f"📋 检测到 {total_segments} 个语音段落")
     
     process_start_time = time.time()
     
-    for i, segment in enumerate(result['segments']):
+    for i, segment in enumerate(segments):
         # 每10个段落显示进度
         if i % 10 == 0 and i > 0:
             print(f"📈 处理进度: {i}/{total_segments} ({i/total_segments*100:.1f}%)")
         
-        text = segment['text'].strip()
         # 检查是否有实际内容（不是"Yeah"等无意义内容）
-        if text.lower() not in ["yeah", "um", "uh", "ah", "mm", "hmm"]:
+        if segment['text'].strip().lower() not in FILLER_WORDS:
             meaningful_segments += 1
-        
-        # 过滤掉空的或太短的文本
-        if text and len(text) > 0:
-            transcriptions.append({
-                "start": round(segment['start'], 2),
-                "end": round(segment['end'], 2),
-                "text": text,
-                "speaker": speaker_name
-            })
+    
+    transcriptions = to_transcriptions(segments, speaker_name, backend.segment_fields)
     
     process_time = time.time() - process_start_time
     print(f"✅ {speaker_name} 转录完成，共 {len(transcriptions)} 个片段")
@@ -125,6 +150,58 @@ def transcribe_audio(audio_file, speaker_name, model):
     return transcriptions
 
 
+def prepare_speech_audio(audio_file, audio_duration, vad_threshold=DEFAULT_VAD_THRESHOLD, exclude_regions=None):
+    """
+    VAD预处理：找出语音区域（去掉exclude_regions）并拼接成紧凑音频
+    
+    Returns:
+        tuple: (16kHz紧凑音频, 紧凑时间到原始时间的映射)
+    """
+    from audio_io import load_audio
+    from split_audio import find_speech_regions, compact_speech
+    audio, _ = load_audio(audio_file, sr=SAMPLE_RATE)
+    regions = find_speech_regions(audio, SAMPLE_RATE, silence_threshold=vad_threshold)
+    if exclude_regions:
+        from crosstalk import subtract_regions
+        regions = subtract_regions(regions, exclude_regions)
+    compact, mapping = compact_speech(audio, SAMPLE_RATE, regions)
+    speech_seconds = sum(length for _, _, length in mapping)
+    print(f"🔇 VAD: {len(regions)} 个语音区域, 语音 {format_time(speech_seconds)} "
+          f"({speech_seconds / max(audio_duration, 1e-6) * 100:.0f}%), 跳过 {format_time(audio_duration - speech_seconds)} 静音")
+    return compact, mapping
+
+
+def to_transcriptions(segments, speaker_name, fields=()):
+    """
+    把识别后端返回的片段转换为转录条目（去掉空文本，时间保留两位小数）
+    
+    Args:
+        segments: [{"start", "end", "text"}]
+        speaker_name: 说话人名称
+        fields: 额外保留的片段字段（backend.segment_fields；默认的beam解码不写入，保持转录文件精简）
+    
+    Returns:
+        list: 转录结果列表，每个元素包含start, end, text, speaker，以及fields中后端给出的字段
+    """
+    transcriptions = []
+    for segment in segments:
+        text = segment['text'].strip()
+        # 过滤掉空的或太短的文本
+        if text:
+            item = {
+                "start": round(segment['start'], 2),
+                "end": round(segment['end'], 2),
+                "text": text,
+                "speaker": speaker_name
+            }
+            for field in fields:
+                value = segment.get(field)
+                if value is not None:
+                    item[field] = round(value, 4) if isinstance(value, float) else value
+            transcriptions.append(item)
+    return transcriptions
+
+
 def merge_and_sort_transcriptions(transcriptions_list):
     """
     合并多个转录结果并按时间戳排序
@@ -146,6 +223,123 @@ def merge_and_sort_transcriptions(transcriptions_list):
     return all_transcriptions
 
 
+def update_search_index(transcript_path):
+    """把新写入的转录文件加入全文检索索引，失败时只给出警告"""
+    try:
+        from transcript_search import index_transcript_file
+        count = index_transcript_file(transcript_path)
+        print(f"📚 已更新检索索引: {count} 个片段")
+    except Exception as e:
+        print(f"⚠️ 更新检索索引失败: {e}")
+
+
+def update_talk_stats(transcript_path):
+    """更新会议的说话统计和按老师/月份的汇总，失败时只给出警告"""
+    try:
+        from talk_stats import update_meeting_stats
+        stats = update_meeting_stats(transcript_path)
+        print(f"📊 已更新说话统计: {stats['turns']} 轮发言, 静音 {stats['silence_ratio']:.0%}")
+    except Exception as e:
+        print(f"⚠️ 更新说话统计失败: {e}")
+
+
+def speaker_output_path(output_path, speaker_name):
+    """合并结果旁边单个说话人的JSON路径 (*_自己.json / *_对方.json)"""
+    output_path = Path(output_path)
+    return output_path.with_name(f"{output_path.stem}_{speaker_name}{output_path.suffix}")
+
+
+def dual_output_files(output_path):
+    """save_dual_transcriptions 写出的全部文件：合并结果和每个说话人的JSON，以及各自的字幕"""
+    files = []
+    for json_path in (speaker_output_path(output_path, "自己"), speaker_output_path(output_path, "对方"),
+                      Path(output_path)):
+        files += [json_path] + caption_paths(json_path)
+    return files
+
+
+def save_dual_transcriptions(self_transcriptions, other_transcriptions, output_path, recordings_dir=None):
+    """
+    保存双音轨的转录结果：每个说话人单独的JSON/字幕，以及合并排序后的JSON/字幕
+    
+    Args:
+        self_transcriptions / other_transcriptions: 两个说话人的转录结果
+        output_path: 合并结果的JSON路径，单独结果写在旁边的 *_自己.json / *_对方.json
+        recordings_dir: 录制目录；输出位于其下的会议文件夹时同步更新全文检索索引和说话统计
+    
+    Returns:
+        list: 合并并排序后的转录结果
+    """
+    output_path = Path(output_path)
+    with stage("save", segments=len(self_transcriptions) + len(other_transcriptions)):
+        # 生成单独文件的路径
+        self_output_path = speaker_output_path(output_path, "自己")
+        other_output_path = speaker_output_path(output_path, "对方")
+    
+        # 保存单独的转录结果
+        print("\n💾 保存单独转录结果...")
+        save_start_time = time.time()
+    
+        with open(self_output_path, 'w', encoding='utf-8') as f:
+            json.dump(self_transcriptions, f, ensure_ascii=False, indent=2)
+        write_caption_files(self_transcriptions, self_output_path, include_speaker=False)
+        print(f"📄 自己的转录: {self_output_path} (+ .vtt/.srt)")
+    
+        with open(other_output_path, 'w', encoding='utf-8') as f:
+            json.dump(other_transcriptions, f, ensure_ascii=False, indent=2)
+        write_caption_files(other_transcriptions, other_output_path, include_speaker=False)
+        print(f"📄 对方的转录: {other_output_path} (+ .vtt/.srt)")
+    
+        # 合并并排序
+        print("\n🔄 合并和排序转录结果...")
+        merge_start_time = time.time()
+        all_transcriptions = merge_and_sort_transcriptions([self_transcriptions, other_transcriptions])
+        merge_time = time.time() - merge_start_time
+        print(f"⏱️ 合并耗时: {format_time(merge_time)}")
+    
+        # 输出合并的JSON文件
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(all_transcriptions, f, ensure_ascii=False, indent=2)
+        write_caption_files(all_transcriptions, output_path, include_speaker=True)
+    
+        # 写入recordings下的会议文件夹时，同步更新全文检索索引和说话统计
+        if recordings_dir is not None and output_path.parent.parent == Path(recordings_dir):
+            update_search_index(output_path)
+            update_talk_stats(output_path)
+    
+        save_time = time.time() - save_start_time
+        print(f"⏱️ 保存文件耗时: {format_time(save_time)}")
+    
+    return all_transcriptions
+
+
+def load_backend(backend_name, model_size, cascade=False, fast_model=None, decoding=None, quantize=None):
+    """创建并加载识别后端，失败时退出；cascade为True时创建 小模型 -> 大模型 的级联后端"""
+    options = {"decoding": decoding} if decoding else {}
+    if quantize:
+        options["quantize"] = quantize
+    try:
+        if cascade:
+            backend = get_cascade_backend(fast_model, model_size, backend_name, **options)
+        else:
+            backend = get_backend(backend_name, model_size, **options)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    print(f"\n🤖 加载识别模型: {backend.describe()}")
+    print(f"⏳ 正在加载模型，请稍候...")
+    model_load_start = time.time()
+    try:
+        with stage("load_model", backend=backend.name, model=backend.model_size):
+            backend.load()
+        model_load_time = time.time() - model_load_start
+        print(f"✅ 模型加载成功 (耗时: {format_time(model_load_time)})")
+    except Exception as e:
+        print(f"❌ 模型加载失败: {e}")
+        sys.exit(1)
+    return backend
+
+
 def find_audio_files(recordings_dir):
     """
     查找最新的音频文件对
@@ -154,40 +348,52 @@ def find_audio_files(recordings_dir):
         recordings_dir: 录制目录
     
     Returns:
-        tuple: (自己.wav文件路径, 对方.wav文件路径) 或 (None, None)
+        tuple: (自己音轨路径, 对方音轨路径) 或 (None, None)，音轨是.wav或.flac
     """
-    # 查找所有的音频文件
-    self_files = list(recordings_dir.glob("*_自己.wav"))
-    other_files = list(recordings_dir.glob("*_对方.wav"))
-    
-    if not self_files or not other_files:
+    from audio_io import find_meeting_tracks
+    pairs = find_meeting_tracks(recordings_dir)
+    if not pairs:
         return None, None
     
-    # 获取最新的文件对（基于文件名中的时间戳）
-    self_files.sort(key=lambda f: f.stat().st_mtime, reverse=True)
-    other_files.sort(key=lambda f: f.stat().st_mtime, reverse=True)
-    
-    # 找到匹配的文件对
-    for self_file in self_files:
-        base_name = self_file.name.replace("_自己.wav", "")
-        other_file = recordings_dir / f"{base_name}_对方.wav"
-        if other_file.exists():
-            return self_file, other_file
-    
-    return None, None
+    # 最新的文件对（基于修改时间）
+    return max(pairs, key=lambda pair: pair[0].stat().st_mtime)
 
 
 def main():
     """主函数"""
     total_start_time = time.time()
     
-    parser = argparse.ArgumentParser(description="使用Whisper进行语音识别并生成JSON文件")
+    parser = argparse.ArgumentParser(description="语音识别并生成JSON文件")
     parser.add_argument("--self-audio", type=str, help="自己的音频文件路径")
     parser.add_argument("--other-audio", type=str, help="对方的音频文件路径")
     parser.add_argument("--single-audio", type=str, help="单独转录一个音频文件路径")
     parser.add_argument("--speaker-name", type=str, default="说话人", help="单独转录时的说话人名称")
     parser.add_argument("--output", type=str, default="output.json", help="输出JSON文件路径")
-    parser.add_argument("--model", type=str, default="small", help="Whisper模型大小 (tiny, base, small, medium, large)")
+    parser.add_argument("--model", type=str, help="模型大小 (tiny, base, small, medium, large；默认: 配置文件中的transcription.model或small)")
+    parser.add_argument("--backend", type=str, choices=list(BACKENDS), help="识别后端 (默认: 配置文件中的transcription.backend或whisper)")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="双音频模式下把两条音轨切成30秒窗口批量解码，每批的窗口数 (默认: 0，每条音轨一个进程)")
+    parser.add_argument("--vad", action="store_true", help="先做能量VAD，只转录有声音的区域")
+    parser.add_argument("--suppress-crosstalk", action="store_true",
+                        help="双音频模式下跳过一条音轨上只是另一条音轨串音的区域（会自动启用VAD）")
+    parser.add_argument("--no-filter", action="store_true", help="保留重复/循环/串音的片段，不做过滤")
+    parser.add_argument("--vad-threshold", type=float, default=DEFAULT_VAD_THRESHOLD,
+                        help=f"VAD静音RMS阈值 (默认: {DEFAULT_VAD_THRESHOLD})")
+    parser.add_argument("--decoding", type=str, choices=DECODING_MODES,
+                        help="解码策略: beam / greedy / adaptive（先贪心，置信度检查不通过的窗口再beam search）"
+                             " (默认: 配置文件中的transcription.decoding或beam)")
+    parser.add_argument("--quantize", type=str, choices=QUANTIZE_MODES,
+                        help="CPU推理时把whisper模型的线性层动态量化为int8（结果缓存在磁盘上）；"
+                             "faster-whisper等价于compute_type=int8")
+    parser.add_argument("--workers", type=int,
+                        help="双音频模式的转录进程数 (1或2，默认: 校准结果或按可用核心数自动决定)")
+    parser.add_argument("--threads", type=int,
+                        help="每个转录进程的计算线程数 (默认: 可用物理核心数/进程数，考虑cgroup配额)")
+    parser.add_argument("--cpu-affinity", action="store_true", help="把每个转录进程绑定到互不重叠的CPU核心上")
+    parser.add_argument("--cascade", action="store_true",
+                        help="级联解码：先用 --fast-model 识别全部音频，只把不可靠的片段交给 --model 重新识别")
+    parser.add_argument("--fast-model", type=str,
+                        help="级联解码的小模型 (默认: 配置文件中的transcription.cascade.fast_model或base)")
     
     args = parser.parse_args()
     
@@ -208,26 +414,22 @@ def main():
         print(f"  🎤 音频文件: {single_audio.name}")
         print(f"  👤 说话人: {args.speaker_name}")
         
-        # 加载Whisper模型
-        print(f"\n🤖 加载Whisper模型: {args.model}")
-        print(f"⏳ 正在加载模型，请稍候...")
-        model_load_start = time.time()
-        try:
-            model = whisper.load_model(args.model)
-            model_load_time = time.time() - model_load_start
-            print(f"✅ 模型加载成功 (耗时: {format_time(model_load_time)})")
-        except Exception as e:
-            print(f"❌ 模型加载失败: {e}")
-            sys.exit(1)
+        plan = plan_workers(1, threads=args.threads, affinity=args.cpu_affinity)
+        apply_worker_settings(plan.threads, plan.cpu_sets[0] if plan.cpu_sets else None)
+        print(f"🧵 CPU分配: {plan.budget.describe()}; {plan.describe()}")
+        backend = load_backend(args.backend, args.model, args.cascade, args.fast_model, args.decoding, args.quantize)
         
         # 转录音频文件
         print("\n🎵 开始语音识别...")
         print(f"🎯 目标文件: {single_audio}")
         print(f"👤 说话人标识: {args.speaker_name}")
-        print(f"🔧 使用模型: {args.model}")
+        print(f"🔧 识别后端: {backend.describe()}")
         
         try:
-            transcriptions = transcribe_audio(single_audio, args.speaker_name, model)
+            transcriptions = transcribe_audio(single_audio, args.speaker_name, backend, args.vad, args.vad_threshold)
+            if not args.no_filter:
+                transcriptions, filter_stats = filter_transcriptions(transcriptions)
+                print(f"🧹 过滤重复/幻觉片段: {format_filter_stats(filter_stats)}")
             
             # 输出到JSON文件
             output_path = Path(args.output)
@@ -237,10 +439,12 @@ def main():
             save_start_time = time.time()
             with open(output_path, 'w', encoding='utf-8') as f:
                 json.dump(transcriptions, f, ensure_ascii=False, indent=2)
+            caption_files = write_caption_files(transcriptions, output_path, include_speaker=False)
             save_time = time.time() - save_start_time
             
             print(f"\n✅ 转录完成！")
             print(f"📄 输出文件: {output_path}")
+            print(f"🎞️ 字幕文件: {', '.join(p.name for p in caption_files)}")
             print(f"📊 总计 {len(transcriptions)} 个语音片段")
             print(f"⏱️ 保存文件耗时: {format_time(save_time)}")
             
@@ -272,7 +476,7 @@ def main():
         
         if not self_audio or not other_audio:
             print("❌ 未找到音频文件对")
-            print("请确保recordings目录中有 *_自己.wav 和 *_对方.wav 文件")
+            print("请确保recordings目录中有 *_自己 和 *_对方 音轨文件 (.wav或.flac)")
             print("或者使用 --self-audio 和 --other-audio 参数指定文件路径")
             print("或者使用 --single-audio 参数转录单个音频文件")
             sys.exit(1)
@@ -290,72 +494,66 @@ def main():
     print(f"  🎤 自己: {self_audio.name}")
     print(f"  🎤 对方: {other_audio.name}")
     
-    # 加载Whisper模型
-    print(f"\n🤖 加载Whisper模型: {args.model}")
-    print(f"⏳ 正在加载模型，请稍候...")
-    model_load_start = time.time()
-    try:
-        model = whisper.load_model(args.model)
-        model_load_time = time.time() - model_load_start
-        print(f"✅ 模型加载成功 (耗时: {format_time(model_load_time)})")
-    except Exception as e:
-        print(f"❌ 模型加载失败: {e}")
-        sys.exit(1)
+    if args.batch_size > 0:
+        # 批量解码在本进程中进行，所有可用核心都给它
+        plan = plan_workers(1, threads=args.threads, affinity=args.cpu_affinity)
+        apply_worker_settings(plan.threads, plan.cpu_sets[0] if plan.cpu_sets else None)
+    backend = load_backend(args.backend, args.model, args.cascade, args.fast_model, args.decoding, args.quantize)
+    if args.batch_size <= 0:
+        plan = plan_workers(2, args.workers, args.threads, args.cpu_affinity, backend.describe())
+    print(f"🧵 CPU分配: {plan.budget.describe()}; {plan.describe()}")
+    
+    crosstalk = {"自己": None, "对方": None}
+    if args.suppress_crosstalk:
+        print("\n🔁 检测两条音轨之间的串音...")
+        from crosstalk import detect_crosstalk_files
+        crosstalk = detect_crosstalk_files(self_audio, other_audio)
+        for speaker, regions in crosstalk.items():
+            print(f"  {speaker}: 跳过 {len(regions)} 个串音区域, 共 {format_time(sum(e - s for s, e in regions))}")
     
     # 转录音频文件
     print("\n🎵 开始语音识别...")
     
     try:
-        # 使用 ProcessPoolExecutor 并行转录两个音频
-        with ProcessPoolExecutor(max_workers=2) as executor:
-            self_future = executor.submit(transcribe_audio, self_audio, "自己", model)
-            other_future = executor.submit(transcribe_audio, other_audio, "对方", model)
-            
-            # 等待两个转录任务完成
-            self_transcriptions = self_future.result()
-            other_transcriptions = other_future.result()
+        if args.batch_size > 0:
+            # 两条音轨的窗口交错组成batch，一次解码多个窗口
+            from batch_scheduler import BatchScheduler
+            scheduler = BatchScheduler(backend, batch_size=args.batch_size,
+                                       vad=args.vad or args.suppress_crosstalk, vad_threshold=args.vad_threshold)
+            self_job, other_job = scheduler.add_meeting(self_audio, other_audio, exclude=crosstalk)
+            scheduler.run()
+            if backend.decoding == "adaptive":
+                print(f"🎯 自适应解码: {backend.format_decode_stats()}")
+            self_transcriptions = to_transcriptions(self_job.segments, "自己", backend.segment_fields)
+            other_transcriptions = to_transcriptions(other_job.segments, "对方", backend.segment_fields)
+        else:
+            # 按CPU分配计划启动转录进程（每个进程的线程数和CPU绑定见 cpu_scheduler.py）
+            with plan.executor() as executor:
+                self_future = executor.submit(transcribe_audio, self_audio, "自己", backend,
+                                              args.vad, args.vad_threshold, crosstalk["自己"])
+                other_future = executor.submit(transcribe_audio, other_audio, "对方", backend,
+                                               args.vad, args.vad_threshold, crosstalk["对方"])
+                
+                # 等待两个转录任务完成
+                self_transcriptions = self_future.result()
+                other_transcriptions = other_future.result()
+        
+        if not args.no_filter:
+            self_transcriptions, other_transcriptions, filter_stats = filter_dual(
+                self_transcriptions, other_transcriptions, audio_files={"自己": self_audio, "对方": other_audio})
+            print(f"\n🧹 过滤重复/幻觉片段: {format_filter_stats(filter_stats)}")
         
         # 生成单独的输出文件路径
         output_path = Path(args.output)
         if not output_path.is_absolute():
             output_path = project_root / output_path
         
-        # 生成单独文件的路径
-        output_dir = output_path.parent
-        output_stem = output_path.stem
-        output_suffix = output_path.suffix
-        
-        self_output_path = output_dir / f"{output_stem}_自己{output_suffix}"
-        other_output_path = output_dir / f"{output_stem}_对方{output_suffix}"
-        
-        # 保存单独的转录结果
-        print("\n💾 保存单独转录结果...")
-        save_start_time = time.time()
-        
-        with open(self_output_path, 'w', encoding='utf-8') as f:
-            json.dump(self_transcriptions, f, ensure_ascii=False, indent=2)
-        print(f"📄 自己的转录: {self_output_path}")
-        
-        with open(other_output_path, 'w', encoding='utf-8') as f:
-            json.dump(other_transcriptions, f, ensure_ascii=False, indent=2)
-        print(f"📄 对方的转录: {other_output_path}")
-        
-        # 合并并排序
-        print("\n🔄 合并和排序转录结果...")
-        merge_start_time = time.time()
-        all_transcriptions = merge_and_sort_transcriptions([self_transcriptions, other_transcriptions])
-        merge_time = time.time() - merge_start_time
-        print(f"⏱️ 合并耗时: {format_time(merge_time)}")
-        
-        # 输出合并的JSON文件
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(all_transcriptions, f, ensure_ascii=False, indent=2)
-        
-        save_time = time.time() - save_start_time
-        print(f"⏱️ 保存文件耗时: {format_time(save_time)}")
+        all_transcriptions = save_dual_transcriptions(self_transcriptions, other_transcriptions,
+                                                      output_path, recordings_dir)
         
         print(f"\n✅ 转录完成！")
         print(f"📄 合并文件: {output_path}")
+        print(f"🎞️ 合并字幕: {output_path.with_suffix('.vtt').name}, {output_path.with_suffix('.srt').name}")
         print(f"📊 总计 {len(all_transcriptions)} 个语音片段")
         print(f"📈 统计: 自己 {len(self_transcriptions)} 片段, 对方 {len(other_transcriptions)} 片段")
         
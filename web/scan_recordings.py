@@ -1,85 +1,332 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-扫描recordings目录，生成会议列表JS文件
+扫描recordings目录，生成会议列表JS文件和分页会议目录（web/catalog/）
+
+扫描结果会缓存到 recordings/.manifest.json，以文件夹名 + 视频文件的
+mtime/size 作为缓存键。再次扫描时只探测新增或变化的文件夹，
+并移除已删除的文件夹，刷新耗时与变化数量成正比，而不是与库的大小成正比。
+需要探测的视频通过线程池并发读取元数据：优先直接解析文件头，
+无法识别的文件回退到一次ffprobe调用。
+首页读取的是分页目录（固定大小的分片 + 按老师/月份的二级索引，见 src/meeting_catalog.py），
+recordings_list.js 仍然生成，供直接用 file:// 打开页面时使用。
 """
 
 import os
+import sys
 import json
-import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from media_probe import get_media_info
+from meeting_catalog import CATALOG_DIR_NAME, SUMMARY_FILE as CATALOG_SUMMARY_FILE, write_catalog
+from preview_artifacts import PREVIEW_DIR_NAME, STATE_FILE_NAME as PREVIEW_STATE_NAME
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 5
+
+# 并发探测的默认线程数与单个文件的超时时间（秒）
+DEFAULT_PROBE_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+DEFAULT_PROBE_TIMEOUT = 30
+
+
+def probe_video(video_path, timeout=DEFAULT_PROBE_TIMEOUT):
+    """
+    读取视频的元数据
+
+    优先直接解析MP4/MKV文件头，无法识别时回退到一次ffprobe调用。
+
+    Args:
+        video_path: 视频文件路径
+        timeout: ffprobe回退时的超时时间（秒）
+
+    Returns:
+        dict: 包含 duration（秒，可能为None）、audio_tracks、video_codec、audio_codecs；
+              探测失败时返回None
+    """
+    try:
+        info = get_media_info(video_path, timeout=timeout)
+    except Exception as e:
+        print(f"警告: 无法读取视频信息 {video_path}: {e}")
+        return None
+    if info is None:
+        print(f"警告: 无法读取视频信息 {video_path}")
+        return None
+
+    audio_codecs = [track["codec"] for track in info["audio_tracks"]]
+    return {
+        "duration": info["duration"],
+        "audio_tracks": len(audio_codecs),
+        "video_codec": info["video_codec"],
+        "audio_codecs": audio_codecs
+    }
+
+
+def format_duration(seconds):
+    """把秒数格式化为会议列表中显示的时长"""
+    if seconds is None:
+        return "未知"
+    return f"{int(seconds/60)}分钟"
+
+
 def get_video_duration(video_path):
     """获取视频时长（分钟）"""
+    info = probe_video(video_path)
+    return format_duration(info["duration"] if info else None)
+
+
+def probe_videos(video_files, max_workers=DEFAULT_PROBE_WORKERS, timeout=DEFAULT_PROBE_TIMEOUT):
+    """
+    并发探测多个视频文件
+
+    文件头解析和ffprobe回退的耗时主要在等待IO和进程启动上，用线程池并发执行，
+    首次建立大型库的索引时不会被逐个探测的延迟拖慢。
+
+    Returns:
+        dict: 视频路径 -> probe_video 的结果
+    """
+    video_files = list(video_files)
+    if not video_files:
+        return {}
+    workers = max(1, min(max_workers, len(video_files)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(lambda path: probe_video(path, timeout), video_files)
+        return dict(zip(video_files, results))
+
+
+def load_manifest(manifest_file):
+    """
+    读取扫描缓存清单
+
+    Returns:
+        dict: 文件夹名 -> 缓存条目；清单不存在或版本不匹配时返回空字典
+    """
     try:
-        # 使用ffprobe获取视频时长
-        cmd = [
-            'ffprobe',
-            '-v', 'error',
-            '-show_entries', 'format=duration',
-            '-of', 'default=noprint_wrappers=1:nokey=1',
-            str(video_path)
-        ]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        if result.returncode == 0:
-            duration = float(result.stdout.strip())
-            return f"{int(duration/60)}分钟"
-    except Exception as e:
-        print(f"警告: 无法读取视频时长 {video_path}: {e}")
-    return "未知"
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get("version") == MANIFEST_VERSION:
+            return data.get("folders", {})
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"警告: 扫描缓存已损坏，将重新扫描: {e}")
+    return {}
+
+
+def save_manifest(manifest_file, folders):
+    """原子地写入扫描缓存清单（先写临时文件再替换）"""
+    tmp_file = manifest_file.with_name(manifest_file.name + ".tmp")
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({"version": MANIFEST_VERSION, "folders": folders}, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_file, manifest_file)
+
+
+def find_video_file(folder):
+    """查找文件夹中的视频文件，返回第一个（按文件名排序，保证结果稳定）"""
+    video_files = sorted(folder.glob('*.mkv')) + sorted(folder.glob('*.mp4'))
+    return video_files[0] if video_files else None
+
 
-def scan_recordings():
+def video_signature(video_file):
+    """视频文件的缓存签名: (文件名, mtime_ns, size)"""
+    if video_file is None:
+        return None
+    stat = video_file.stat()
+    return [video_file.name, stat.st_mtime_ns, stat.st_size]
+
+
+def find_transcript_file(folder):
+    """查找文件夹中的合并转录文件（兼容旧的 transcript/merged.json 布局）"""
+    transcripts = sorted(folder.glob('*_transcription.json'))
+    if transcripts:
+        return transcripts[0]
+    legacy = folder / "transcript" / "merged.json"
+    return legacy if legacy.exists() else None
+
+
+def artifacts_signature(folder):
+    """转录文件、WebVTT字幕和预览文件进度的缓存签名，任一变化时刷新会议记录"""
+    transcript_file = find_transcript_file(folder)
+    caption_file = transcript_file.with_suffix('.vtt') if transcript_file is not None else None
+    preview_state = folder / PREVIEW_DIR_NAME / PREVIEW_STATE_NAME
+    return [
+        video_signature(transcript_file),
+        video_signature(caption_file) if caption_file is not None and caption_file.exists() else None,
+        video_signature(preview_state) if preview_state.exists() else None
+    ]
+
+
+def load_preview_state(folder):
+    """读取预览文件生成进度（由 src/preview_artifacts.py 写入）"""
+    try:
+        with open(folder / PREVIEW_DIR_NAME / PREVIEW_STATE_NAME, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def build_meeting_entry(folder, video_file, video_info):
+    """根据文件夹名和探测结果生成一条会议记录"""
+    # 假设文件夹名称格式为: Name_YYYY-MM-DD HH-MM-SS
+    name, date_str = folder.name.rsplit('_', 1)
+    date = datetime.strptime(date_str, '%Y-%m-%d %H-%M-%S')
+
+    transcript_file = find_transcript_file(folder)
+    meeting = {
+        "name": name,
+        "date": date.isoformat(),
+        "displayDate": date.strftime('%Y-%m-%d %H-%M-%S'),
+        "duration": format_duration(video_info["duration"] if video_info else None),
+        "folderName": folder.name,
+        "hasVideo": video_file is not None,
+        "hasSubtitle": transcript_file is not None,
+        # 相对于会议文件夹的真实文件路径，供播放器服务端直接返回
+        "videoFile": video_file.name if video_file is not None else None,
+        "transcriptFile": transcript_file.relative_to(folder).as_posix() if transcript_file is not None else None,
+        "captionFile": None
+    }
+    if transcript_file is not None:
+        # 转录时生成的合并WebVTT字幕
+        caption_file = transcript_file.with_suffix('.vtt')
+        if caption_file.exists():
+            meeting["captionFile"] = caption_file.relative_to(folder).as_posix()
+
+    # 后台生成的预览文件：缩略图索引和低码率代理视频
+    preview_state = load_preview_state(folder)
+    meeting["thumbnailsFile"] = f"{PREVIEW_DIR_NAME}/{preview_state['thumbnails']}" if preview_state.get("thumbnails") else None
+    meeting["proxyFile"] = f"{PREVIEW_DIR_NAME}/{preview_state['proxy']}" if preview_state.get("proxy") else None
+    if video_info:
+        meeting["durationSeconds"] = video_info["duration"]
+        meeting["audioTracks"] = video_info["audio_tracks"]
+        meeting["videoCodec"] = video_info["video_codec"]
+    return meeting
+
+
+def scan_recordings(force=False, max_workers=DEFAULT_PROBE_WORKERS, timeout=DEFAULT_PROBE_TIMEOUT,
+                    recordings_dir=None, output_file=None, catalog_dir=None):
+    """
+    增量扫描recordings目录
+
+    Args:
+        force: 为True时忽略缓存，重新探测所有文件夹
+        max_workers: 并发探测的线程数
+        timeout: 单个文件的探测超时时间（秒）
+        recordings_dir: 录制目录（默认: 项目根目录下的recordings）
+        output_file: 会议列表JS文件（默认: web/recordings_list.js）
+        catalog_dir: 分页会议目录（默认: 与output_file同目录下的catalog/）
+    """
     # 获取项目根目录
     project_root = Path(__file__).parent.parent
-    recordings_dir = project_root / "recordings"
-    output_file = project_root / "web" / "recordings_list.js"
-    
+    recordings_dir = Path(recordings_dir) if recordings_dir else project_root / "recordings"
+    output_file = Path(output_file) if output_file else project_root / "web" / "recordings_list.js"
+    catalog_dir = Path(catalog_dir) if catalog_dir else output_file.parent / CATALOG_DIR_NAME
+    manifest_file = recordings_dir / MANIFEST_NAME
+
     # 确保recordings目录存在
     if not recordings_dir.exists():
         print(f"错误: recordings目录不存在: {recordings_dir}")
         return
-    
-    # 扫描目录
-    meetings = []
+
+    cached = {} if force else load_manifest(manifest_file)
+    folders = {}
+    to_probe = []
+    refreshed = 0
+
+    # 第一阶段: 扫描目录，找出需要探测的文件夹
     for item in recordings_dir.iterdir():
-        if item.is_dir() and not item.name.startswith('.'):
-            # 解析文件夹名称
-            try:
-                # 假设文件夹名称格式为: Name_YYYY-MM-DD HH-MM-SS
-                name, date_str = item.name.rsplit('_', 1)
-                date = datetime.strptime(date_str, '%Y-%m-%d %H-%M-%S')
-                
-                # 查找视频文件
-                video_files = list(item.glob('*.mkv')) + list(item.glob('*.mp4'))
-                duration = "未知"
-                if video_files:
-                    # 读取第一个视频文件的时长
-                    duration = get_video_duration(video_files[0])
-                
-                meetings.append({
-                    "name": name,
-                    "date": date.isoformat(),
-                    "displayDate": date.strftime('%Y-%m-%d %H-%M-%S'),
-                    "duration": duration,
-                    "folderName": item.name,
-                    "hasVideo": True,
-                    "hasSubtitle": True
-                })
-            except Exception as e:
-                print(f"警告: 无法解析文件夹名称 {item.name}: {e}")
-    
-    # 按日期排序
-    meetings.sort(key=lambda x: x["date"], reverse=True)
-    
-    # 保存JS文件
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write('const recordingsList = ')
-        json.dump(meetings, f, ensure_ascii=False, indent=2)
-        f.write(';')
-    
-    print(f"✅ 已扫描 {len(meetings)} 个会议记录")
-    print(f"📝 结果已保存到: {output_file}")
+        if not item.is_dir() or item.name.startswith('.'):
+            continue
+        try:
+            video_file = find_video_file(item)
+            signature = video_signature(video_file)
+            transcript_signature = artifacts_signature(item)
+
+            entry = cached.get(item.name)
+            # 上次探测失败或超时（有视频但没有video_info）不算命中，重新探测
+            probe_failed = entry is not None and video_file is not None and entry.get("video_info") is None
+            if entry is not None and entry.get("signature") == signature and not probe_failed:
+                # 视频缓存命中，无需重新探测；转录文件变化时只刷新会议记录
+                if entry.get("transcript") != transcript_signature:
+                    entry = dict(entry, transcript=transcript_signature,
+                                 meeting=build_meeting_entry(item, video_file, entry.get("video_info")))
+                    refreshed += 1
+                folders[item.name] = entry
+                continue
+
+            to_probe.append((item, video_file, signature, transcript_signature))
+        except Exception as e:
+            print(f"警告: 无法解析文件夹名称 {item.name}: {e}")
+
+    # 第二阶段: 并发探测新增或变化的视频
+    if to_probe:
+        print(f"🔍 探测 {len(to_probe)} 个新增或变化的视频 (并发数: {max_workers})...")
+    video_infos = probe_videos(
+        [video_file for _, video_file, _, _ in to_probe if video_file is not None],
+        max_workers=max_workers,
+        timeout=timeout
+    )
+    probed = 0
+    # 重新探测后结果与缓存相同（例如再次探测失败）的文件夹，不需要重写文件
+    unchanged = 0
+    failed = 0
+    for item, video_file, signature, transcript_signature in to_probe:
+        try:
+            video_info = video_infos.get(video_file)
+            folders[item.name] = {
+                "signature": signature,
+                "transcript": transcript_signature,
+                "video_info": video_info,
+                "meeting": build_meeting_entry(item, video_file, video_info)
+            }
+            probed += 1
+            if video_file is not None and video_info is None:
+                failed += 1
+            if folders[item.name] == cached.get(item.name):
+                unchanged += 1
+        except Exception as e:
+            print(f"警告: 无法解析文件夹名称 {item.name}: {e}")
+
+    removed = len(set(cached) - set(folders))
+
+    # 只有发生变化时才重写缓存和JS文件
+    changed = (probed > unchanged or refreshed > 0 or removed > 0 or not output_file.exists()
+               or not (catalog_dir / CATALOG_SUMMARY_FILE).exists())
+    if changed:
+        save_manifest(manifest_file, folders)
+
+        # 按日期排序
+        meetings = [entry["meeting"] for entry in folders.values()]
+        meetings.sort(key=lambda x: x["date"], reverse=True)
+
+        # 保存JS文件
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write('const recordingsList = ')
+            json.dump(meetings, f, ensure_ascii=False, indent=2)
+            f.write(';')
+
+        # 分页目录只重写内容变化的分片
+        catalog_writes = write_catalog(meetings, catalog_dir)
+
+    cache_hits = len(folders) - probed
+    print(f"✅ 已扫描 {len(folders)} 个会议记录 (新探测 {probed}, 移除 {removed}, 缓存命中 {cache_hits})")
+    if failed:
+        print(f"⚠️ {failed} 个视频探测失败或超时，时长显示为未知，下次扫描时重新探测")
+    if changed:
+        print(f"📝 结果已保存到: {output_file}")
+        print(f"📚 分页目录: {catalog_dir} (更新 {catalog_writes} 个文件)")
+    else:
+        print(f"📝 没有变化，保留现有文件: {output_file}")
+
 
 if __name__ == "__main__":
-    scan_recordings() 
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="扫描recordings目录，生成会议列表JS文件")
+    parser.add_argument("--force", action="store_true", help="忽略扫描缓存，重新探测所有文件夹")
+    parser.add_argument("--workers", type=int, default=DEFAULT_PROBE_WORKERS,
+                        help=f"并发探测的线程数 (默认: {DEFAULT_PROBE_WORKERS})")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_PROBE_TIMEOUT,
+                        help=f"单个文件的探测超时时间，秒 (默认: {DEFAULT_PROBE_TIMEOUT})")
+    args = parser.parse_args()
+    scan_recordings(force=args.force, max_workers=args.workers, timeout=args.timeout)
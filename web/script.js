@@ -1,5 +1,9 @@
 // 全局变量
 let subtitles = [];
+let subtitleStarts = []; // 按开始时间排序的开始时间数组，用于二分查找
+let subtitleMaxEnds = []; // 结束时间的前缀最大值，支持重叠片段的二分查找
+let subtitleTotal = 0; // 服务端返回的字幕总数（分段加载时大于已加载数量）
+let captionTrackActive = false; // 使用原生字幕轨道的cuechange事件高亮，不再在timeupdate中查找
 let videoPlayer = null;
 let currentActiveSubtitle = null;
 let isJumping = false; // 添加跳转状态标记
@@ -24,6 +28,7 @@ document.addEventListener('DOMContentLoaded', function() {
     const videoParam = urlParams.get('video');
     const subtitleParam = urlParams.get('subtitle');
     const teacherParam = urlParams.get('teacher'); // 获取老师参数
+    const timeParam = parseFloat(urlParams.get('t')); // 检索结果深链接的跳转时间
     
     console.log('URL参数:', {
         folder: folderParam,
@@ -59,6 +64,13 @@ document.addEventListener('DOMContentLoaded', function() {
     }
     
     setupEventListeners();
+    
+    if (!isNaN(timeParam) && timeParam > 0) {
+        videoPlayer.addEventListener('loadedmetadata', function() {
+            console.log('跳转到链接指定的时间:', timeParam);
+            jumpToTime(timeParam);
+        }, { once: true });
+    }
 });
 
 // 设置事件监听器
@@ -202,11 +214,51 @@ async function loadDefaultVideo() {
 
 // 加载字幕数据
 function loadSubtitles(data) {
-    subtitles = data;
+    subtitles = [];
+    subtitleStarts = [];
+    subtitleMaxEnds = [];
+    subtitleTotal = data.length;
+    currentActiveSubtitle = null;
+    appendSubtitleIndex([...data].sort((a, b) => a.start - b.start));
     renderSubtitles();
     updateSubtitleStats();
 }
 
+// 把已按开始时间排序的片段追加到时间索引
+function appendSubtitleIndex(items) {
+    let maxEnd = subtitleMaxEnds.length > 0 ? subtitleMaxEnds[subtitleMaxEnds.length - 1] : -Infinity;
+    for (const item of items) {
+        subtitles.push(item);
+        subtitleStarts.push(item.start);
+        maxEnd = Math.max(maxEnd, item.end);
+        subtitleMaxEnds.push(maxEnd);
+    }
+}
+
+// 生成单条字幕的HTML
+function subtitleItemHtml(subtitle, index) {
+    const speakerClass = subtitle.speaker === '自己' ? 'speaker-self' : 'speaker-other';
+    const avatarSrc = subtitle.speaker === '自己' 
+        ? 'assets/avatars/Daxian_Image.jpg'
+        : `assets/avatars/${teacherName}_Image.png`;
+    const startTime = formatTime(subtitle.start);
+    const endTime = formatTime(subtitle.end);
+    
+    return `
+        <div class="subtitle-item" data-index="${index}" data-start-time="${subtitle.start}">
+            <span class="speaker-tag ${speakerClass}">
+                <img src="${avatarSrc}" alt="${subtitle.speaker}" onerror="this.src='assets/avatars/Default_Image.png'">
+            </span>
+            <span class="subtitle-content">${subtitle.text}</span>
+            <span class="subtitle-time">
+                <span class="time-start">${startTime}</span>
+                <span class="time-divider">—</span>
+                <span class="time-end">${endTime}</span>
+            </span>
+        </div>
+    `;
+}
+
 // 渲染字幕列表
 function renderSubtitles() {
     if (!subtitles || subtitles.length === 0) {
@@ -214,45 +266,73 @@ function renderSubtitles() {
         return;
     }
     
-    const html = subtitles.map((subtitle, index) => {
-        const speakerClass = subtitle.speaker === '自己' ? 'speaker-self' : 'speaker-other';
-        const avatarSrc = subtitle.speaker === '自己' 
-            ? 'assets/avatars/Daxian_Image.jpg'
-            : `assets/avatars/${teacherName}_Image.png`;
-        const startTime = formatTime(subtitle.start);
-        const endTime = formatTime(subtitle.end);
-        
-        return `
-            <div class="subtitle-item" data-index="${index}" data-start-time="${subtitle.start}">
-                <span class="speaker-tag ${speakerClass}">
-                    <img src="${avatarSrc}" alt="${subtitle.speaker}" onerror="this.src='assets/avatars/Default_Image.png'">
-                </span>
-                <span class="subtitle-content">${subtitle.text}</span>
-                <span class="subtitle-time">
-                    <span class="time-start">${startTime}</span>
-                    <span class="time-divider">—</span>
-                    <span class="time-end">${endTime}</span>
-                </span>
-            </div>
-        `;
-    }).join('');
-    
-    subtitleList.innerHTML = html;
+    subtitleList.innerHTML = subtitles.map(subtitleItemHtml).join('');
     
     // 重新绑定点击事件
     bindSubtitleClickEvents();
 }
 
-// 绑定字幕点击事件
-function bindSubtitleClickEvents() {
-    const subtitleItems = subtitleList.querySelectorAll('.subtitle-item');
+// 追加渲染新加载的一段字幕（分段加载时只处理新增部分，不重绘整个列表）
+function appendRenderedSubtitles(items, firstIndex) {
+    const html = items.map((subtitle, i) => subtitleItemHtml(subtitle, firstIndex + i)).join('');
+    subtitleList.insertAdjacentHTML('beforeend', html);
+    bindSubtitleClickEvents();
+}
+
+// 分段加载字幕：先渲染第一个时间窗口，其余窗口在后台依次追加
+async function loadSubtitlesWindowed(folderName, windowSeconds = 600) {
+    const baseUrl = `/api/meetings/${encodeURIComponent(folderName)}/transcript`;
+    let from = 0;
+    let first = true;
+    
+    while (true) {
+        const to = from + windowSeconds;
+        const page = await loadJsonFile(`${baseUrl}?from=${from}&to=${to}`);
+        
+        if (first) {
+            subtitles = [];
+            subtitleStarts = [];
+            subtitleMaxEnds = [];
+            currentActiveSubtitle = null;
+            subtitleTotal = page.total;
+            subtitleList.innerHTML = '';
+        }
+        
+        // 跨窗口边界的片段会在两个窗口中出现，按全局序号去重
+        const newItems = page.segments.filter(segment => segment.index >= subtitles.length);
+        const firstIndex = subtitles.length;
+        appendSubtitleIndex(newItems);
+        appendRenderedSubtitles(newItems, firstIndex);
+        
+        if (first) {
+            first = false;
+            if (subtitleTotal === 0) {
+                renderSubtitles();
+            }
+            updateSubtitleStats(page.duration);
+        }
+        
+        if (subtitles.length >= subtitleTotal || to >= page.duration) {
+            break;
+        }
+        from = to;
+    }
     
-    subtitleItems.forEach(item => {
-        // 移除可能存在的旧事件监听器
-        item.removeEventListener('click', handleSubtitleClick);
-        // 添加新的事件监听器
-        item.addEventListener('click', handleSubtitleClick);
+    updateSubtitleStats();
+}
+
+// 绑定字幕点击事件（事件委托：只在列表容器上绑定一次，分段追加的字幕也能响应）
+function bindSubtitleClickEvents() {
+    if (subtitleList.dataset.clickBound) {
+        return;
+    }
+    subtitleList.addEventListener('click', function(event) {
+        const item = event.target.closest('.subtitle-item');
+        if (item && subtitleList.contains(item)) {
+            handleSubtitleClick({ currentTarget: item });
+        }
     });
+    subtitleList.dataset.clickBound = 'true';
 }
 
 // 处理字幕点击事件
@@ -263,13 +343,21 @@ function handleSubtitleClick(event) {
 }
 
 // 更新字幕统计信息
-function updateSubtitleStats() {
-    const selfCount = subtitles.filter(s => s.speaker === '自己').length;
-    const otherCount = subtitles.filter(s => s.speaker === '对方').length;
-    const totalDuration = subtitles.length > 0 ? Math.max(...subtitles.map(s => s.end)) : 0;
+function updateSubtitleStats(knownDuration) {
+    let selfCount = 0;
+    let otherCount = 0;
+    for (const s of subtitles) {
+        if (s.speaker === '自己') selfCount++;
+        else if (s.speaker === '对方') otherCount++;
+    }
+    const totalDuration = knownDuration !== undefined
+        ? knownDuration
+        : (subtitleMaxEnds.length > 0 ? subtitleMaxEnds[subtitleMaxEnds.length - 1] : 0);
+    const loadingNote = subtitles.length < subtitleTotal ? ` (已加载 ${subtitles.length})` : '';
     
+    if (!subtitleCount) return;
     subtitleCount.innerHTML = `
-        总计 ${subtitles.length} 条字幕 | 
+        总计 ${subtitleTotal} 条字幕${loadingNote} | 
         自己: ${selfCount} 条 | 
         对方: ${otherCount} 条 | 
         时长: ${formatTime(totalDuration)}
@@ -402,47 +490,71 @@ function jumpToTime(time) {
 function updateCurrentTime() {
     const currentTime = videoPlayer.currentTime;
 
-    // 在跳转过程中，减少不必要的字幕更新操作
-    if (isJumping) {
+    // 在跳转过程中，减少不必要的字幕更新操作；字幕轨道可用时由cuechange事件负责高亮
+    if (isJumping || captionTrackActive) {
         return;
     }
 
     // 找到当前时间对应的字幕
-    const currentSubtitle = findCurrentSubtitle(currentTime);
+    const currentIndex = findCurrentSubtitleIndex(currentTime);
 
     // 只保留高亮逻辑
-    highlightCurrentSubtitle(currentSubtitle);
+    highlightCurrentSubtitle(currentIndex);
+}
+
+// 查找当前时间对应的字幕序号（二分查找，O(log n)），没有时返回 -1
+// 有多条字幕重叠时返回开始时间最晚的那条
+function findCurrentSubtitleIndex(currentTime) {
+    let lo = 0;
+    let hi = subtitleStarts.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (subtitleStarts[mid] <= currentTime) {
+            lo = mid + 1;
+        } else {
+            hi = mid;
+        }
+    }
+    for (let i = lo - 1; i >= 0 && subtitleMaxEnds[i] >= currentTime; i--) {
+        if (subtitles[i].end >= currentTime) {
+            return i;
+        }
+    }
+    return -1;
 }
 
 // 查找当前时间对应的字幕
 function findCurrentSubtitle(currentTime) {
-    return subtitles.find(subtitle => 
-        currentTime >= subtitle.start && currentTime <= subtitle.end
-    );
+    const index = findCurrentSubtitleIndex(currentTime);
+    return index >= 0 ? subtitles[index] : undefined;
 }
 
 // 高亮当前字幕
-function highlightCurrentSubtitle(currentSubtitle) {
+function highlightCurrentSubtitle(index) {
+    const subtitleElement = index >= 0
+        ? subtitleList.querySelector(`[data-index="${index}"]`)
+        : null;
+    
+    // 当前字幕没有变化时不做任何DOM操作
+    if (subtitleElement === currentActiveSubtitle) {
+        return;
+    }
+    
     // 移除之前的高亮
     if (currentActiveSubtitle) {
         currentActiveSubtitle.classList.remove('active');
     }
     
-    if (currentSubtitle) {
-        const index = subtitles.indexOf(currentSubtitle);
-        const subtitleElement = document.querySelector(`[data-index="${index}"]`);
+    if (subtitleElement) {
+        subtitleElement.classList.add('active');
+        currentActiveSubtitle = subtitleElement;
         
-        if (subtitleElement) {
-            subtitleElement.classList.add('active');
-            currentActiveSubtitle = subtitleElement;
-            
-            // 滚动到当前字幕（只在非跳转状态下滚动，避免干扰用户操作）
-            if (!isJumping) {
-                subtitleElement.scrollIntoView({
-                    behavior: 'smooth',
-                    block: 'center'
-                });
-            }
+        // 滚动到当前字幕（只在非跳转状态下滚动，避免干扰用户操作）
+        if (!isJumping) {
+            subtitleElement.scrollIntoView({
+                behavior: 'smooth',
+                block: 'center'
+            });
         }
     } else {
         currentActiveSubtitle = null;
@@ -537,6 +649,75 @@ function showLoadingError(message) {
     `;
 }
 
+// 是否通过 web/server.py 以HTTP方式访问（file:// 打开时没有服务端API）
+function isServedOverHttp() {
+    return window.location.protocol === 'http:' || window.location.protocol === 'https:';
+}
+
+// 通过服务端API加载会议：一次请求拿到真实的视频和转录文件路径
+async function loadMeetingFromApi(folderName) {
+    const response = await fetch(`/api/meetings/${encodeURIComponent(folderName)}`);
+    if (!response.ok) {
+        throw new Error(`HTTP错误: ${response.status}`);
+    }
+    const meeting = await response.json();
+    console.log('服务端返回的会议信息:', meeting);
+    
+    // 有低码率代理视频时优先播放代理（URL加 original=1 时播放原始视频）
+    const preferOriginal = new URLSearchParams(window.location.search).get('original') === '1';
+    if (meeting.proxy && !preferOriginal) {
+        console.log('使用代理视频:', meeting.proxy);
+        videoPlayer.src = meeting.proxy;
+    } else if (meeting.video) {
+        videoPlayer.src = meeting.video;
+    } else {
+        console.warn('⚠️ 该会议没有视频文件');
+    }
+    
+    if (meeting.captions) {
+        attachCaptionTrack(meeting.captions);
+    }
+    
+    if (meeting.transcript) {
+        // 按时间窗口分段加载，长会议也能立即显示开头的字幕
+        await loadSubtitlesWindowed(folderName);
+        console.log('✅ 成功加载字幕:', meeting.transcript);
+    }
+    return meeting;
+}
+
+// 挂载转录时生成的WebVTT字幕轨道
+// 轨道设为hidden：不在视频上叠加显示，只用浏览器原生的cuechange事件驱动字幕列表高亮
+function attachCaptionTrack(captionUrl) {
+    const track = document.createElement('track');
+    track.kind = 'captions';
+    track.label = '转录字幕';
+    track.srclang = 'en';
+    track.src = captionUrl;
+    
+    track.addEventListener('load', function() {
+        console.log('✅ 字幕轨道加载完成:', captionUrl);
+        captionTrackActive = true;
+    });
+    track.addEventListener('error', function() {
+        console.warn('⚠️ 字幕轨道加载失败，回退到时间索引查找:', captionUrl);
+        captionTrackActive = false;
+    });
+    
+    videoPlayer.appendChild(track);
+    track.track.mode = 'hidden';
+    track.track.addEventListener('cuechange', function() {
+        if (isJumping) return;
+        const cues = this.activeCues;
+        // 多条字幕重叠时取开始时间最晚的那条，与 findCurrentSubtitleIndex 一致
+        let index = -1;
+        for (let i = 0; i < (cues ? cues.length : 0); i++) {
+            index = Math.max(index, parseInt(cues[i].id, 10));
+        }
+        highlightCurrentSubtitle(index);
+    });
+}
+
 // 从文件夹加载视频
 async function loadVideoFromFolder(folderName) {
     console.log('=== 开始从文件夹加载视频 ===');
@@ -546,6 +727,16 @@ async function loadVideoFromFolder(folderName) {
         // 更新页面标题
         document.title = `${folderName} - 会议录制转录播放器`;
         
+        if (isServedOverHttp()) {
+            try {
+                await loadMeetingFromApi(folderName);
+                console.log('=== 视频加载完成 (服务端API) ===');
+                return;
+            } catch (error) {
+                console.warn('⚠️ 服务端API不可用，回退到逐个尝试文件路径:', error.message);
+            }
+        }
+        
         // 构建文件路径
         const basePath = `../recordings/${folderName}`;
         
@@ -653,8 +844,20 @@ function handleSubtitleFileSelect(event) {
     }
 }
 
-// 使用XMLHttpRequest加载JSON文件（解决CORS问题）
-function loadJsonFile(path) {
+// 加载JSON文件：HTTP方式访问时使用fetch，file:// 下使用XMLHttpRequest（解决CORS问题）
+async function loadJsonFile(path) {
+    if (isServedOverHttp()) {
+        const response = await fetch(path);
+        if (!response.ok) {
+            throw new Error(`HTTP错误: ${response.status}`);
+        }
+        try {
+            return await response.json();
+        } catch (e) {
+            throw new Error(`JSON解析失败: ${e.message}`);
+        }
+    }
+    
     return new Promise((resolve, reject) => {
         const xhr = new XMLHttpRequest();
         xhr.open('GET', path, true);
@@ -0,0 +1,582 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+会议记录本地HTTP服务器
+
+- 提供 web/ 和 recordings/ 目录的静态文件访问
+- 视频支持HTTP Range请求，播放器可以直接拖动进度条
+- ETag / Last-Modified 缓存校验，JSON等文本内容支持gzip压缩
+- /api/meetings?teacher=&from=&to=&page= 按老师和日期范围过滤的分页会议列表（最新在前）
+- /api/meetings/<文件夹名> 从扫描缓存清单返回真实的视频和转录文件路径
+- /api/meetings/<文件夹名>/transcript?from=&to= 按时间窗口返回转录片段
+- /api/meetings/<文件夹名>/segment-at?t= 返回某一时刻正在进行的片段
+- /api/search?q=&teacher=&speaker=&limit=&offset= 全文检索所有会议的转录
+- /api/stats?teacher=&month= 预先计算好的说话时长统计（来自 recordings/.stats.json）
+- /metrics 处理阶段指标（Prometheus文本格式，来自 recordings/.metrics.jsonl）
+
+用法:
+  python3 web/server.py
+  python3 web/server.py --port 8080 --host 0.0.0.0
+"""
+
+import os
+import re
+import sys
+import gzip
+import json
+import argparse
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT / "src"))
+
+import stage_metrics
+import talk_stats
+import transcript_search
+from meeting_catalog import CatalogIndex
+from scan_recordings import MANIFEST_NAME, load_manifest, scan_recordings
+from transcript_index import TranscriptIndexCache
+
+RECORDINGS_DIR = PROJECT_ROOT / "recordings"
+
+# 允许通过HTTP访问的顶层目录
+SERVED_DIRS = ("web", "recordings")
+
+CONTENT_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".json": "application/json; charset=utf-8",
+    ".vtt": "text/vtt; charset=utf-8",
+    ".srt": "application/x-subrip; charset=utf-8",
+    ".txt": "text/plain; charset=utf-8",
+    ".mp4": "video/mp4",
+    ".mkv": "video/x-matroska",
+    ".webm": "video/webm",
+    ".wav": "audio/wav",
+    ".flac": "audio/flac",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+    ".svg": "image/svg+xml",
+}
+
+# 这些类型的文件在客户端支持时使用gzip压缩
+COMPRESSIBLE_SUFFIXES = {".html", ".js", ".css", ".json", ".vtt", ".srt", ".txt"}
+
+# 小于这个大小的响应不值得压缩
+MIN_GZIP_SIZE = 1024
+
+COPY_CHUNK_SIZE = 256 * 1024
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def is_meeting_folder(folder_name: str) -> bool:
+    """文件夹名是否符合会议文件夹的格式 Name_YYYY-MM-DD HH-MM-SS（与 scan_recordings 相同）"""
+    if folder_name.startswith('.'):
+        return False
+    _, date_str = transcript_search.parse_meeting_folder(folder_name)
+    if not date_str:
+        return False
+    try:
+        datetime.strptime(date_str, '%Y-%m-%d %H-%M-%S')
+    except ValueError:
+        return False
+    return True
+
+
+class MeetingLibrary:
+    """从扫描缓存清单读取会议信息，清单文件变化时自动重新加载"""
+
+    def __init__(self, recordings_dir: Path):
+        self.recordings_dir = recordings_dir
+        self.manifest_file = recordings_dir / MANIFEST_NAME
+        self._lock = threading.Lock()
+        # 扫描可能要几秒，单独加锁：同一时间只扫描一次，扫描期间其他请求照常读取旧的清单
+        self._scan_lock = threading.Lock()
+        # 不在清单中的文件夹 -> 扫描后它的mtime；文件夹没有变化时不再为它重新扫描
+        self._misses = {}
+        self._mtime = None
+        self._meetings = {}
+        self._catalog = CatalogIndex([])
+        self._stats_mtime = None
+        self._stats = talk_stats.empty_store()
+
+    def _reload_if_changed(self):
+        try:
+            mtime = self.manifest_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        folders = load_manifest(self.manifest_file) if mtime is not None else {}
+        self._meetings = {name: entry["meeting"] for name, entry in folders.items()}
+        self._catalog = CatalogIndex(list(self._meetings.values()))
+        self._mtime = mtime
+
+    def rescan(self):
+        """增量刷新扫描缓存和检索索引（只处理变化的文件夹）"""
+        with self._scan_lock:
+            scan_recordings()
+            transcript_search.update_index(self.recordings_dir, verbose=False)
+            talk_stats.update_stats(self.recordings_dir, verbose=False)
+        with self._lock:
+            self._reload_if_changed()
+
+    def get(self, folder_name: str, rescan_on_miss: bool = True):
+        with self._lock:
+            self._reload_if_changed()
+            meeting = self._meetings.get(folder_name)
+        if meeting is None and rescan_on_miss and is_meeting_folder(folder_name):
+            # 新录制的会议还没进入清单，增量扫描一次；扫描后仍然不在清单中的文件夹，
+            # 在它的内容变化之前不再重新扫描
+            try:
+                mtime = (self.recordings_dir / folder_name).stat().st_mtime_ns
+            except (FileNotFoundError, NotADirectoryError):
+                return None
+            if self._misses.get(folder_name) == mtime:
+                return None
+            self.rescan()
+            with self._lock:
+                meeting = self._meetings.get(folder_name)
+            if meeting is None:
+                self._misses[folder_name] = mtime
+            else:
+                self._misses.pop(folder_name, None)
+        return meeting
+
+    def list_meetings(self, teacher=None, date_from=None, date_to=None, page=1, page_size=None):
+        """分页列出会议（最新在前），附带首页统计需要的汇总"""
+        with self._lock:
+            self._reload_if_changed()
+            catalog = self._catalog
+        result = catalog.query(teacher, date_from, date_to, page, page_size)
+        result["summary"] = catalog.summary()
+        return result
+
+    def speaking_stats(self, teacher=None, month=None):
+        """读取预先计算好的说话统计，文件变化时才重新加载"""
+        stats_file = self.recordings_dir / talk_stats.STATS_FILE_NAME
+        with self._lock:
+            try:
+                mtime = stats_file.stat().st_mtime_ns
+            except FileNotFoundError:
+                mtime = None
+            if mtime != self._stats_mtime:
+                self._stats = talk_stats.load_store(stats_file)
+                self._stats_mtime = mtime
+            store = self._stats
+        return talk_stats.query_stats(store, teacher, month)
+
+    def transcript_path(self, folder_name: str):
+        """返回会议转录文件在磁盘上的路径，没有转录时返回None"""
+        meeting = self.get(folder_name)
+        if meeting is None or not meeting.get("transcriptFile"):
+            return None
+        return self.recordings_dir / folder_name / meeting["transcriptFile"]
+
+    def describe(self, folder_name: str):
+        """返回播放器打开一个会议所需的全部信息"""
+        meeting = self.get(folder_name)
+        if meeting is None:
+            return None
+        base = f"/recordings/{quote(folder_name)}"
+        video_file = meeting.get("videoFile")
+        transcript_file = meeting.get("transcriptFile")
+        caption_file = meeting.get("captionFile")
+        thumbnails_file = meeting.get("thumbnailsFile")
+        proxy_file = meeting.get("proxyFile")
+        return dict(
+            meeting,
+            id=folder_name,
+            video=f"{base}/{quote(video_file)}" if video_file else None,
+            transcript=f"{base}/{quote(transcript_file)}" if transcript_file else None,
+            captions=f"{base}/{quote(caption_file)}" if caption_file else None,
+            thumbnails=f"{base}/{quote(thumbnails_file)}" if thumbnails_file else None,
+            proxy=f"{base}/{quote(proxy_file)}" if proxy_file else None,
+        )
+
+
+class _GzipCache:
+    """按 (路径, mtime, 大小) 缓存gzip压缩结果，避免重复压缩同一个文件"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, stat: os.stat_result) -> bytes:
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        data = gzip.compress(path.read_bytes(), compresslevel=6)
+        with self._lock:
+            self._entries[key] = data
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return data
+
+
+def parse_range(header: str, size: int):
+    """
+    解析单段 Range 请求头
+
+    Returns:
+        (start, end) 闭区间；header无法识别时返回None（按完整内容响应）；
+        范围无法满足时返回 (None, None)
+    """
+    match = RANGE_PATTERN.match(header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N: 最后N个字节
+        length = int(last)
+        if length == 0:
+            return None, None
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return None, None
+    return start, min(end, size - 1)
+
+
+class RecordingsRequestHandler(BaseHTTPRequestHandler):
+    """会议记录服务器的请求处理器"""
+
+    server_version = "VideoMeetingTranscript/1.0"
+    protocol_version = "HTTP/1.1"
+
+    library: MeetingLibrary = None
+    gzip_cache = _GzipCache()
+    transcript_indexes = TranscriptIndexCache()
+
+    def do_GET(self):
+        self._handle(send_body=True)
+
+    def do_HEAD(self):
+        self._handle(send_body=False)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # ------------------------------------------------------------ 路由
+
+    def _handle(self, send_body: bool):
+        url = urlsplit(self.path)
+        path = unquote(url.path)
+        try:
+            if path in ("", "/"):
+                self._redirect("/web/index.html")
+            elif path == "/metrics":
+                self._send_metrics(send_body)
+            elif path.startswith("/api/"):
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                self._handle_api(path[len("/api/"):], query, send_body)
+            else:
+                self._serve_static(path, send_body)
+        except (BrokenPipeError, ConnectionResetError):
+            # 浏览器拖动进度条时经常会中断正在进行的Range请求
+            pass
+
+    def _handle_api(self, route: str, query: dict, send_body: bool):
+        parts = route.strip("/").split("/")
+        if parts == ["meetings"]:
+            self._handle_list_api(query, send_body)
+            return
+        if len(parts) >= 2 and parts[0] == "meetings":
+            folder_name = parts[1]
+            if len(parts) == 2:
+                meeting = self.library.describe(folder_name)
+                if meeting is None:
+                    self._send_json({"error": f"会议不存在: {folder_name}"}, send_body, HTTPStatus.NOT_FOUND)
+                    return
+                self._send_json(meeting, send_body)
+                return
+            if len(parts) == 3 and parts[2] in ("transcript", "segment-at"):
+                self._handle_transcript_api(folder_name, parts[2], query, send_body)
+                return
+        if parts == ["search"]:
+            self._handle_search_api(query, send_body)
+            return
+        if parts == ["stats"]:
+            self._send_json(self.library.speaking_stats(query.get("teacher") or None,
+                                                        query.get("month") or None), send_body)
+            return
+        self._send_json({"error": f"未知的API: /api/{route}"}, send_body, HTTPStatus.NOT_FOUND)
+
+    def _handle_list_api(self, query: dict, send_body: bool):
+        try:
+            page = int(query.get("page", 1))
+            page_size = min(int(query["pageSize"]), 500) if "pageSize" in query else None
+            result = self.library.list_meetings(
+                teacher=query.get("teacher") or None,
+                date_from=query.get("from") or None,
+                date_to=query.get("to") or None,
+                page=page,
+                page_size=page_size,
+            )
+        except ValueError as e:
+            self._send_json({"error": f"参数无效: {e}"}, send_body, HTTPStatus.BAD_REQUEST)
+            return
+        self._send_json(result, send_body)
+
+    def _handle_search_api(self, query: dict, send_body: bool):
+        q = query.get("q", "").strip()
+        if not q:
+            self._send_json({"error": "缺少检索词参数 q"}, send_body, HTTPStatus.BAD_REQUEST)
+            return
+        try:
+            limit = min(int(query.get("limit", 20)), 200)
+            offset = int(query.get("offset", 0))
+            hits = transcript_search.search(
+                q,
+                self.library.recordings_dir / transcript_search.SEARCH_DB_NAME,
+                limit=limit,
+                offset=offset,
+                teacher=query.get("teacher") or None,
+                speaker=query.get("speaker") or None,
+            )
+        except ValueError as e:
+            self._send_json({"error": str(e)}, send_body, HTTPStatus.BAD_REQUEST)
+            return
+        for hit in hits:
+            hit["link"] = "/web/" + hit["link"]
+        self._send_json({"query": q, "limit": limit, "offset": offset, "hits": hits}, send_body)
+
+    def _handle_transcript_api(self, folder_name: str, action: str, query: dict, send_body: bool):
+        transcript_file = self.library.transcript_path(folder_name)
+        if transcript_file is None or not transcript_file.exists():
+            self._send_json({"error": f"会议没有转录文件: {folder_name}"}, send_body, HTTPStatus.NOT_FOUND)
+            return
+        try:
+            index = self.transcript_indexes.get(transcript_file)
+        except (OSError, ValueError, KeyError) as e:
+            self._send_json({"error": f"无法读取转录文件: {e}"}, send_body, HTTPStatus.INTERNAL_SERVER_ERROR)
+            return
+
+        try:
+            if action == "segment-at":
+                t = float(query["t"])
+                self._send_json({"t": t, "segment": index.segment_at(t)}, send_body)
+                return
+            start = float(query.get("from", 0))
+            end = float(query.get("to", index.duration))
+        except (KeyError, ValueError):
+            self._send_json({"error": "参数无效: 需要数字参数 t 或 from/to"}, send_body, HTTPStatus.BAD_REQUEST)
+            return
+
+        self._send_json({
+            "total": len(index),
+            "duration": index.duration,
+            "from": start,
+            "to": end,
+            "segments": index.window(start, end),
+        }, send_body)
+
+    # ------------------------------------------------------------ 响应
+
+    def _redirect(self, location: str):
+        self.send_response(HTTPStatus.FOUND)
+        self.send_header("Location", location)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _send_error(self, status: HTTPStatus, send_body: bool, extra_headers=None):
+        body = f"{status.value} {status.phrase}\n".encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (extra_headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _accepts_gzip(self) -> bool:
+        return "gzip" in self.headers.get("Accept-Encoding", "")
+
+    def _send_metrics(self, send_body: bool):
+        body = stage_metrics.render_prometheus(stage_metrics.read_records()).encode("utf-8")
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _send_json(self, data, send_body: bool, status: HTTPStatus = HTTPStatus.OK):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", CONTENT_TYPES[".json"])
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if len(body) >= MIN_GZIP_SIZE and self._accepts_gzip():
+            body = gzip.compress(body, compresslevel=6)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+    def _resolve_static(self, path: str):
+        """把URL路径映射到允许访问的文件，拒绝目录穿越和隐藏文件"""
+        relative = path.lstrip("/")
+        parts = relative.split("/")
+        if not parts or parts[0] not in SERVED_DIRS:
+            return None
+        if any(part.startswith(".") for part in parts if part):
+            return None
+        file_path = (PROJECT_ROOT / relative).resolve()
+        root = (PROJECT_ROOT / parts[0]).resolve()
+        if root != file_path and root not in file_path.parents:
+            return None
+        return file_path if file_path.is_file() else None
+
+    def _not_modified(self, etag: str, mtime: float) -> bool:
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None:
+            candidates = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in candidates or etag in candidates
+        if_modified_since = self.headers.get("If-Modified-Since")
+        if if_modified_since:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(mtime) <= since
+        return False
+
+    def _serve_static(self, path: str, send_body: bool):
+        file_path = self._resolve_static(path)
+        if file_path is None:
+            self._send_error(HTTPStatus.NOT_FOUND, send_body)
+            return
+
+        stat = file_path.stat()
+        suffix = file_path.suffix.lower()
+        content_type = CONTENT_TYPES.get(suffix, "application/octet-stream")
+        use_gzip = (
+            suffix in COMPRESSIBLE_SUFFIXES
+            and stat.st_size >= MIN_GZIP_SIZE
+            and self._accepts_gzip()
+        )
+        etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}{"-gz" if use_gzip else ""}"'
+        last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+        common_headers = {
+            "ETag": etag,
+            "Last-Modified": last_modified,
+            "Cache-Control": "no-cache",
+        }
+        if suffix in COMPRESSIBLE_SUFFIXES:
+            common_headers["Vary"] = "Accept-Encoding"
+
+        if self._not_modified(etag, stat.st_mtime):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            for name, value in common_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            return
+
+        if use_gzip:
+            body = self.gzip_cache.get(file_path, stat)
+            self.send_response(HTTPStatus.OK)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in common_headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            if send_body:
+                self.wfile.write(body)
+            return
+
+        size = stat.st_size
+        start, end = 0, size - 1
+        status = HTTPStatus.OK
+        range_header = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if range_header and (if_range is None or if_range in (etag, last_modified)):
+            byte_range = parse_range(range_header, size)
+            if byte_range == (None, None):
+                self._send_error(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE, send_body,
+                                 {"Content-Range": f"bytes */{size}"})
+                return
+            if byte_range is not None:
+                start, end = byte_range
+                status = HTTPStatus.PARTIAL_CONTENT
+
+        length = end - start + 1 if size else 0
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(length))
+        if status == HTTPStatus.PARTIAL_CONTENT:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        for name, value in common_headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+
+        if send_body and length:
+            with open(file_path, "rb") as f:
+                f.seek(start)
+                remaining = length
+                while remaining > 0:
+                    chunk = f.read(min(COPY_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
+
+
+class RecordingsServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler_class, verbose: bool = False):
+        super().__init__(address, handler_class)
+        self.verbose = verbose
+
+
+def main():
+    parser = argparse.ArgumentParser(description="会议记录本地HTTP服务器")
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址 (默认: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8000, help="监听端口 (默认: 8000)")
+    parser.add_argument("--no-scan", action="store_true", help="启动时不刷新扫描缓存和检索索引")
+    parser.add_argument("--verbose", action="store_true", help="输出每个请求的访问日志")
+    args = parser.parse_args()
+
+    library = MeetingLibrary(RECORDINGS_DIR)
+    if not args.no_scan and RECORDINGS_DIR.exists():
+        library.rescan()
+    RecordingsRequestHandler.library = library
+
+    server = RecordingsServer((args.host, args.port), RecordingsRequestHandler, verbose=args.verbose)
+    print(f"🌐 会议记录服务器已启动: http://{args.host}:{args.port}/")
+    print(f"📁 项目根目录: {PROJECT_ROOT}")
+    print("⏹️  按 Ctrl+C 停止")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 服务器已停止")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+转录文件的时间索引
+
+把转录片段按开始时间排序，并预先计算结束时间的前缀最大值，
+时间窗口查询和"某一时刻正在说的片段"查询都只需要二分查找 O(log n)，
+不需要每次遍历全部片段。两个说话人的片段可以互相重叠。
+"""
+
+import json
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from pathlib import Path
+from typing import List, Optional
+
+
+class TranscriptIndex:
+    """单个转录文件的时间索引"""
+
+    def __init__(self, segments: List[dict]):
+        """
+        Args:
+            segments: 转录片段列表，每个元素包含 start, end, text, speaker
+        """
+        ordered = sorted(segments, key=lambda s: (s['start'], s['end']))
+        self.segments = [dict(segment, index=i) for i, segment in enumerate(ordered)]
+        self.starts = [segment['start'] for segment in self.segments]
+
+        # max_ends[i] = max(end[0..i])，单调不减，用于二分定位第一个可能重叠的片段
+        self.max_ends = []
+        current = float('-inf')
+        for segment in self.segments:
+            current = max(current, segment['end'])
+            self.max_ends.append(current)
+
+    @classmethod
+    def from_file(cls, transcript_file) -> 'TranscriptIndex':
+        with open(transcript_file, 'r', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(self.segments)
+
+    @property
+    def duration(self) -> float:
+        return self.max_ends[-1] if self.max_ends else 0.0
+
+    def window(self, start: float, end: float) -> List[dict]:
+        """
+        返回与时间窗口 [start, end] 重叠的片段（按开始时间排序）
+        """
+        lo = bisect_left(self.max_ends, start)
+        hi = bisect_right(self.starts, end)
+        return [segment for segment in self.segments[lo:hi] if segment['end'] >= start]
+
+    def segment_at(self, t: float) -> Optional[dict]:
+        """
+        返回时刻 t 正在进行的片段；有多个片段重叠时返回开始时间最晚的那个
+        """
+        i = bisect_right(self.starts, t) - 1
+        while i >= 0 and self.max_ends[i] >= t:
+            if self.segments[i]['end'] >= t:
+                return self.segments[i]
+            i -= 1
+        return None
+
+
+class TranscriptIndexCache:
+    """按 (路径, mtime, 大小) 缓存已构建的索引，转录文件被重写后自动失效"""
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, transcript_file) -> TranscriptIndex:
+        path = Path(transcript_file)
+        stat = path.stat()
+        key = (str(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        index = TranscriptIndex.from_file(path)
+        with self._lock:
+            self._entries[key] = index
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return index